@@ -0,0 +1,95 @@
+"""
+Benchmark for the cold start of the service under gunicorn: seconds from
+starting the process to the first healthy /health and to the first answered
+/metrics request, serving flask_wrapper:app (everything loaded at import) vs.
+boot:app (measured boot sequence, see boot.py), plus the boot report.
+
+    python benchmark/boot_benchmark.py --runs 5 --server gunicorn gevent
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from load_test import DUMMY_TENANT_ENV, SERVICE_DIR, free_port  # noqa: E402
+
+APPS = ["flask_wrapper:app", "boot:app"]
+
+
+def wait_for(url: str, deadline: float) -> float:
+    """Poll the URL until it answers 200, returns the time of the answer"""
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter()
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} did not answer")
+
+
+def cold_start(server: str, wsgi_app: str) -> dict:
+    port = free_port()
+    env = {
+        **os.environ,
+        **DUMMY_TENANT_ENV,
+        "PORT": str(port),
+        "WEB_ACCESS_LOG": "",
+        "WEB_WORKER_CLASS": "gevent" if server == "gevent" else "gthread",
+        "BUILDER_POOL_SIZE": "0",
+    }
+    command = [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", wsgi_app]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        healthy = wait_for(f"{base_url}/health", time.time() + 60) - start
+        served = wait_for(f"{base_url}/metrics", time.time() + 60) - start
+        report = None
+        if wsgi_app == "boot:app":
+            deadline = time.time() + 60
+            while time.time() < deadline:
+                report = requests.get(f"{base_url}/diagnostics/boot", timeout=1).json()
+                if report["warmSeconds"] is not None or report["state"] == "failed":
+                    break
+                time.sleep(0.05)
+        return {"healthy": healthy, "served": served, "report": report}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", nargs="+", choices=["gunicorn", "gevent"], default=["gunicorn"])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per server and app")
+    parser.add_argument("--report", action="store_true", help="print the boot report of the last run as JSON")
+    args = parser.parse_args()
+
+    print(f"{'server':<9} {'app':<18} {'healthy s':>10} {'served s':>10}")
+    report = None
+    for server in args.server:
+        for wsgi_app in APPS:
+            runs = [cold_start(server, wsgi_app) for _ in range(args.runs)]
+            healthy = statistics.median(run["healthy"] for run in runs)
+            served = statistics.median(run["served"] for run in runs)
+            print(f"{server:<9} {wsgi_app:<18} {healthy:10.3f} {served:10.3f}")
+            report = runs[-1]["report"] or report
+
+    if report:
+        print(f"boot steps ({report['state']}, ready {report['readySeconds']}s, warm {report['warmSeconds']}s)")
+        for step in report["steps"]:
+            print(f"  {step['phase']:<7} {step['name']:<26} {step['seconds']:7.3f}s {step['modules']:5} modules")
+        if args.report:
+            print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
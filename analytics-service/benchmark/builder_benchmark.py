@@ -0,0 +1,89 @@
+"""
+Benchmark for the warm analytics_builder workers: latency of extension builds
+run as cold subprocess (BUILDER_POOL_SIZE=0) and on warm workers, sequential
+and concurrent, with stub_analytics_builder.py standing in for the Block SDK.
+--startup-seconds is what loading the SDK takes per process.
+
+    python benchmark/builder_benchmark.py --builds 20 --startup-seconds 0.5 --build-seconds 0.05
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from harness import BENCHMARK_DIR, create_builder  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+
+def build_once(pool, input_dir: str, output_dir: str, index: int) -> float:
+    """Seconds of one build"""
+    output = os.path.join(output_dir, f"extension-{index}.zip")
+    start = time.perf_counter()
+    pool.run(["build", "extension", "--input", input_dir, "--output", output])
+    return time.perf_counter() - start
+
+
+def run(pool, input_dir: str, output_dir: str, builds: int, concurrency: int) -> list:
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(lambda index: build_once(pool, input_dir, output_dir, index), range(builds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--builds", type=int, default=20, help="builds per mode and concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2], help="builds at the same time")
+    parser.add_argument("--workers", type=int, default=2, help="warm workers")
+    parser.add_argument("--startup-seconds", type=float, default=0.5, help="seconds analytics_builder takes to load")
+    parser.add_argument("--build-seconds", type=float, default=0.05, help="seconds per build after loading")
+    parser.add_argument("--max-builds", type=int, default=50, help="builds after which a worker is recycled")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    os.environ["STUB_STARTUP_SECONDS"] = str(args.startup_seconds)
+    os.environ["STUB_BUILD_SECONDS"] = str(args.build_seconds)
+    os.environ["ANALYTICS_BUILDER_ENTRY"] = os.path.join(BENCHMARK_DIR, "stub_analytics_builder.py")
+    from builder_pool import BuilderPool
+
+    work_dir = tempfile.mkdtemp(prefix="builder-")
+    try:
+        create_builder(work_dir)
+        launcher = os.path.join(work_dir, "analytics_builder")
+        input_dir = os.path.join(work_dir, "input")
+        output_dir = os.path.join(work_dir, "output")
+        os.makedirs(output_dir)
+        os.makedirs(input_dir)
+        for index in range(20):
+            with open(os.path.join(input_dir, f"Block{index}.mon"), "w") as f:
+                f.write(f"monitor Block{index} {{}}\n" * 100)
+
+        print(f"{'mode':<6} {'conc':>4} {'p50 ms':>9} {'p90 ms':>9} {'max ms':>9} {'builds/s':>9}  pool")
+        for mode in ["cold", "warm"]:
+            pool = BuilderPool(launcher, size=args.workers if mode == "warm" else 0, max_builds=args.max_builds)
+            pool.start()
+            # Wait for the workers to load, as they do while the service starts
+            deadline = time.time() + args.startup_seconds * 10 + 10
+            while pool.stats()["starting"] and time.time() < deadline:
+                time.sleep(0.05)
+            for concurrency in args.concurrency:
+                start = time.perf_counter()
+                latencies = run(pool, input_dir, output_dir, args.builds, concurrency)
+                elapsed = time.perf_counter() - start
+                stats = pool.stats()
+                print(
+                    f"{mode:<6} {concurrency:>4} {percentile(latencies, 0.5) * 1000:9.0f} "
+                    f"{percentile(latencies, 0.9) * 1000:9.0f} {max(latencies) * 1000:9.0f} "
+                    f"{args.builds / elapsed:9.2f}  warm {stats['warmBuilds']} cold {stats['coldBuilds']} "
+                    f"recycled {stats['recycled']}"
+                )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the GitHub tree download against a local stub server.
+
+Compares a sequential walk (one worker) with the concurrent download engine and
+the archive fetch mode, and verifies that all produce the same on-disk layout.
+
+    python benchmark/download_benchmark.py --files 300 --dirs 5 --latency 0.02
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from github_downloader import GitHubDownloader  # noqa: E402
+from stub_github import StubGitHubServer  # noqa: E402
+
+
+def snapshot(work_dir: str):
+    result = {}
+    for root, _, files in os.walk(work_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                result[os.path.relpath(path, work_dir)] = f.read()
+    return result
+
+
+def run(url: str, workers: int, skip_root_folder: bool, archive: bool = False):
+    with tempfile.TemporaryDirectory() as work_dir:
+        start = time.perf_counter()
+        downloader = GitHubDownloader({}, work_dir, skip_root_folder, max_workers=workers)
+        if archive:
+            downloader.download_archive([url])
+        else:
+            downloader.download(url)
+        return time.perf_counter() - start, snapshot(work_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--dirs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub latency per request in seconds")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with StubGitHubServer(args.files, args.dirs, args.latency) as stub:
+        url = stub.contents_url()
+        for skip_root_folder in (True, False):
+            baseline, expected = run(url, 1, skip_root_folder)
+            print(f"skip_root_folder={skip_root_folder} files={len(expected)}")
+            print(f"  workers=1   {baseline:7.3f}s")
+            for workers in args.workers:
+                elapsed, layout = run(url, workers, skip_root_folder)
+                status = "ok" if layout == expected else "LAYOUT MISMATCH"
+                print(f"  workers={workers:<3} {elapsed:7.3f}s  x{baseline / elapsed:5.1f}  {status}")
+            elapsed, layout = run(url, 1, skip_root_folder, archive=True)
+            status = "ok" if layout == expected else "LAYOUT MISMATCH"
+            print(f"  archive     {elapsed:7.3f}s  x{baseline / elapsed:5.1f}  {status}")
+
+
+if __name__ == "__main__":
+    main()
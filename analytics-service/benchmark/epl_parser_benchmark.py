@@ -0,0 +1,87 @@
+"""
+Benchmark for the FQN lookup of a monitor: downloading the whole file and
+searching it with a regex against streaming it through the EPL header parser,
+which stops reading once the package declaration is found.
+
+    python benchmark/epl_parser_benchmark.py --sizes 4096 1048576 --requests 50
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from epl_parser import parse_epl_header  # noqa: E402
+from solution_utils import EPL_CHUNK_SIZE, http_sessions  # noqa: E402
+from stub_github import StubGitHubServer  # noqa: E402
+
+# A package in a comment or string must not be taken for the declaration
+TRICKY_MONITOR = """// package commented.out;
+/* package block.comment; */
+using com.apama.Example; // "package in.string;"
+package real.pkg;
+/** Block. @$blockCategory Calculation */
+event Block {}
+"""
+# EPL allows whitespace and comments around the dots of the package name
+SPACED_MONITOR = """package com . apama /* x */ . blocks ;
+event Block {}
+"""
+
+
+def full_text(url: str):
+    response = http_sessions.get(url)
+    response.raise_for_status()
+    package = re.findall(r"(package\s)(.*?);", response.text)
+    return (package[0][1] if package else None), len(response.content)
+
+
+def streaming(url: str):
+    response = http_sessions.get(url, stream=True)
+    response.raise_for_status()
+    with response:
+        header = parse_epl_header(response.iter_content(EPL_CHUNK_SIZE), until="package")
+    return header.package, header.consumed
+
+
+def measure(lookup, url: str, count: int):
+    start = time.perf_counter()
+    for _ in range(count):
+        package, read = lookup(url)
+    return (time.perf_counter() - start) / count * 1000, package, read
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4096, 262144, 4194304])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    header = parse_epl_header([TRICKY_MONITOR])
+    regex = re.findall(r"(package\s)(.*?);", TRICKY_MONITOR)[0][1]
+    print(f"package in comments: regex '{regex}', parser '{header.package}'")
+    assert header.package == "real.pkg", header.package
+    # Fed one character at a time, every token ends at a chunk boundary
+    header = parse_epl_header(SPACED_MONITOR, until="package")
+    regex = re.findall(r"(package\s)(.*?);", SPACED_MONITOR)[0][1]
+    print(f"package with spaced dots: regex '{regex}', parser '{header.package}'")
+    assert header.package == "com.apama.blocks", header.package
+
+    for size in args.sizes:
+        with StubGitHubServer(files=1, dirs=0, latency=0.0, file_size=size) as stub:
+            url = f"{stub.base_url}/raw/{next(iter(stub.tree))}"
+            full_ms, full_package, full_read = measure(full_text, url, args.requests)
+            stream_ms, stream_package, stream_read = measure(streaming, url, args.requests)
+            assert full_package == stream_package, (full_package, stream_package)
+            print(
+                f"size={size:<9} full text {full_ms:8.2f} ms ({full_read} bytes)   "
+                f"streaming {stream_ms:8.2f} ms ({stream_read} chars parsed)   x{full_ms / stream_ms:5.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Benchmark harness: drives /repository/contentList, /repository/content and the
+/extension/list, /extension/repository and /extension/yaml builds at set
+concurrency levels against local stand-ins for GitHub, Cumulocity and the
+analytics_builder, and reports throughput, latency percentiles and the peak
+memory of the service to JSON, for comparison across versions.
+
+    python benchmark/harness.py --concurrency 1 8 32 --output before.json
+    python benchmark/harness.py --concurrency 1 8 32 --output after.json --compare before.json
+
+Every run starts the service with fresh caches. Repeated builds of the same
+input are served from the build cache unless --cold is given.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from load_test import SERVICE_DIR, free_port, percentile, start_service  # noqa: E402
+from stub_cumulocity import BOOTSTRAP_PASSWORD, BOOTSTRAP_USER, StubCumulocityServer  # noqa: E402
+from stub_github import ROOT_PATH, StubGitHubServer  # noqa: E402
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_ID = "benchmark"
+REPOSITORY_CATEGORY = "analytics-management.repository"
+ACCESS_TOKEN = "benchmark-token"
+YAML_PATH = "extensions.yaml"
+
+SCENARIOS = [
+    "contentList",
+    "content",
+    "extension-list",
+    "extension-repository",
+    "extension-yaml",
+]
+
+
+def create_builder(sdk_dir: str) -> None:
+    """Put the analytics_builder stand-in where the service expects the Block SDK"""
+    builder = os.path.join(sdk_dir, "analytics_builder")
+    with open(builder, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCHMARK_DIR, "stub_analytics_builder.py")}" "$@"\n')
+    os.chmod(builder, os.stat(builder).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def add_yaml(github: StubGitHubServer, sections: int) -> str:
+    """Serve a YAML file splitting the monitors of the tree into sections, returns its URL"""
+    monitors = sorted(path[len(ROOT_PATH) + 1:] for path in github.tree if path.startswith(f"{ROOT_PATH}/"))
+    lines = []
+    for index in range(sections):
+        lines.append(f"section{index}:")
+        lines.append("  files:")
+        lines.extend(f"    - {monitor}" for monitor in monitors[index::sections])
+    github.tree[YAML_PATH] = ("\n".join(lines) + "\n").encode()
+    return f"{github.base_url}/raw/{YAML_PATH}"
+
+
+def scenario_requests(github: StubGitHubServer, yaml_url: str, args) -> Dict[str, Dict]:
+    """Method, path and body of the request of every scenario"""
+    monitor = sorted(path for path in github.tree if path.endswith(".mon"))[0]
+    repository = {"id": REPOSITORY_ID}
+    delivery = {"upload": not args.no_upload, "deploy": args.deploy}
+    return {
+        "contentList": {
+            "method": "GET",
+            "path": "/repository/contentList?"
+            + urllib.parse.urlencode({"url": github.web_url(), "repository_id": REPOSITORY_ID}),
+        },
+        "content": {
+            "method": "GET",
+            "path": "/repository/content?"
+            + urllib.parse.urlencode({"url": f"{github.base_url}/raw/{monitor}", "repository_id": REPOSITORY_ID}),
+        },
+        "extension-list": {
+            "method": "POST",
+            "path": "/extension/list",
+            "json": {
+                "extension_name": "benchmark-list",
+                "monitors": [{"url": github.contents_url(monitor)}],
+                "repository": repository,
+                **delivery,
+            },
+        },
+        "extension-repository": {
+            "method": "POST",
+            "path": "/extension/repository",
+            "json": {"extension_name": "benchmark-repository", "repository": repository, **delivery},
+        },
+        "extension-yaml": {
+            "method": "POST",
+            "path": "/extension/yaml",
+            "json": {"yaml": {"url": yaml_url}, "repository": repository, **delivery},
+        },
+    }
+
+
+class PeakMemory:
+    """Samples the RSS of a process and its children, Linux only"""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "PeakMemory":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return round(self.peak_kb / 1024, 1) if self.peak_kb else None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, sum(self._rss_kb(pid) for pid in self._tree(self.pid)))
+            time.sleep(self.interval)
+
+    def _tree(self, pid: int) -> List[int]:
+        pids = [pid]
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                for child in f.read().split():
+                    pids.extend(self._tree(int(child)))
+        except OSError:
+            pass
+        return pids
+
+    @staticmethod
+    def _rss_kb(pid: int) -> int:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+
+def run_scenario(
+    base_url: str, request: Dict, auth: Tuple[str, str], concurrency: int, total: int, pid: int, timeout: float
+) -> Dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    remaining = [total]
+    errors: List[str] = []
+
+    def client():
+        session = requests.Session()
+        session.auth = auth
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                response = session.request(
+                    request["method"], base_url + request["path"], json=request.get("json"), timeout=timeout
+                )
+                status = str(response.status_code)
+                error = None if response.ok else response.text[:2000]
+            except requests.RequestException as e:
+                status, error = type(e).__name__, str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+                if error and not errors:
+                    errors.append(error)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    with PeakMemory(pid) as memory:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": total,
+        "ok": ok,
+        "statuses": dict(statuses),
+        "seconds": round(wall, 3),
+        "throughput": round(ok / wall, 2),
+        "p50": round(percentile(latencies, 0.5) * 1000, 1),
+        "p90": round(percentile(latencies, 0.9) * 1000, 1),
+        "p99": round(percentile(latencies, 0.99) * 1000, 1),
+        "max": round(max(latencies) * 1000, 1),
+        "peakRssMb": memory.peak_mb,
+        "firstError": errors[0] if errors else None,
+    }
+
+
+def git_version() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_file: str) -> None:
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\ncompared to {baseline_file} ({baseline['meta'].get('version')})")
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        changes = []
+        for key, unit in (("throughput", "req/s"), ("p50", "ms"), ("p99", "ms"), ("peakRssMb", "MB")):
+            if before.get(key) and result.get(key) is not None:
+                changes.append(
+                    f"{key} {before[key]} -> {result[key]} {unit} ({(result[key] / before[key] - 1) * 100:+.0f}%)"
+                )
+        print(f"  {result['scenario']:<21} c={result['concurrency']:<4} " + "   ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario and concurrency level")
+    parser.add_argument("--server", choices=["dev", "gunicorn", "gevent"], default="gunicorn")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=32, help="gunicorn threads per worker")
+    parser.add_argument("--files", type=int, default=50, help="monitors in the stub repository")
+    parser.add_argument("--dirs", type=int, default=2, help="sub directories of the stub repository")
+    parser.add_argument("--file-size", type=int, default=0, help="minimum size of a monitor in bytes")
+    parser.add_argument("--sections", type=int, default=3, help="sections of the YAML file")
+    parser.add_argument("--github-latency", type=float, default=0.02, help="seconds per GitHub request")
+    parser.add_argument("--rate-limit", type=int, help="GitHub requests per token and hour, unlimited if not set")
+    parser.add_argument("--c8y-latency", type=float, default=0.01, help="seconds per Cumulocity request")
+    parser.add_argument("--restart-latency", type=float, default=0.5, help="seconds per CEP restart")
+    parser.add_argument("--build-seconds", type=float, default=0.5, help="seconds per analytics_builder run")
+    parser.add_argument("--startup-seconds", type=float, default=0.0, help="seconds analytics_builder takes to load")
+    parser.add_argument("--builder-pool", type=int, default=2, help="warm analytics_builder workers, 0 for none")
+    parser.add_argument("--fetch-mode", choices=["contents", "archive"], default="contents")
+    parser.add_argument("--no-upload", action="store_true", help="return the built extensions instead of uploading")
+    parser.add_argument("--deploy", action="store_true", help="restart CEP after uploads")
+    parser.add_argument("--cold", action="store_true", help="disable the blob and build caches")
+    parser.add_argument("--timeout", type=float, default=300.0, help="client timeout per request")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    work_dir = tempfile.mkdtemp(prefix="harness-")
+    github = StubGitHubServer(
+        files=args.files,
+        dirs=args.dirs,
+        latency=args.github_latency,
+        file_size=args.file_size,
+        rate_limit=args.rate_limit,
+    )
+    c8y = StubCumulocityServer(latency=args.c8y_latency, restart_latency=args.restart_latency)
+    with github, c8y:
+        yaml_url = add_yaml(github, args.sections)
+        repository = {"name": "Benchmark", "url": github.web_url(), "enabled": True, "accessToken": ACCESS_TOKEN}
+        if args.fetch_mode != "contents":
+            repository["fetchMode"] = args.fetch_mode
+        c8y.set_option(REPOSITORY_CATEGORY, REPOSITORY_ID, json.dumps(repository))
+        create_builder(work_dir)
+
+        env = {
+            "C8Y_BASEURL": c8y.base_url,
+            "C8Y_BOOTSTRAP_TENANT": c8y.tenant,
+            "C8Y_BOOTSTRAP_USER": BOOTSTRAP_USER,
+            "C8Y_BOOTSTRAP_PASSWORD": BOOTSTRAP_PASSWORD,
+            "GITHUB_WEB_URL": github.base_url,
+            "GITHUB_API_URL": github.base_url,
+            "ANALYTICS_BUILDER_SDK_DIR": work_dir,
+            "ANALYTICS_BUILDER_SDK_VERSION": "stub",
+            "STUB_BUILD_SECONDS": str(args.build_seconds),
+            "STUB_STARTUP_SECONDS": str(args.startup_seconds),
+            # The stand-in launcher is a shell script like the one of the SDK
+            "ANALYTICS_BUILDER_ENTRY": os.path.join(BENCHMARK_DIR, "stub_analytics_builder.py"),
+            "BUILDER_POOL_SIZE": str(args.builder_pool),
+            "BLOB_CACHE_DIR": os.path.join(work_dir, "blobs"),
+            "BUILD_CACHE_DIR": os.path.join(work_dir, "builds"),
+        }
+        if args.cold:
+            env.update(BLOB_CACHE_MAX_BYTES="0", BUILD_CACHE_MAX_BYTES="0")
+
+        port = free_port()
+        process = start_service(args.server, port, args.workers, args.threads, env)
+        requests_by_scenario = scenario_requests(github, yaml_url, args)
+        results = []
+        try:
+            print(
+                f"{'scenario':<21} {'conc':>4} {'ok':>9} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} "
+                f"{'p99 ms':>9} {'max ms':>9} {'peak MB':>8}"
+            )
+            for scenario in args.scenario:
+                for concurrency in args.concurrency:
+                    result = run_scenario(
+                        f"http://127.0.0.1:{port}",
+                        requests_by_scenario[scenario],
+                        (f"{c8y.tenant}/user", "password"),
+                        concurrency,
+                        args.requests,
+                        process.pid,
+                        args.timeout,
+                    )
+                    result.update(scenario=scenario, concurrency=concurrency)
+                    results.append(result)
+                    print(
+                        f"{scenario:<21} {concurrency:>4} {result['ok']:>4}/{result['requests']:<4} "
+                        f"{result['throughput']:>8.1f} {result['p50']:>9.1f} {result['p90']:>9.1f} "
+                        f"{result['p99']:>9.1f} {result['max']:>9.1f} {result['peakRssMb'] or 0:>8.1f}"
+                    )
+        finally:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        report = {
+            "meta": {
+                "version": git_version(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "settings": vars(args),
+                "github": {
+                    "requests": github.request_count,
+                    "notModified": github.not_modified_count,
+                    "rateLimited": github.rate_limited_count,
+                },
+                "cumulocity": c8y.stats(),
+            },
+            "results": results,
+        }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Load test of the service: latency percentiles of light endpoints while other
+clients keep long-blocking requests open, against the Flask development server,
+gunicorn with the given workers and threads, or gunicorn with gevent workers.
+
+The service is started locally with a dummy tenant, monitors are served by stub
+GitHub servers: a fast one for the measured requests and a slow one standing in
+for long-blocking calls such as builds. Use --url to test a running service.
+
+    python benchmark/load_test.py --server dev gunicorn gevent --clients 16 --blocking 32
+"""
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from stub_github import StubGitHubServer  # noqa: E402
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# The service starts without reaching the tenant, the measured endpoints do not use it
+DUMMY_TENANT_ENV = {
+    "C8Y_BASEURL": "http://127.0.0.1:1",
+    "C8Y_BOOTSTRAP_TENANT": "t1",
+    "C8Y_BOOTSTRAP_USER": "user",
+    "C8Y_BOOTSTRAP_PASSWORD": "password",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(
+    server: str, port: int, workers: int, threads: int, extra_env: Optional[Dict[str, str]] = None
+) -> subprocess.Popen:
+    """Start the service on the port, extra_env overrides the dummy tenant"""
+    env = {**os.environ, **DUMMY_TENANT_ENV, **(extra_env or {}), "PORT": str(port), "WEB_ACCESS_LOG": ""}
+    if server in ("gunicorn", "gevent"):
+        worker_class = "gevent" if server == "gevent" else "gthread"
+        env.update(WEB_WORKER_CLASS=worker_class, WEB_WORKERS=str(workers), WEB_THREADS=str(threads))
+        command = [
+            sys.executable, "-m", "gunicorn",
+            "--config", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}",
+            "boot:app",
+        ]
+    else:
+        command = [sys.executable, "flask_wrapper.py"]
+    process = subprocess.Popen(
+        command, cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # gunicorn serves boot:app, which answers /health before the service is loaded
+    probe = "/diagnostics/boot" if server in ("gunicorn", "gevent") else "/health"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            response = requests.get(f"http://127.0.0.1:{port}{probe}", timeout=1)
+            if response.ok and response.json().get("state", "ready") == "ready":
+                return process
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{server} server did not start")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_load(base_url: str, paths: Dict[str, str], blocking_path: Optional[str], args) -> Dict:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    stop = threading.Event()
+
+    def client(names: List[str], record: bool):
+        session = requests.Session()
+        index = 0
+        while not stop.is_set():
+            name = names[index % len(names)]
+            index += 1
+            start = time.perf_counter()
+            try:
+                ok = session.get(base_url + paths[name], timeout=args.timeout).ok
+            except requests.RequestException:
+                ok = False
+            if record:
+                latencies[name].append(time.perf_counter() - start)
+                if not ok:
+                    errors[name] += 1
+
+    threads = [
+        threading.Thread(target=client, args=(["blocking"], False), daemon=True)
+        for _ in range(args.blocking if blocking_path else 0)
+    ]
+    threads += [
+        threading.Thread(target=client, args=([name for name in paths if name != "blocking"], True), daemon=True)
+        for _ in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(args.timeout + 1)
+    return {
+        name: {
+            "requests": len(values),
+            "errors": errors[name],
+            "p50": percentile(values, 0.5) * 1000,
+            "p99": percentile(values, 0.99) * 1000,
+            "max": max(values) * 1000,
+            "rps": len(values) / args.seconds,
+        }
+        for name, values in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--server", nargs="+", choices=["dev", "gunicorn", "gevent"], default=["dev", "gunicorn", "gevent"]
+    )
+    parser.add_argument("--url", help="base URL of a running service, only /health is measured")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=32, help="gunicorn threads per worker")
+    parser.add_argument("--clients", type=int, default=16, help="clients measuring the light endpoints")
+    parser.add_argument("--blocking", type=int, default=16, help="clients keeping blocking requests open")
+    parser.add_argument("--block-seconds", type=float, default=2.0, help="duration of a blocking request")
+    parser.add_argument("--latency", type=float, default=0.01, help="latency of the fast GitHub stub")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of a run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout per request")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    if args.url:
+        results = run_load(args.url.rstrip("/"), {"health": "/health"}, None, args)
+        print_results(args.url, results)
+        return
+
+    with StubGitHubServer(files=1, dirs=0, latency=args.latency) as fast, StubGitHubServer(
+        files=1, dirs=0, latency=args.block_seconds
+    ) as slow:
+        monitor = next(iter(fast.tree))
+        paths = {
+            "health": "/health",
+            "content": "/repository/content?url=" + urllib.parse.quote(f"{fast.base_url}/raw/{monitor}", safe=""),
+            "blocking": "/repository/content?url=" + urllib.parse.quote(f"{slow.base_url}/raw/{monitor}", safe=""),
+        }
+        for server in args.server:
+            port = free_port()
+            process = start_service(server, port, args.workers, args.threads)
+            try:
+                results = run_load(f"http://127.0.0.1:{port}", paths, paths["blocking"], args)
+            finally:
+                process.terminate()
+                process.wait()
+            label = {
+                "dev": "dev",
+                "gunicorn": f"gunicorn gthread {args.workers}x{args.threads}",
+                "gevent": f"gunicorn gevent {args.workers}",
+            }[server]
+            print_results(label, results)
+
+
+def print_results(label: str, results: Dict):
+    print(label)
+    for name, result in sorted(results.items()):
+        print(
+            f"  {name:<8} {result['requests']:6} requests {result['errors']:4} errors   "
+            f"p50 {result['p50']:8.1f} ms   p99 {result['p99']:8.1f} ms   "
+            f"max {result['max']:8.1f} ms   {result['rps']:7.1f} req/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Microbenchmark for outbound GitHub requests: a bare requests.get per request,
+paying a new TCP (and TLS) handshake every time, against the pooled keep-alive
+sessions of solution_utils.http_sessions.
+
+    python benchmark/session_benchmark.py --requests 500 --threads 8
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from solution_utils import http_sessions  # noqa: E402
+from stub_github import StubGitHubServer  # noqa: E402
+
+
+def measure(get, url: str, count: int, threads: int) -> float:
+    def fetch(_):
+        response = get(url)
+        response.raise_for_status()
+        return len(response.content)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(fetch, range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency per request in seconds")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with StubGitHubServer(files=10, dirs=0, latency=args.latency) as stub:
+        url = f"{stub.base_url}/raw/repository/blocks/StubBlock0.mon"
+        for threads in args.threads:
+            bare = measure(lambda u: requests.get(u, allow_redirects=True), url, args.requests, threads)
+            pooled = measure(http_sessions.get, url, args.requests, threads)
+            print(
+                f"threads={threads:<3} requests.get {bare:8.1f} req/s   "
+                f"pooled session {pooled:8.1f} req/s   x{pooled / bare:4.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Stand-in for the analytics_builder of the Block SDK, used by the benchmarks.
+
+Accepts the command line the service runs, packs the input directory into the
+output zip and takes STUB_BUILD_SECONDS (default 1) like a real build would.
+Loading its toolchain (stub_builder_toolchain.py) takes STUB_STARTUP_SECONDS,
+which a warm builder worker pays once.
+
+    stub_analytics_builder.py build extension --input <dir> --output <zip>
+"""
+import argparse
+import os
+import sys
+import time
+import zipfile
+
+import stub_builder_toolchain  # noqa: F401
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs=2, help="build extension")
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    if args.command != ["build", "extension"]:
+        parser.error(f"unsupported command {' '.join(args.command)}")
+
+    time.sleep(float(os.getenv("STUB_BUILD_SECONDS", "1")))
+    output = os.path.abspath(args.output)
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as extension:
+        for root, dirs, files in os.walk(args.input):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if os.path.abspath(path) != output:
+                    extension.write(path, os.path.relpath(path, args.input))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+"""
+Toolchain of stub_analytics_builder.py, stands in for the modules of the Block
+SDK the real analytics_builder loads on every start. Importing it takes
+STUB_STARTUP_SECONDS (default 0).
+"""
+import os
+import time
+
+time.sleep(float(os.getenv("STUB_STARTUP_SECONDS", "0")))
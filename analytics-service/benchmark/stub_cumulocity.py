@@ -0,0 +1,204 @@
+"""
+Local stand-in for the Cumulocity APIs the service uses, used by the benchmarks.
+
+Serves the subscriptions of the bootstrap user, tenant options, inventory
+binaries and managed objects, the CEP restart and the CEP diagnostics, with a
+configurable per-request latency and duration of a CEP restart. State is kept
+in memory, uploaded binaries are read and dropped.
+
+Run the service with C8Y_BASEURL set to base_url and send requests with basic
+auth for TENANT, e.g. ("t1/user", "password"), any password is accepted.
+"""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+TENANT = "t1"
+BOOTSTRAP_USER = "bootstrap"
+BOOTSTRAP_PASSWORD = "password"
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubCumulocityServer:
+    """Threaded HTTP server standing in for a Cumulocity tenant"""
+
+    def __init__(self, latency: float = 0.01, restart_latency: float = 0.5, tenant: str = TENANT):
+        self.latency = latency
+        self.restart_latency = restart_latency
+        self.tenant = tenant
+        # category -> key -> value
+        self.options: Dict[str, Dict[str, str]] = {}
+        # ID -> managed object of an uploaded binary
+        self.binaries: Dict[str, Dict] = {}
+        self.uploaded_bytes = 0
+        self.restarts = 0
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        self._server = _StubHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def set_option(self, category: str, key: str, value: str) -> None:
+        with self._lock:
+            self.options.setdefault(category, {})[key] = value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "binaries": len(self.binaries),
+                "uploadedBytes": self.uploaded_bytes,
+                "restarts": self.restarts,
+            }
+
+    def start(self) -> "StubCumulocityServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubCumulocityServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+            def _handle(self, method: str):
+                parsed = urlparse(self.path)
+                parts = [unquote(part) for part in parsed.path.split("/") if part]
+                with stub._lock:
+                    stub.requests[f"{method} /{'/'.join(parts[:2])}"] += 1
+                time.sleep(stub.latency)
+
+                if method == "GET" and parsed.path == "/application/currentApplication/subscriptions":
+                    users = [{"tenant": stub.tenant, "name": BOOTSTRAP_USER, "password": BOOTSTRAP_PASSWORD}]
+                    return self._send(200, {"users": users})
+                if method == "POST" and parsed.path == "/inventory/binaries":
+                    return self._upload_binary()
+                # Connections are kept alive, a body must be read even if it is not used
+                body = self._read_body()
+                if parts[:2] == ["tenant", "options"]:
+                    return self._tenant_options(method, parts[2:], body)
+                if method == "GET" and parsed.path == "/inventory/managedObjects":
+                    with stub._lock:
+                        managed_objects = list(stub.binaries.values())
+                    if parse_qs(parsed.query).get("currentPage", ["1"])[0] != "1":
+                        managed_objects = []
+                    return self._send(200, {"managedObjects": managed_objects})
+                if method == "PUT" and parsed.path == "/service/cep/restart":
+                    time.sleep(stub.restart_latency)
+                    with stub._lock:
+                        stub.restarts += 1
+                    return self._send(200, {})
+                if method == "GET" and parsed.path == "/service/cep/diagnostics/apamaCtrlStatus":
+                    return self._send(
+                        200,
+                        {"microservice_name": "cep", "microservice_application_id": "1", "uptime": 1000},
+                    )
+                if method == "GET" and parsed.path == "/service/cep/diagnostics/extensionNames":
+                    with stub._lock:
+                        names = [binary["name"] for binary in stub.binaries.values()]
+                    return self._send(200, {"extensions": names})
+                if method == "GET" and parsed.path == "/service/cep/apamacorrelator/en/block-metadata.json":
+                    return self._send(200, {"extensions": [], "blocks": []})
+                self._send(404, {"error": "stub/notFound", "message": f"No stub for {method} {parsed.path}"})
+
+            def _tenant_options(self, method: str, parts, body: bytes):
+                if method == "GET" and len(parts) == 1:
+                    with stub._lock:
+                        return self._send(200, dict(stub.options.get(parts[0], {})))
+                if method == "GET" and len(parts) == 2:
+                    with stub._lock:
+                        value = stub.options.get(parts[0], {}).get(parts[1])
+                    if value is None:
+                        return self._send(404, {"error": "options/Not Found"})
+                    return self._send(200, {"category": parts[0], "key": parts[1], "value": value})
+                if method == "POST" and not parts:
+                    option = json.loads(body)
+                    stub.set_option(option["category"], option["key"], option["value"])
+                    return self._send(201, option)
+                if method == "DELETE" and len(parts) == 2:
+                    with stub._lock:
+                        stub.options.get(parts[0], {}).pop(parts[1], None)
+                    return self._send(204, None)
+                self._send(405, {"error": "stub/methodNotAllowed"})
+
+            def _upload_binary(self):
+                size = 0
+                remaining = int(self.headers.get("Content-Length", 0))
+                while remaining > 0:
+                    chunk = self.rfile.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    remaining -= len(chunk)
+                with stub._lock:
+                    stub._next_id += 1
+                    binary_id = str(stub._next_id)
+                    stub.uploaded_bytes += size
+                    stub.binaries[binary_id] = {
+                        "id": binary_id,
+                        "name": f"extension-{binary_id}",
+                        "type": "application/zip",
+                        "length": size,
+                        "pas_extension": f"extension-{binary_id}",
+                    }
+                    managed_object = dict(stub.binaries[binary_id])
+                self._send(201, managed_object)
+
+            def _read_body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _send(self, status: int, body: Optional[Dict]):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                if body is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -0,0 +1,237 @@
+"""
+Local stand-in for the GitHub Content API, used by the benchmarks.
+
+Serves a synthetic repository tree below /repos/<owner>/<repo>/contents, the raw
+file bodies below /raw and the tree as tarball, with a configurable per-request
+latency. Responses carry an ETag and honour If-None-Match. With a rate limit,
+answers carry X-RateLimit-* headers per Authorization header and requests beyond
+the limit of the window are answered with 403, like GitHub does.
+
+Run the service with GITHUB_WEB_URL and GITHUB_API_URL set to base_url, so the
+web URLs of web_url() are mapped to the Content API of the stub.
+"""
+import hashlib
+import io
+import json
+import sys
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+OWNER = "stub-owner"
+REPO = "stub-repo"
+REF = "main"
+COMMIT_SHA = "0123456789abcdef0123456789abcdef01234567"
+ROOT_PATH = "repository/blocks"
+
+MONITOR_TEMPLATE = """/*
+ * Generated monitor {index}
+ */
+package apamax.analyticsbuilder.stub;
+
+using apama.analyticsbuilder.BlockBase;
+
+/**
+ * Stub Block {index}.
+ *
+ * Block generated by the benchmark stub.
+ *
+ * @$blockCategory Calculations
+ */
+event StubBlock{index} {{
+	BlockBase $base;
+}}
+"""
+
+
+def build_tree(files: int, dirs: int, file_size: int = 0) -> Dict[str, bytes]:
+    """Create a flat map of repository path to content, spread over `dirs` sub directories"""
+    tree = {}
+    for index in range(files):
+        folder = ROOT_PATH if dirs == 0 else f"{ROOT_PATH}/dir{index % (dirs + 1)}"
+        if folder.endswith("dir0"):
+            folder = ROOT_PATH
+        content = MONITOR_TEMPLATE.format(index=index)
+        if file_size > len(content):
+            content += "// " + "x" * (file_size - len(content) - 4) + "\n"
+        tree[f"{folder}/StubBlock{index}.mon"] = content.encode()
+    return tree
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients that stop reading early reset the connection, that is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubGitHubServer:
+    """Threaded HTTP server serving a synthetic repository tree"""
+
+    def __init__(
+        self,
+        files: int = 100,
+        dirs: int = 4,
+        latency: float = 0.02,
+        file_size: int = 0,
+        rate_limit: Optional[int] = None,
+        rate_limit_window: float = 3600,
+    ):
+        self.tree = build_tree(files, dirs, file_size)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.rate_limited_count = 0
+        # Authorization header -> (reset time, remaining requests)
+        self._budgets: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def contents_url(self, path: str = ROOT_PATH) -> str:
+        return f"{self.base_url}/repos/{OWNER}/{REPO}/contents/{path}?ref={REF}"
+
+    def web_url(self, path: str = ROOT_PATH) -> str:
+        return f"{self.base_url}/{OWNER}/{REPO}/tree/{REF}/{path}"
+
+    def _take_budget(self, authorization: str) -> Tuple[bool, Dict[str, str]]:
+        """Count a request against the budget of its token, returns if it is allowed and the rate limit headers"""
+        if self.rate_limit is None:
+            return True, {}
+        now = time.time()
+        with self._lock:
+            reset, remaining = self._budgets.get(authorization, (0, 0))
+            if reset <= now:
+                reset, remaining = now + self.rate_limit_window, self.rate_limit
+            allowed = remaining > 0
+            if allowed:
+                remaining -= 1
+            else:
+                self.rate_limited_count += 1
+            self._budgets[authorization] = (reset, remaining)
+        return allowed, {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(reset)),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def start(self) -> "StubGitHubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubGitHubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _list_dir(self, path: str):
+        entries = {}
+        prefix = f"{path}/"
+        for file_path in self.tree:
+            if not file_path.startswith(prefix):
+                continue
+            name = file_path[len(prefix):].split("/", 1)[0]
+            child = f"{prefix}{name}"
+            entries[name] = {
+                "name": name,
+                "path": child,
+                "sha": str(abs(hash(child))),
+                "type": "dir" if child not in self.tree else "file",
+                "url": self.contents_url(child),
+                "download_url": f"{self.base_url}/raw/{child}" if child in self.tree else None,
+            }
+        return [entries[name] for name in sorted(entries)]
+
+    def _tarball(self) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            prefix = f"{OWNER}-{REPO}-{COMMIT_SHA[:7]}"
+            for path, content in sorted(self.tree.items()):
+                info = tarfile.TarInfo(f"{prefix}/{path}")
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+        return buffer.getvalue()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive, like GitHub does
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                time.sleep(stub.latency)
+                allowed, self.rate_limit_headers = stub._take_budget(self.headers.get("Authorization", ""))
+                if not allowed:
+                    return self._send(403, b'{"message": "API rate limit exceeded"}', "application/json")
+                parsed = urlparse(self.path)
+                contents_prefix = f"/repos/{OWNER}/{REPO}/contents/"
+
+                if parsed.path == f"/repos/{OWNER}/{REPO}/commits/{REF}":
+                    return self._send(200, COMMIT_SHA.encode(), "text/plain")
+                if parsed.path == f"/repos/{OWNER}/{REPO}/tarball/{COMMIT_SHA}":
+                    return self._send(200, stub._tarball(), "application/x-gzip")
+                if parsed.path.startswith("/raw/"):
+                    path = parsed.path[len("/raw/"):]
+                    if path in stub.tree:
+                        return self._send(200, stub.tree[path], "text/plain")
+                elif parsed.path.startswith(contents_prefix):
+                    path = parsed.path[len(contents_prefix):].rstrip("/")
+                    if parse_qs(parsed.query).get("ref", [REF])[0] == REF:
+                        if path in stub.tree:
+                            return self._send(200, stub.tree[path], "text/plain")
+                        listing = stub._list_dir(path)
+                        if listing:
+                            return self._send(200, json.dumps(listing).encode(), "application/json")
+                self._send(404, b'{"message": "Not Found"}', "application/json")
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    with stub._lock:
+                        stub.not_modified_count += 1
+                    self.send_response(304)
+                    self._send_rate_limit_headers()
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self._send_rate_limit_headers()
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 200:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_rate_limit_headers(self):
+                for name, value in self.rate_limit_headers.items():
+                    self.send_header(name, value)
+
+        return Handler
@@ -0,0 +1,115 @@
+"""
+Benchmark for the overhead of request tracing: the cost of one span with
+tracing disabled, outside of a sampled trace and exported to a file, and the
+duration of a tree download (one span per listing and file) and of
+/repository/content requests with tracing off, sampled out and on.
+
+    python benchmark/tracing_benchmark.py --spans 100000 --files 200 --requests 500
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# The service module needs a bootstrap tenant, it is not contacted
+os.environ.setdefault("C8Y_BASEURL", "http://127.0.0.1:1")
+os.environ.setdefault("C8Y_BOOTSTRAP_TENANT", "t1")
+os.environ.setdefault("C8Y_BOOTSTRAP_USER", "user")
+os.environ.setdefault("C8Y_BOOTSTRAP_PASSWORD", "password")
+
+import tracing  # noqa: E402
+from stub_github import StubGitHubServer  # noqa: E402
+
+MODES = ["off", "sampled-out", "on"]
+
+
+def configure(mode: str, trace_file: str) -> None:
+    tracing.TRACING_ENABLED = mode != "off"
+    tracing.TRACE_SAMPLE_RATE = 1.0 if mode == "on" else 0.0
+    tracing.exporter.file = trace_file
+
+
+def span_cost(count: int) -> float:
+    """Microseconds per span, the spans are children of one request trace"""
+    root = tracing.start_trace("benchmark")
+    start = time.perf_counter()
+    for _ in range(count):
+        with tracing.span("child", "CLIENT", url="http://example.com"):
+            pass
+    elapsed = time.perf_counter() - start
+    tracing.end_trace(root)
+    return elapsed / count * 1_000_000
+
+
+def download(server: StubGitHubServer, runs: int) -> float:
+    """Milliseconds per tree download"""
+    from github_downloader import GitHubDownloader
+
+    elapsed = 0.0
+    for _ in range(runs):
+        work_dir = tempfile.mkdtemp()
+        root = tracing.start_trace("benchmark")
+        start = time.perf_counter()
+        GitHubDownloader({}, work_dir).download(server.contents_url())
+        elapsed += time.perf_counter() - start
+        tracing.end_trace(root)
+        shutil.rmtree(work_dir)
+    return elapsed / runs * 1000
+
+
+def content_requests(server: StubGitHubServer, count: int) -> float:
+    """Milliseconds per /repository/content request through the Flask app"""
+    import flask_wrapper
+
+    client = flask_wrapper.app.test_client()
+    monitor = next(iter(server.tree))
+    path = "/repository/content?url=" + urllib.parse.quote(f"{server.base_url}/raw/{monitor}", safe="")
+    start = time.perf_counter()
+    for _ in range(count):
+        assert client.get(path).status_code == 200
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--spans", type=int, default=100000, help="spans per mode in the span benchmark")
+    parser.add_argument("--files", type=int, default=200, help="files of the downloaded tree")
+    parser.add_argument("--runs", type=int, default=5, help="tree downloads per mode")
+    parser.add_argument("--requests", type=int, default=500, help="/repository/content requests per mode")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    trace_dir = tempfile.mkdtemp()
+    trace_file = os.path.join(trace_dir, "spans.jsonl")
+    try:
+        with StubGitHubServer(files=args.files, dirs=4, latency=0) as server:
+            # Warm up connections and imports
+            configure("off", trace_file)
+            download(server, 1)
+            content_requests(server, 10)
+
+            print(f"{'mode':<12} {'span':>10} {'download':>12} {'content':>12}")
+            for mode in MODES:
+                configure(mode, trace_file)
+                per_span = span_cost(args.spans)
+                tracing.exporter.flush(30)
+                per_download = download(server, args.runs)
+                per_request = content_requests(server, args.requests)
+                tracing.exporter.flush(30)
+                print(f"{mode:<12} {per_span:7.2f} us {per_download:9.1f} ms {per_request:9.3f} ms")
+        with open(trace_file) as f:
+            spans = sum(1 for _ in f)
+        stats = tracing.exporter.stats()
+        print(f"exported {stats['exported']} spans ({spans} lines), dropped {stats['dropped']}")
+    finally:
+        shutil.rmtree(trace_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark for the peak memory of delivering a built extension: returning it
+as file (read into memory vs. streamed from disk) and uploading it as inventory
+binary (c8y_api Binary.create() vs. the streamed multipart body), each scenario
+in a fresh process so its peak RSS is measured alone.
+
+    python benchmark/upload_benchmark.py --size 104857600 --concurrency 4
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCENARIOS = ["return-buffered", "return-streamed", "upload-binary-create", "upload-streamed"]
+
+
+class _DiscardHandler(BaseHTTPRequestHandler):
+    """Stand-in for the inventory binary API, reads and drops the body"""
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+        body = json.dumps({"id": "4711"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def return_file(path: str, streamed: bool):
+    from flask import Flask, send_file
+
+    app = Flask(__name__)
+
+    @app.route("/extension")
+    def extension():
+        if streamed:
+            return send_file(path, mimetype="application/zip", as_attachment=True, download_name="x.zip")
+        with open(path, "rb") as extension_zip:
+            return send_file(
+                io.BytesIO(extension_zip.read()),
+                mimetype="application/zip",
+                as_attachment=True,
+                download_name="x.zip",
+            )
+
+    client = app.test_client()
+
+    def run():
+        response = client.get("/extension", buffered=False)
+        received = sum(len(chunk) for chunk in response.iter_encoded())
+        response.close()
+        assert received == os.path.getsize(path), received
+
+    return run
+
+
+def upload_file(path: str, streamed: bool):
+    from c8y_api import CumulocityApi
+    from c8y_api.model import Binary
+
+    from c8y_agent import C8YAgent, post_binary
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DiscardHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    tenant = CumulocityApi(f"http://127.0.0.1:{server.server_port}", "t1", "user", "password")
+
+    def run():
+        with open(path, "rb") as extension_zip:
+            binary = Binary(c8y=tenant, type="application/zip", name="x", pas_extension="x")
+            if streamed:
+                post_binary(tenant, C8YAgent.PATHS["INVENTORY_BINARIES"], binary, extension_zip)
+            else:
+                binary.file = extension_zip
+                binary.create()
+
+    return run
+
+
+def run_scenario(scenario: str, path: str, concurrency: int):
+    kind, _, variant = scenario.partition("-")
+    streamed = variant == "streamed"
+    run = (return_file if kind == "return" else upload_file)(path, streamed)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(
+        json.dumps(
+            {
+                "baseline": baseline,
+                "peak": peak_rss_mb(),
+                "seconds": time.perf_counter() - start,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=64 * 1024 * 1024, help="size of the extension zip in bytes")
+    parser.add_argument("--concurrency", type=int, default=4, help="builds delivered at the same time")
+    parser.add_argument("--scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_scenario(args.scenario, args.file, args.concurrency)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".zip") as extension_zip:
+        for _ in range(0, args.size, 1024 * 1024):
+            extension_zip.write(os.urandom(min(1024 * 1024, args.size - extension_zip.tell())))
+        extension_zip.flush()
+        print(f"extension {args.size / 1024 / 1024:.0f} MB, {args.concurrency} concurrent builds")
+        for scenario in SCENARIOS:
+            output = subprocess.run(
+                [
+                    sys.executable, __file__,
+                    "--scenario", scenario,
+                    "--file", extension_zip.name,
+                    "--concurrency", str(args.concurrency),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            growth = result["peak"] - result["baseline"]
+            print(
+                f"{scenario:<22} peak RSS {result['peak']:8.1f} MB   "
+                f"+{growth:7.1f} MB ({growth / args.concurrency:6.1f} MB per build)   {result['seconds']:6.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
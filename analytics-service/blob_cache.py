@@ -0,0 +1,236 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("blob_cache")
+logger.setLevel(logging.INFO)
+
+BLOB_CACHE_DIR = os.getenv(
+    "BLOB_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "analytics-ext-service", "blobs"),
+)
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a cached directory listing or resolved ref is served without asking GitHub
+BLOB_CACHE_LISTING_TTL = int(os.getenv("BLOB_CACHE_LISTING_TTL", "60"))
+# Seconds after which a temporary file is taken as left over from a crashed write and removed
+BLOB_CACHE_TMP_MAX_AGE = int(os.getenv("BLOB_CACHE_TMP_MAX_AGE", "3600"))
+
+
+class BlobCache:
+    """
+    Size bounded, persistent LRU cache for content downloaded from repositories.
+
+    Entries are stored as files below <root_dir>/<namespace>/, one namespace per
+    tenant, so content never mixes between tenants. The index is rebuilt from the
+    directory on startup, using the access time of the files as recency.
+
+    The index and max_bytes are per process. Gunicorn workers sharing root_dir
+    each bound the entries they know to max_bytes, so the directory holds up to
+    WEB_WORKERS * max_bytes. Lookups check the file itself: entries another
+    worker stored are adopted, entries it evicted are dropped.
+    """
+
+    def __init__(self, root_dir: str = BLOB_CACHE_DIR, max_bytes: int = BLOB_CACHE_MAX_BYTES):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # relative path -> size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self._load()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Build a cache key from its parts, e.g. URL and blob SHA"""
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[bytes]:
+        """
+        Return the cached content or None.
+
+        Args:
+            namespace (str): Tenant the entry belongs to
+            key (str): Key as returned by key()
+            max_age (float, optional): Ignore entries stored more than max_age seconds ago
+        """
+        path = self.get_path(namespace, key, max_age)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_path(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[str]:
+        """Like get(), but return the path of the cached file instead of its content"""
+        relative_path = self._relative_path(namespace, key)
+        path = os.path.join(self.root_dir, relative_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        with self._lock:
+            stats = self._namespace_stats(namespace)
+            if stat is None:
+                # Evicted by another worker sharing the directory, if it was known
+                self._size -= self._entries.pop(relative_path, 0)
+                stats["misses"] += 1
+                return None
+            if max_age is not None and time.time() - stat.st_mtime > max_age:
+                stats["misses"] += 1
+                return None
+            if relative_path not in self._entries:
+                # Stored by another worker sharing the directory
+                self._entries[relative_path] = stat.st_size
+                self._size += stat.st_size
+                self._evict()
+                if relative_path not in self._entries:
+                    stats["misses"] += 1
+                    return None
+            stats["hits"] += 1
+            self._entries.move_to_end(relative_path)
+        try:
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            return None
+        return path
+
+    def put(self, namespace: str, key: str, content: bytes) -> None:
+        """Store content, evicting least recently used entries if the cache is full"""
+        self._store(namespace, key, lambda f: f.write(content))
+
+    def put_file(self, namespace: str, key: str, source_path: str) -> None:
+        """Store a copy of a file, see put()"""
+
+        def copy(f):
+            with open(source_path, "rb") as source:
+                shutil.copyfileobj(source, f)
+
+        self._store(namespace, key, copy)
+
+    def delete(self, namespace: str, key: str) -> bool:
+        """Remove an entry, return True if it existed"""
+        relative_path = self._relative_path(namespace, key)
+        with self._lock:
+            size = self._entries.pop(relative_path, None)
+            if size is None:
+                return False
+            self._size -= size
+        self._remove(relative_path)
+        return True
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """Remove all entries, or only those of a namespace, return the number removed"""
+        prefix = self._namespace_dir(namespace) + os.sep if namespace is not None else ""
+        with self._lock:
+            removed = [path for path in self._entries if path.startswith(prefix)]
+            for relative_path in removed:
+                self._size -= self._entries.pop(relative_path)
+        for relative_path in removed:
+            self._remove(relative_path)
+        return len(removed)
+
+    def stats(self, namespace: Optional[str] = None) -> Dict:
+        """Return hit/miss counters and size, limited to a namespace if given"""
+        with self._lock:
+            result = {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "maxBytes": self.max_bytes,
+                "evictions": self.evictions,
+                "hits": sum(s["hits"] for s in self._stats.values()),
+                "misses": sum(s["misses"] for s in self._stats.values()),
+            }
+            if namespace is not None:
+                prefix = self._namespace_dir(namespace) + os.sep
+                entries = [size for path, size in self._entries.items() if path.startswith(prefix)]
+                result["namespace"] = {
+                    "name": namespace,
+                    "entries": len(entries),
+                    "bytes": sum(entries),
+                    **self._stats.get(namespace, {"hits": 0, "misses": 0}),
+                }
+            return result
+
+    def _store(self, namespace: str, key: str, write) -> None:
+        relative_path = self._relative_path(namespace, key)
+        path = os.path.join(self.root_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, readers never see partial content
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            size = os.path.getsize(temp_path)
+            if size > self.max_bytes:
+                os.remove(temp_path)
+                return
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            self._size -= self._entries.pop(relative_path, 0)
+            self._entries[relative_path] = size
+            self._size += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            relative_path, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            self._remove(relative_path)
+
+    def _remove(self, relative_path: str) -> None:
+        try:
+            os.remove(os.path.join(self.root_dir, relative_path))
+        except OSError:
+            pass
+
+    def _load(self) -> None:
+        found: List[Tuple[float, str, int]] = []
+        if os.path.isdir(self.root_dir):
+            for root, _, files in os.walk(self.root_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                        if name.endswith(".tmp"):
+                            # Other workers sharing the directory may still be writing recent ones
+                            if time.time() - stat.st_mtime > BLOB_CACHE_TMP_MAX_AGE:
+                                os.remove(path)
+                            continue
+                    except OSError:
+                        # Evicted or renamed by another worker meanwhile
+                        continue
+                    found.append((stat.st_atime, os.path.relpath(path, self.root_dir), stat.st_size))
+        with self._lock:
+            for _, relative_path, size in sorted(found):
+                self._entries[relative_path] = size
+                self._size += size
+            self._evict()
+        logger.info(f"Blob cache at {self.root_dir} holds {len(self._entries)} entries, {self._size} bytes")
+
+    def _namespace_stats(self, namespace: str) -> Dict[str, int]:
+        return self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+
+    @staticmethod
+    def _namespace_dir(namespace: str) -> str:
+        # Tenant IDs are plain identifiers, anything else must not escape the root
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", namespace or "_default").lstrip(".") or "_default"
+
+    def _relative_path(self, namespace: str, key: str) -> str:
+        return os.path.join(self._namespace_dir(namespace), key[:2], key)
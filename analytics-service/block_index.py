@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from blob_cache import BlobCache
+from epl_parser import parse_epl_header
+from github_downloader import fetch_files, list_tree
+from solution_utils import TtlCache
+
+logger = logging.getLogger("block_index")
+logger.setLevel(logging.INFO)
+
+# Seconds a stored index is served before it is revalidated against the repository
+BLOCK_INDEX_MAX_AGE = int(os.getenv("BLOCK_INDEX_MAX_AGE", "300"))
+# Indexes kept in memory, the others are read from the blob cache again
+BLOCK_INDEX_MAX_ENTRIES = int(os.getenv("BLOCK_INDEX_MAX_ENTRIES", "64"))
+
+_FIELD = re.compile(
+    r"(?:/\*\*(?P<doc>(?:(?!\*/).)*)\*/\s*)?"
+    r"(?P<constant>constant\s+)?(?P<type>[\w.]+(?:<[^;{}]*?>)?)\s+(?P<name>[\w$]+)"
+    r"\s*(?::=\s*(?P<value>[^;]+))?;",
+    re.S,
+)
+
+
+def _doc_lines(doc: str) -> List[str]:
+    return [line.strip().lstrip("*").strip() for line in doc.splitlines()]
+
+
+def _parse_doc(doc: str) -> Dict[str, Optional[str]]:
+    """Split a block doc comment into title, description and category"""
+    lines = _doc_lines(doc)
+    text = [line for line in lines if not line.startswith("@")]
+    paragraphs = " ".join(line if line else "\n" for line in text).split("\n")
+    paragraphs = [paragraph.strip() for paragraph in paragraphs if paragraph.strip()]
+    category = next(
+        (line[len("@$blockCategory"):].strip() for line in lines if line.startswith("@$blockCategory")),
+        None,
+    )
+    return {
+        "title": paragraphs[0].rstrip(".") if paragraphs else None,
+        "description": "\n".join(paragraphs[1:]) or None,
+        "category": category,
+    }
+
+
+def _event_body(monitor: str, event_name: str) -> Optional[str]:
+    match = re.search(rf"\bevent\s+{re.escape(event_name)}\s*\{{", monitor)
+    if not match:
+        return None
+    depth, start = 1, match.end()
+    for position in range(start, len(monitor)):
+        if monitor[position] == "{":
+            depth += 1
+        elif monitor[position] == "}":
+            depth -= 1
+            if depth == 0:
+                return monitor[start:position]
+    return None
+
+
+def parse_block_metadata(monitor: str, file_name: str) -> Dict:
+    """
+    Extract the metadata of the block defined in an EPL monitor.
+
+    Args:
+        monitor (str): Source of the monitor
+        file_name (str): Name of the monitor file, used to identify the block event
+
+    Returns:
+        dict with package, name, fqn, title, description, category, the names of
+        the events declared up to the block and the parameters of the block
+    """
+    header = parse_epl_header([monitor])
+    package = header.package
+    events = header.events
+
+    # The block is the documented event carrying a category, else the one named like the file
+    block_name = header.block_name
+    if not block_name:
+        stem = os.path.splitext(file_name)[0]
+        block_name = stem if stem in events else next(
+            (name for name in events if "$" not in name), stem
+        )
+
+    metadata = {
+        "package": package,
+        "name": block_name,
+        "fqn": f"{package}.{block_name}" if package else block_name,
+        "events": events,
+        **_parse_doc(header.block_doc or ""),
+        "parameters": [],
+    }
+
+    body = _event_body(monitor, f"{block_name}_$Parameters")
+    if body:
+        for match in _FIELD.finditer(body):
+            doc = _parse_doc(match.group("doc") or "")
+            parameter = {
+                "name": match.group("name"),
+                "type": match.group("type"),
+                "title": doc["title"],
+                "description": doc["description"],
+                "constant": bool(match.group("constant")),
+            }
+            if match.group("value"):
+                parameter["value"] = match.group("value").strip()
+            metadata["parameters"].append(parameter)
+    return metadata
+
+
+class BlockIndex:
+    """
+    Block metadata index per repository and ref.
+
+    The index is persisted in the blob cache, in the namespace of the tenant. It
+    is rebuilt incrementally: only monitors whose blob SHA changed since the last
+    build are downloaded and parsed again.
+    """
+
+    def __init__(self, cache: BlobCache, max_age: int = BLOCK_INDEX_MAX_AGE, max_entries: int = BLOCK_INDEX_MAX_ENTRIES):
+        self.cache = cache
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # (namespace, content API URL) -> index, saves reading the cache on every call
+        self._indexes = TtlCache(max_age, max_entries)
+        # (namespace, content API URL) -> [lock, requests using it], only while a build runs or waits
+        self._build_locks: Dict[tuple, list] = {}
+
+    def get(
+        self,
+        namespace: str,
+        repository_id: str,
+        content_api_url: str,
+        headers: Dict[str, str],
+        refresh: bool = False,
+    ) -> Dict:
+        """
+        Return the index of a repository, rebuilding it if it is older than max_age.
+
+        Args:
+            namespace (str): Tenant the repository belongs to
+            repository_id (str): ID of the repository
+            content_api_url (str): Content API URL of the repository folder, including the ref
+            headers (dict): Headers to include in the GitHub requests
+            refresh (bool): Rebuild even if the stored index is recent
+        """
+        key = (namespace, content_api_url)
+        index = self._load(key)
+        if index and not refresh and self._recent(index):
+            return index
+
+        with self._building(key):
+            # Another request may have finished the build while we were waiting
+            current = self._load(key)
+            if current and not refresh and self._recent(current):
+                return current
+            index = self._build(repository_id, content_api_url, headers, current)
+            self._store(key, index)
+            return index
+
+    def _build(
+        self, repository_id: str, content_api_url: str, headers: Dict[str, str], previous: Optional[Dict]
+    ) -> Dict:
+        start = time.perf_counter()
+        known = {block["path"]: block for block in (previous or {}).get("blocks", [])}
+        items = [
+            item
+            for item in list_tree(content_api_url, headers)
+            if item.get("name", "").lower().endswith(".mon")
+        ]
+
+        blocks, changed = [], []
+        for item in items:
+            block = known.get(item["path"])
+            if block and block.get("sha") == item.get("sha"):
+                blocks.append(block)
+            else:
+                changed.append(item)
+
+        for item, (url, content, error) in zip(
+            changed, fetch_files([item["url"] for item in changed], headers)
+        ):
+            block = {"path": item["path"], "url": url, "sha": item.get("sha"), "file": item["name"]}
+            if content is None:
+                block["error"] = str(error)
+            else:
+                block.update(parse_block_metadata(content.decode("utf-8", errors="replace"), item["name"]))
+            blocks.append(block)
+
+        blocks.sort(key=lambda block: block["path"])
+        logger.info(
+            f"Built block index for {content_api_url}: {len(blocks)} blocks, "
+            f"{len(changed)} parsed, {time.perf_counter() - start:.3f}s"
+        )
+        return {
+            "repositoryId": repository_id,
+            "url": content_api_url,
+            "builtAt": time.time(),
+            "parsed": len(changed),
+            "blocks": blocks,
+        }
+
+    def _recent(self, index: Dict) -> bool:
+        return time.time() - index["builtAt"] <= self.max_age
+
+    def _load(self, key: tuple) -> Optional[Dict]:
+        index = self._indexes.get(key)
+        if index is None:
+            content = self.cache.get(key[0], BlobCache.key("index", key[1]))
+            if content is not None:
+                index = json.loads(content)
+                self._indexes.put(key, index)
+        return index
+
+    def _store(self, key: tuple, index: Dict) -> None:
+        self.cache.put(key[0], BlobCache.key("index", key[1]), json.dumps(index).encode())
+        self._indexes.put(key, index)
+
+    @contextmanager
+    def _building(self, key: tuple) -> Iterator[None]:
+        """Hold the build lock of the index, dropped once no request uses it"""
+        with self._lock:
+            entry = self._build_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._build_locks[key]
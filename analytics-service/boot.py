@@ -0,0 +1,220 @@
+"""
+Boot sequence of the service and its WSGI entry point, the container serves
+boot:app with gunicorn (gunicorn.conf.py).
+
+Importing this module only loads the standard library, so /health answers as
+soon as the worker runs. A background thread then loads the service in
+measured steps (gevent workers run the core steps at import, imports do not
+yield to the greenlet serving /health):
+
+- core: Flask, requests, prometheus_client and the service modules. Other
+  requests than /health wait for these, at most BOOT_WAIT seconds.
+- warm-up: c8y_api and the Cumulocity app of the agent, PyYAML and the
+  analytics_builder workers. Each of them otherwise loads with the first
+  request needing it, so a failed warm-up step is logged and skipped.
+
+GET /diagnostics/boot reports the seconds and the loaded modules of every
+step. For the import time of single modules start the service with
+PYTHONPROFILEIMPORTTIME=1.
+"""
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("boot")
+logger.setLevel(logging.INFO)
+
+# Seconds a request waits for the core steps before it is answered with 503
+BOOT_WAIT = float(os.getenv("BOOT_WAIT", "60"))
+# Run the warm-up steps once the service is ready, "false" leaves everything to first use
+BOOT_WARMUP = os.getenv("BOOT_WARMUP", "true").lower() == "true"
+# Seconds gevent workers serve requests before the warm-up steps start
+BOOT_WARMUP_DELAY = float(os.getenv("BOOT_WARMUP_DELAY", "1"))
+
+
+def _import(name: str) -> Callable[[], None]:
+    return lambda: importlib.import_module(name)
+
+
+def _warm_agent() -> None:
+    import flask_wrapper
+
+    flask_wrapper.agent.c8y_app
+
+
+def _warm_builder_pool() -> None:
+    from extension_builder import builder_pool
+
+    builder_pool.start()
+
+
+CORE_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("flask", _import("flask")),
+    ("requests", _import("requests")),
+    ("prometheus_client", _import("prometheus_client")),
+    ("service", _import("flask_wrapper")),
+]
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("c8y_api", _warm_agent),
+    ("yaml", _import("yaml")),
+    ("analytics_builder workers", _warm_builder_pool),
+]
+
+
+class Boot:
+    """Runs the boot steps in a background thread and records how long each took"""
+
+    def __init__(
+        self,
+        core_steps: List[Tuple[str, Callable[[], None]]] = CORE_STEPS,
+        warmup_steps: Optional[List[Tuple[str, Callable[[], None]]]] = None,
+    ):
+        self.core_steps = core_steps
+        self.warmup_steps = WARMUP_STEPS if warmup_steps is None else warmup_steps
+        self.state = "loading"
+        self.error: Optional[str] = None
+        self.wsgi_app = None
+        self.steps: List[Dict] = []
+        self.ready_seconds: Optional[float] = None
+        self.warm_seconds: Optional[float] = None
+        self._start = time.perf_counter()
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if _cooperative():
+            # Imports do not yield to other greenlets, /health could not answer before the core steps
+            if self._load():
+                threading.Thread(target=self._warm_up, args=(BOOT_WARMUP_DELAY,), name="boot", daemon=True).start()
+        else:
+            threading.Thread(target=self._run, name="boot", daemon=True).start()
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for the core steps, True if they finished (successfully or not)"""
+        return self._ready.wait(timeout)
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "error": self.error,
+                "readySeconds": self.ready_seconds,
+                "warmSeconds": self.warm_seconds,
+                "steps": list(self.steps),
+            }
+
+    def _run(self) -> None:
+        if self._load():
+            self._warm_up()
+
+    def _load(self) -> bool:
+        """Run the core steps, True if the service is ready"""
+        try:
+            for name, step in self.core_steps:
+                self._step("core", name, step)
+            import flask_wrapper
+
+            self.wsgi_app = flask_wrapper.app
+            with self._lock:
+                self.state = "ready"
+                self.ready_seconds = round(time.perf_counter() - self._start, 3)
+            logger.info(f"Service ready after {self.ready_seconds:.2f}s")
+            return True
+        except BaseException as e:
+            logger.exception("Loading the service failed")
+            with self._lock:
+                self.state = "failed"
+                self.error = f"{type(e).__name__}: {e}"
+            return False
+        finally:
+            self._ready.set()
+
+    def _warm_up(self, delay: float = 0) -> None:
+        # A greenlet would run the warm-up before the worker accepts the first connection
+        time.sleep(delay)
+        if BOOT_WARMUP:
+            for name, step in self.warmup_steps:
+                try:
+                    self._step("warmup", name, step)
+                except Exception as e:
+                    logger.warning(f"Warm-up of {name} failed, it loads on first use: {e}")
+        with self._lock:
+            self.warm_seconds = round(time.perf_counter() - self._start, 3)
+        for step in self.steps:
+            logger.info(f"Boot step {step['phase']}/{step['name']}: {step['seconds']:.3f}s, {step['modules']} modules")
+
+    def _step(self, phase: str, name: str, step: Callable[[], None]) -> None:
+        before = sys.modules.copy()
+        start = time.perf_counter()
+        error = None
+        try:
+            step()
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            loaded = [module for module in sys.modules.copy() if module not in before]
+            with self._lock:
+                self.steps.append(
+                    {
+                        "name": name,
+                        "phase": phase,
+                        "seconds": round(time.perf_counter() - start, 3),
+                        "modules": len(loaded),
+                        "packages": sorted({module.split(".")[0] for module in loaded}),
+                        "error": error,
+                    }
+                )
+            # Under gevent the warm-up runs in a greenlet, let waiting requests in between steps
+            time.sleep(0)
+
+
+def _cooperative() -> bool:
+    """True if the worker is a gevent worker, which patches threading to greenlets"""
+    if "gevent.monkey" not in sys.modules:
+        return False
+    return sys.modules["gevent.monkey"].is_module_patched("threading")
+
+
+def _respond(start_response, status: str, body: Dict, headers: Optional[List[Tuple[str, str]]] = None):
+    payload = json.dumps(body).encode()
+    start_response(
+        status,
+        [("Content-Type", "application/json"), ("Content-Length", str(len(payload)))] + (headers or []),
+    )
+    return [payload]
+
+
+def app(environ, start_response):
+    """WSGI entry point, the Flask app of flask_wrapper once it is loaded"""
+    path = environ.get("PATH_INFO", "")
+    if path == "/diagnostics/boot":
+        return _respond(start_response, "200 OK", boot.report())
+    if boot.wsgi_app is not None:
+        return boot.wsgi_app(environ, start_response)
+    if path == "/health":
+        if boot.state == "failed":
+            return _respond(start_response, "503 Service Unavailable", {"status": "DOWN", "error": boot.error})
+        return _respond(start_response, "200 OK", {"status": "UP"})
+
+    if not boot.wait(BOOT_WAIT):
+        return _respond(
+            start_response,
+            "503 Service Unavailable",
+            {"message": "Error: The service is starting"},
+            [("Retry-After", "1")],
+        )
+    if boot.wsgi_app is None:
+        return _respond(
+            start_response, "503 Service Unavailable", {"message": f"Error: The service failed to start: {boot.error}"}
+        )
+    return boot.wsgi_app(environ, start_response)
+
+
+boot = Boot()
+boot.start()
@@ -51,9 +51,23 @@ mkdir -p "$DIST_DIR"
 cp ./requirements.txt "$BUILD_DIR"
 cp ./flask_wrapper.py "$BUILD_DIR"
 cp ./extension_builder.py "$BUILD_DIR"
+cp ./github_downloader.py "$BUILD_DIR"
 cp ./monitor_downloader.py "$BUILD_DIR"
 cp ./solution_utils.py "$BUILD_DIR"
 cp ./c8y_agent.py "$BUILD_DIR"
+cp ./boot.py "$BUILD_DIR"
+cp ./builder_worker.py "$BUILD_DIR"
+cp ./builder_pool.py "$BUILD_DIR"
+cp ./tracing.py "$BUILD_DIR"
+cp ./metrics.py "$BUILD_DIR"
+cp ./rate_limit.py "$BUILD_DIR"
+cp ./gunicorn.conf.py "$BUILD_DIR"
+cp ./restart_coalescer.py "$BUILD_DIR"
+cp ./extension_jobs.py "$BUILD_DIR"
+cp ./cep_extensions.py "$BUILD_DIR"
+cp ./epl_parser.py "$BUILD_DIR"
+cp ./block_index.py "$BUILD_DIR"
+cp ./blob_cache.py "$BUILD_DIR"
 sed -e "s/{VERSION}/$VERSION/g" ./cumulocity.json > "$BUILD_DIR/cumulocity.json"
 sed -e "s/{SAMPLE}/$NAME/g" ./Dockerfile > "$BUILD_DIR/Dockerfile"
 # extend cumulocity.json is defined
@@ -0,0 +1,409 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import select
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("builder_pool")
+logger.setLevel(logging.INFO)
+
+# Warm analytics_builder workers per service process, 0 runs every build as a cold subprocess
+BUILDER_POOL_SIZE = int(os.getenv("BUILDER_POOL_SIZE", "2"))
+# Builds after which a worker is replaced by a fresh one
+BUILDER_POOL_MAX_BUILDS = int(os.getenv("BUILDER_POOL_MAX_BUILDS", "50"))
+# Seconds a build waits for an idle worker before it runs as cold subprocess
+BUILDER_POOL_WAIT = float(os.getenv("BUILDER_POOL_WAIT", "0.5"))
+# Seconds between health checks of idle workers, a worker must answer a ping within BUILDER_POOL_PING_TIMEOUT
+BUILDER_POOL_HEALTH_INTERVAL = float(os.getenv("BUILDER_POOL_HEALTH_INTERVAL", "30"))
+BUILDER_POOL_PING_TIMEOUT = float(os.getenv("BUILDER_POOL_PING_TIMEOUT", "5"))
+# Seconds a worker may take to load the SDK, and a build (warm or cold) to finish
+BUILDER_POOL_START_TIMEOUT = float(os.getenv("BUILDER_POOL_START_TIMEOUT", "120"))
+BUILDER_POOL_BUILD_TIMEOUT = float(os.getenv("BUILDER_POOL_BUILD_TIMEOUT", "900"))
+# Python script the analytics_builder launcher runs, workers import it once. Without it the
+# entry is read from the launcher (a Python script itself, or the .py it runs), if that
+# fails the pool stays off. The container links it at build time, see Dockerfile.
+ANALYTICS_BUILDER_ENTRY = os.getenv("ANALYTICS_BUILDER_ENTRY")
+# Interpreter of the workers, by default the one the launcher runs the entry with
+BUILDER_POOL_PYTHON = os.getenv("BUILDER_POOL_PYTHON")
+# Script sourced for the environment of the workers, as for an analytics_builder run from an Apama command prompt
+BUILDER_POOL_ENV_SCRIPT = os.getenv(
+    "BUILDER_POOL_ENV_SCRIPT", os.path.join(os.getenv("APAMA_HOME", "/opt/softwareag/Apama"), "bin", "apama_env")
+)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "builder_worker.py")
+
+_PY_SCRIPT = re.compile(r"[\w./-]*\.py\b")
+_PYTHON = re.compile(r"[^\s\"'`=]*python[\d.]*\b")
+
+
+class WorkerError(Exception):
+    """Raised when a worker does not answer as expected, the worker is discarded"""
+
+
+class WorkerUnavailable(WorkerError):
+    """Raised when a worker is gone before it received the request, nothing ran"""
+
+
+class WorkerTimeout(WorkerError):
+    """Raised when a worker does not answer within the timeout"""
+
+
+def find_entry(launcher: str) -> Optional[Tuple[str, str]]:
+    """
+    Find the Python entry script of the analytics_builder launcher and the
+    interpreter it runs with.
+
+    Returns:
+        (interpreter, entry script), None if the launcher does not run a Python script
+    """
+    default_python = BUILDER_POOL_PYTHON or sys.executable
+    if ANALYTICS_BUILDER_ENTRY:
+        entry = os.path.realpath(ANALYTICS_BUILDER_ENTRY)
+        return (default_python, entry) if os.path.isfile(entry) else None
+    try:
+        with open(launcher) as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if lines and lines[0].startswith("#!") and "python" in lines[0]:
+        return default_python, os.path.realpath(launcher)
+
+    launcher_dir = os.path.dirname(os.path.realpath(launcher))
+    for line in lines:
+        if line.lstrip().startswith("#"):
+            continue
+        for match in _PY_SCRIPT.finditer(line):
+            # "$(dirname "$0")/scripts/x.py" and "${SDK}/scripts/x.py" leave the part below the launcher
+            for candidate in (os.path.expandvars(match.group()), os.path.join(launcher_dir, match.group().lstrip("/"))):
+                if os.path.isfile(candidate):
+                    return _interpreter(line[: match.start()]) or default_python, os.path.realpath(candidate)
+    return None
+
+
+def _interpreter(command: str) -> Optional[str]:
+    """The Python interpreter a launcher command line runs, if it names one that exists"""
+    if BUILDER_POOL_PYTHON:
+        return BUILDER_POOL_PYTHON
+    for match in reversed(list(_PYTHON.finditer(command))):
+        python = os.path.expandvars(match.group())
+        python = python if os.path.isabs(python) else shutil.which(python)
+        if python and os.path.isfile(python) and os.access(python, os.X_OK):
+            return python
+    return None
+
+
+def worker_environment(entry: str, launcher: str) -> Dict[str, str]:
+    """
+    Environment of the workers: the one of the service plus what sourcing
+    BUILDER_POOL_ENV_SCRIPT (apama_env) sets, with the directories of the entry
+    script and the launcher in front of PYTHONPATH
+    """
+    env = dict(os.environ)
+    if os.path.isfile(BUILDER_POOL_ENV_SCRIPT):
+        shell = "/bin/bash" if os.path.exists("/bin/bash") else "/bin/sh"
+        try:
+            output = subprocess.run(
+                [shell, "-c", '. "$0" >/dev/null 2>&1; env -0', BUILDER_POOL_ENV_SCRIPT],
+                stdout=subprocess.PIPE,
+                check=True,
+                timeout=60,
+            ).stdout
+            env = dict(item.split("=", 1) for item in output.decode().split("\0") if "=" in item)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Sourcing {BUILDER_POOL_ENV_SCRIPT} failed, workers run with the service environment: {e}")
+    paths = [os.path.dirname(entry), os.path.dirname(os.path.realpath(launcher))]
+    if env.get("PYTHONPATH"):
+        paths.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(dict.fromkeys(paths))
+    return env
+
+
+class BuilderWorker:
+    """A warm builder_worker.py process, see there for the protocol"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, entry: str, python: str, env: Optional[Dict[str, str]] = None):
+        self.entry = entry
+        self.builds = 0
+        self.started = time.time()
+        self.process = subprocess.Popen(
+            [python, WORKER_SCRIPT, entry],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            text=True,
+            bufsize=1,
+        )
+        ready = self._read(BUILDER_POOL_START_TIMEOUT)
+        if not ready.get("ready"):
+            self.close()
+            raise WorkerError(f"Builder worker did not start: {ready}")
+        self.warmup_seconds = ready.get("warmupSeconds")
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def build(self, argv: List[str], cwd: str, timeout: float = BUILDER_POOL_BUILD_TIMEOUT) -> int:
+        """Run a build, returns the exit code of analytics_builder"""
+        self.builds += 1
+        answer = self._call({"argv": argv, "cwd": cwd}, timeout)
+        return answer["returncode"]
+
+    def ping(self, timeout: float = BUILDER_POOL_PING_TIMEOUT) -> bool:
+        try:
+            return bool(self._call({"ping": True}, timeout).get("pong"))
+        except WorkerError:
+            return False
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _call(self, request: Dict, timeout: float) -> Dict:
+        request_id = next(self._ids)
+        if self.process.poll() is not None:
+            raise WorkerUnavailable(f"Builder worker {self.pid} exited with {self.process.returncode}")
+        try:
+            self.process.stdin.write(json.dumps({"id": request_id, **request}) + "\n")
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise WorkerUnavailable(f"Builder worker {self.pid} is gone: {e}")
+        answer = self._read(timeout)
+        if answer.get("id") != request_id:
+            raise WorkerError(f"Builder worker {self.pid} answered out of order: {answer}")
+        return answer
+
+    def _read(self, timeout: float) -> Dict:
+        # Answers are single lines written at once, once readable the line is complete
+        readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not readable:
+            raise WorkerTimeout(f"Builder worker {self.pid} did not answer within {timeout:.0f}s")
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerError(f"Builder worker {self.pid} exited with {self.process.wait()}")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError(f"Builder worker {self.pid} answered {line!r}")
+
+
+class BuilderPool:
+    """
+    Pool of warm analytics_builder workers. A build takes an idle worker, if none
+    frees up within BUILDER_POOL_WAIT, or the pool is off, it runs analytics_builder
+    as cold subprocess like before. Workers are replaced after max_builds builds,
+    when they fail and when they miss a health check.
+    """
+
+    def __init__(
+        self,
+        launcher: str,
+        size: int = BUILDER_POOL_SIZE,
+        max_builds: int = BUILDER_POOL_MAX_BUILDS,
+        wait: float = BUILDER_POOL_WAIT,
+        health_interval: float = BUILDER_POOL_HEALTH_INTERVAL,
+    ):
+        self.launcher = launcher
+        self.size = size if hasattr(os, "fork") else 0
+        self.max_builds = max_builds
+        self.wait = wait
+        self.health_interval = health_interval
+        self.entry: Optional[str] = None
+        self.python: Optional[str] = None
+        self.env: Optional[Dict[str, str]] = None
+        self._idle: "queue.Queue[BuilderWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._starting = 0
+        self._busy = 0
+        self.warm_builds = 0
+        self.cold_builds = 0
+        self.recycled = 0
+        self.failed = 0
+        self.start_failures = 0
+
+    def start(self) -> None:
+        """Start the workers in the background, builds run cold until they are ready"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        if self.size <= 0:
+            return
+        found = find_entry(self.launcher)
+        if found is None:
+            logger.warning(
+                f"No Python entry script found for {self.launcher}, builds run as subprocess. "
+                "Set ANALYTICS_BUILDER_ENTRY to use warm workers."
+            )
+            return
+        self.python, entry = found
+        self.env = worker_environment(entry, self.launcher)
+        self.entry = entry
+        for _ in range(self.size):
+            self._spawn()
+        if self.health_interval > 0:
+            threading.Thread(target=self._check_health, name="builder-health", daemon=True).start()
+
+    def run(self, argv: List[str], cwd: Optional[str] = None) -> bool:
+        """
+        Run analytics_builder with the arguments on a warm worker, or as cold subprocess.
+
+        Returns:
+            True if the build ran on a warm worker
+
+        Raises:
+            subprocess.CalledProcessError: If analytics_builder fails, as subprocess.run(check=True) does
+            subprocess.TimeoutExpired: If the build takes longer than BUILDER_POOL_BUILD_TIMEOUT
+        """
+        self.start()
+        cwd = cwd or os.getcwd()
+        command = [self.launcher] + argv
+        worker = self._acquire()
+        if worker is not None:
+            try:
+                returncode = worker.build(argv, cwd)
+            except WorkerUnavailable as e:
+                # The build never started, run it cold instead
+                logger.warning(f"{e}, running the build as subprocess")
+                self._discard(worker)
+            except WorkerTimeout as e:
+                # Running the build again would take as long, closing the worker stops it
+                logger.warning(str(e))
+                self._discard(worker)
+                raise subprocess.TimeoutExpired(command, BUILDER_POOL_BUILD_TIMEOUT) from e
+            except WorkerError as e:
+                logger.warning(str(e))
+                self._discard(worker)
+                raise subprocess.CalledProcessError(worker.process.returncode or 1, command) from e
+            else:
+                with self._lock:
+                    self.warm_builds += 1
+                self._release(worker)
+                if returncode != 0:
+                    raise subprocess.CalledProcessError(returncode, command)
+                return True
+
+        with self._lock:
+            self.cold_builds += 1
+        subprocess.run(command, cwd=cwd, check=True, timeout=BUILDER_POOL_BUILD_TIMEOUT)
+        return False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "entry": self.entry,
+                "python": self.python,
+                "idle": self._idle.qsize(),
+                "busy": self._busy,
+                "starting": self._starting,
+                "maxBuilds": self.max_builds,
+                "warmBuilds": self.warm_builds,
+                "coldBuilds": self.cold_builds,
+                "recycled": self.recycled,
+                "failed": self.failed,
+                "startFailures": self.start_failures,
+            }
+
+    def _acquire(self) -> Optional[BuilderWorker]:
+        if self.entry is None:
+            return None
+        try:
+            worker = self._idle.get(timeout=self.wait)
+        except queue.Empty:
+            return None
+        with self._lock:
+            self._busy += 1
+        return worker
+
+    def _release(self, worker: BuilderWorker) -> None:
+        with self._lock:
+            self._busy -= 1
+        if worker.builds >= self.max_builds:
+            with self._lock:
+                self.recycled += 1
+            logger.info(f"Recycling builder worker {worker.pid} after {worker.builds} builds")
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+
+    def _discard(self, worker: BuilderWorker) -> None:
+        with self._lock:
+            self._busy -= 1
+            self.failed += 1
+        self._replace(worker)
+
+    def _replace(self, worker: BuilderWorker) -> None:
+        worker.close()
+        self._spawn()
+
+    def _spawn(self) -> None:
+        with self._lock:
+            self._starting += 1
+        threading.Thread(target=self._start_worker, name="builder-start", daemon=True).start()
+
+    def _start_worker(self) -> None:
+        try:
+            worker = BuilderWorker(self.entry, self.python, self.env)
+            logger.info(f"Builder worker {worker.pid} ready after {worker.warmup_seconds:.1f}s")
+            self._idle.put(worker)
+        except Exception as e:
+            # The pool shrinks, the next health check starts a replacement
+            logger.warning(f"Starting a builder worker failed: {e}")
+            with self._lock:
+                self.start_failures += 1
+        finally:
+            with self._lock:
+                self._starting -= 1
+
+    def _check_health(self) -> None:
+        while True:
+            time.sleep(self.health_interval)
+            # One worker at a time is out of the pool, builds meanwhile take the others
+            for _ in range(self._idle.qsize()):
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if worker.ping():
+                    self._idle.put(worker)
+                else:
+                    logger.warning(f"Builder worker {worker.pid} failed its health check, replacing it")
+                    with self._lock:
+                        self.failed += 1
+                    self._replace(worker)
+            # Top up after failed starts
+            with self._lock:
+                missing = self.size - self._idle.qsize() - self._starting - self._busy
+            for _ in range(max(missing, 0)):
+                self._spawn()
+
+
+if __name__ == "__main__":
+    # Used by the Dockerfile: python builder_pool.py <launcher> prints the entry script, nothing without one
+    found = find_entry(sys.argv[1])
+    if found is None:
+        print(f"No Python entry script found for {sys.argv[1]}, builds run as subprocess", file=sys.stderr)
+    else:
+        print(found[1])
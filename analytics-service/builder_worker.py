@@ -0,0 +1,88 @@
+"""
+Warm analytics_builder worker, started by builder_pool.BuilderPool:
+
+    python builder_worker.py <analytics_builder Python entry script>
+
+The entry script is imported once, so the interpreter and the modules of the
+SDK are loaded before the first build. Every build then runs the entry script
+as __main__ in a forked child, which starts with the warm modules and keeps
+builds from sharing state (globals, working directory, exit).
+
+Requests and answers are JSON lines on stdin and stdout:
+
+    {"id": 1, "argv": ["build", "extension", ...], "cwd": "/tmp"} -> {"id": 1, "returncode": 0}
+    {"id": 2, "ping": true}                                       -> {"id": 2, "pong": true}
+
+Anything the entry script prints goes to stderr. The worker exits when stdin
+is closed. It only depends on the standard library, so it runs with the Python
+of the SDK.
+"""
+import json
+import os
+import runpy
+import signal
+import sys
+import time
+import traceback
+
+_child = 0
+
+
+def _terminate(signum, frame):
+    # A build in progress ends with the worker
+    if _child:
+        try:
+            os.kill(_child, signal.SIGKILL)
+        except OSError:
+            pass
+    os._exit(128 + signum)
+
+
+def _build(entry: str, argv, cwd: str) -> int:
+    global _child
+    _child = os.fork()
+    if _child == 0:
+        code = 1
+        try:
+            os.chdir(cwd)
+            sys.argv = [entry] + list(argv)
+            runpy.run_path(entry, run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    _, status = os.waitpid(_child, 0)
+    _child = 0
+    return os.waitstatus_to_exitcode(status)
+
+
+def main() -> int:
+    entry = os.path.abspath(sys.argv[1])
+    # Answers go to the original stdout, everything printed to stderr
+    channel = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+    signal.signal(signal.SIGTERM, _terminate)
+
+    sys.path.insert(0, os.path.dirname(entry))
+    start = time.perf_counter()
+    # Runs the imports of the entry script, not its main block
+    runpy.run_path(entry, run_name="analytics_builder_warmup")
+    channel.write(json.dumps({"ready": True, "pid": os.getpid(), "warmupSeconds": time.perf_counter() - start}) + "\n")
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get("ping"):
+            answer = {"id": request["id"], "pong": True}
+        else:
+            answer = {"id": request["id"], "returncode": _build(entry, request["argv"], request["cwd"])}
+        channel.write(json.dumps(answer) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
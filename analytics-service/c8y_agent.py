@@ -1,10 +1,90 @@
 import logging
 from xmlrpc.client import boolean
-from dotenv import load_dotenv
-from c8y_api.app import MultiTenantCumulocityApp
-from c8y_api.model import Binary, TenantOption
 import json
-from typing import Dict, List, Optional, Set, Tuple, Union
+import os
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple, Union
+from metrics import C8Y_ERRORS, C8Y_REQUEST_SECONDS, UPLOAD_BYTES, bind_tenant, count, timed
+from solution_utils import MultipartFileStream, TtlCache, in_caller_context
+from tracing import record_error, traced
+
+# c8y_api is imported with the first tenant request or the warm-up of boot.py, not at startup
+if TYPE_CHECKING:
+    from c8y_api.app import MultiTenantCumulocityApp
+    from c8y_api.model import Binary, TenantOption
+
+# Seconds a repository configuration read from the tenant options is reused
+REPOSITORY_CACHE_TTL = int(os.getenv("REPOSITORY_CACHE_TTL", "60"))
+# Number of concurrent tenant option writes when updating the repositories
+REPOSITORY_UPDATE_PARALLELISM = int(os.getenv("REPOSITORY_UPDATE_PARALLELISM", "4"))
+# Number of tenants whose API instance c8y_api keeps
+TENANT_CACHE_MAX_ENTRIES = int(os.getenv("TENANT_CACHE_MAX_ENTRIES", "256"))
+# Seconds c8y_api keeps the API instance of a tenant
+TENANT_CACHE_MAX_AGE = int(os.getenv("TENANT_CACHE_MAX_AGE", "3600"))
+
+
+class TenantInstances:
+    """
+    Tenant API instances of the requests. c8y_api resolves the tenant ID from
+    the credentials and keeps one instance per tenant, authorized as the
+    service user of the tenant, in a TTL cache. That cache is not thread safe,
+    so it is only read and written under a lock. Creating an instance reads the
+    subscriptions from Cumulocity and runs outside of that lock, one at a time:
+    the subscriptions read for one tenant serve the instances of the others.
+    """
+
+    def __init__(self, get_app: Callable[[], "MultiTenantCumulocityApp"]):
+        self.get_app = get_app
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, headers, cookies) -> any:
+        from c8y_api.app import AuthUtil
+
+        c8y_app = self.get_app()
+        # Only parses the credentials, no request to Cumulocity
+        tenant_id = AuthUtil.get_tenant_id(AuthUtil.parse_auth_string(c8y_app._get_auth_header(headers, cookies)))
+        instance = self._cached(c8y_app, tenant_id)
+        if instance is not None:
+            return instance
+        with self._create_lock:
+            # Another request may have created it while we were waiting
+            instance = self._cached(c8y_app, tenant_id, count=False)
+            if instance is None:
+                instance = c8y_app._create_tenant_instance(tenant_id)
+                with self._lock:
+                    c8y_app._tenant_instances[tenant_id] = instance
+            return instance
+
+    def stats(self) -> Dict:
+        """Resolutions saved by the tenant cache of c8y_api and its size"""
+        c8y_app = self.get_app()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "lookups": lookups,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(c8y_app._tenant_instances),
+                "maxEntries": c8y_app.cache_size,
+                "maxAge": c8y_app.cache_ttl,
+            }
+
+    def _cached(self, c8y_app: "MultiTenantCumulocityApp", tenant_id: str, count: bool = True) -> any:
+        # c8y_api has no public accessor for its cache
+        with self._lock:
+            instance = c8y_app._tenant_instances.get(tenant_id)
+            if count:
+                if instance is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            return instance
 
 # These two lines enable debugging at httplib level (requests->urllib3->http.client)
 # You will see the REQUEST, including HEADERS and DATA, and RESPONSE with HEADERS but without DATA.
@@ -20,13 +100,34 @@ from typing import Dict, List, Optional, Set, Tuple, Union
 # requests_log.propagate = True
 
 import logging
-from dotenv import load_dotenv
-from c8y_api.app import MultiTenantCumulocityApp
-from c8y_api.model import Binary, TenantOption
 import json
 from typing import Dict, List, Optional, Set, Tuple
 
 
+def post_binary(tenant, resource: str, binary: "Binary", file) -> Dict:
+    """
+    Create an inventory binary with a streamed multipart body.
+
+    Args:
+        tenant: Tenant instance (CumulocityApi) to upload with
+        resource (str): Path of the binary API
+        binary (Binary): Binary whose JSON is sent as "object" part
+        file: File opened in binary mode, sent as "file" part
+
+    Returns:
+        The created binary as JSON
+    """
+    body = MultipartFileStream(file, binary.to_full_json(), binary.content_type)
+    response = tenant.session.post(
+        tenant.base_url + resource, data=body, headers={"Content-Type": body.content_type}
+    )
+    if response.status_code != 201:
+        raise ValueError(
+            f"Unable to upload binary {binary.name}. Status: {response.status_code} Response:\n{response.text}"
+        )
+    return response.json()
+
+
 class C8YAgent:
     # Constants
     DUMMY_ACCESS_TOKEN = "_DUMMY_ACCESS_CODE_"
@@ -34,18 +135,45 @@ class C8YAgent:
         "CEP_DIAGNOSTICS": "/service/cep/diagnostics/apamaCtrlStatus",
         "TENANT_OPTIONS": "/tenant/options",
         "CEP_RESTART": "/service/cep/restart",
+        "CEP_EXTENSION_METADATA": "/service/cep/apamacorrelator/en/block-metadata.json",
+        "CEP_EXTENSION": "/service/cep/apamacorrelator/en/{name}.json",
+        "CEP_EXTENSION_NAMES": "/service/cep/diagnostics/extensionNames",
+        "INVENTORY": "/inventory/managedObjects",
+        "INVENTORY_BINARIES": "/inventory/binaries",
     }
     ANALYTICS_MANAGEMENT_REPOSITORIES = "analytics-management.repository"
+    FETCH_MODE_CONTENTS = "contents"
 
     def __init__(self):
         self._logger = logging.getLogger("C8YAgent")
         self._logger.setLevel(logging.DEBUG)
-        load_dotenv()
-        self.c8y_app = MultiTenantCumulocityApp()
+        self._c8y_app: Optional["MultiTenantCumulocityApp"] = None
+        self._c8y_app_lock = threading.Lock()
+        self.tenant_instances = TenantInstances(lambda: self.c8y_app)
+        # (tenant ID, repository ID) -> raw tenant option value, including the access token
+        self.repository_cache = TtlCache(REPOSITORY_CACHE_TTL)
+
+    @property
+    def c8y_app(self) -> "MultiTenantCumulocityApp":
+        """The Cumulocity application, c8y_api is loaded and the bootstrap tenant read on first use"""
+        if self._c8y_app is None:
+            with self._c8y_app_lock:
+                if self._c8y_app is None:
+                    from dotenv import load_dotenv
+                    from c8y_api.app import MultiTenantCumulocityApp
+
+                    load_dotenv()
+                    self._c8y_app = MultiTenantCumulocityApp(
+                        cache_size=TENANT_CACHE_MAX_ENTRIES, cache_ttl=TENANT_CACHE_MAX_AGE
+                    )
+        return self._c8y_app
 
     def _get_tenant_instance(self, headers: Dict, cookies: Dict) -> any:
         """Get tenant instance with error handling"""
-        return self.c8y_app.get_tenant_instance(headers=headers, cookies=cookies)
+        tenant = self.tenant_instances.get(headers, cookies)
+        # The metrics of the request are labelled with the tenant from here on
+        bind_tenant(tenant.tenant_id)
+        return tenant
 
     def _handle_request(self, func, *args, **kwargs) -> Tuple[Dict, int]:
         """Generic request handler with error handling"""
@@ -56,20 +184,45 @@ class C8YAgent:
             self._logger.error("Exception occurred:", exc_info=True)
             return {"error": str(e)}, 500
 
+    def get_tenant_id(self, request) -> str:
+        """Get the ID of the tenant the request was issued for"""
+        [headers, cookies] = self.prepare_header(request)
+        return self._get_tenant_instance(headers, cookies).tenant_id
+
+    @traced("c8y.upload_extension")
     def upload_extension(self, request, extension_name: str, ext_file) -> str:
+        """
+        Upload an extension as inventory binary. The file is streamed from disk,
+        Binary.create() would hold the whole multipart body in memory.
+
+        Args:
+            request: The incoming request object
+            extension_name (str): Name of the binary and its pas_extension fragment
+            ext_file: Extension zip opened in binary mode
+
+        Returns:
+            ID of the created binary
+        """
+        from c8y_api.model import Binary
+
         [headers, cookies] = self.prepare_header(request)
+        tenant = self._get_tenant_instance(headers, cookies)
         binary = Binary(
-            c8y=self._get_tenant_instance(headers, cookies),
+            c8y=tenant,
             type="application/zip",
             name=extension_name,
-            file=ext_file,
             pas_extension=extension_name,
-        ).create()
-        return binary.id
+        )
+        with timed(C8Y_REQUEST_SECONDS, C8Y_ERRORS, tenant=tenant.tenant_id, operation="upload_extension"):
+            id = post_binary(tenant, self.PATHS["INVENTORY_BINARIES"], binary, ext_file)["id"]
+        count(UPLOAD_BYTES, os.fstat(ext_file.fileno()).st_size, tenant=tenant.tenant_id)
+        return id
 
+    @traced("c8y.restart_cep")
     def restart_cep(self, request) -> None:
         """
-        Attempt to restart CEP, ignoring any errors that occur.
+        Restart CEP. Errors are logged and raised, the restart coalescer records
+        them on the restart.
 
         Args:
             request: The incoming request object
@@ -78,17 +231,16 @@ class C8YAgent:
             [headers, cookies] = self.prepare_header(request)
             self._logger.info("Attempting to restart CEP...")
 
-            self._get_tenant_instance(headers, cookies).put(
-                resource=self.PATHS["CEP_RESTART"], json={}
-            )
-
-        except Exception as e:
-            # Log the error but don't raise it
-            self._logger.warning(f"Non-critical error during CEP restart: {str(e)}")
+            tenant = self._get_tenant_instance(headers, cookies)
+            with timed(C8Y_REQUEST_SECONDS, C8Y_ERRORS, tenant=tenant.tenant_id, operation="restart_cep"):
+                tenant.put(resource=self.PATHS["CEP_RESTART"], json={})
             self._logger.info("CEP restart command sent successfully")
-        finally:
-            self._logger.info("CEP restart procedure completed")
+        except Exception as e:
+            record_error(e)
+            self._logger.warning(f"Error during CEP restart: {str(e)}")
+            raise
 
+    @traced("c8y.get_cep_operationobject_id")
     def get_cep_operationobject_id(self, request) -> Optional[Dict]:
         [headers, cookies] = self.prepare_header(request)
         # response = self._get_tenant_instance(headers,cookies).get(
@@ -107,7 +259,7 @@ class C8YAgent:
             return None
 
         query = f"applicationId eq '{app_id}' and name eq '{microservice_name}'"
-        managed_objects = self._get_tenant_instance(headers, cookies).inventory.select(
+        managed_objects = ti.inventory.select(
             query=query
         )
 
@@ -116,6 +268,52 @@ class C8YAgent:
 
         return None
 
+    @traced("c8y.get_extension_binaries")
+    def get_extension_binaries(self, request) -> List[Dict]:
+        """Get the extension binaries (managed objects with pas_extension) from the inventory"""
+        [headers, cookies] = self.prepare_header(request)
+        tenant = self._get_tenant_instance(headers, cookies)
+        extensions, page = [], 1
+        while True:
+            response = tenant.get(
+                resource=self.PATHS["INVENTORY"],
+                params={"fragmentType": "pas_extension", "pageSize": 2000, "currentPage": page},
+            )
+            managed_objects = response.get("managedObjects", [])
+            extensions.extend(managed_objects)
+            if len(managed_objects) < 2000:
+                return extensions
+            page += 1
+
+    @traced("c8y.get_cep_extension_metadata")
+    def get_cep_extension_metadata(self, request) -> Dict:
+        """Get the names of the extensions loaded by CEP, as block-metadata.json lists them"""
+        [headers, cookies] = self.prepare_header(request)
+        return self._get_tenant_instance(headers, cookies).get(
+            resource=self.PATHS["CEP_EXTENSION_METADATA"]
+        )
+
+    @traced("c8y.get_cep_extension_names")
+    def get_cep_extension_names(self, request) -> Dict:
+        """Get the extensions known to CEP diagnostics, with the contents of zip extensions"""
+        [headers, cookies] = self.prepare_header(request)
+        return self._get_tenant_instance(headers, cookies).get(
+            resource=self.PATHS["CEP_EXTENSION_NAMES"]
+        )
+
+    @traced("c8y.get_cep_extension")
+    def get_cep_extension(self, request, name: str) -> Optional[Dict]:
+        """Get the blocks of a loaded extension, None if CEP does not know the extension"""
+        [headers, cookies] = self.prepare_header(request)
+        try:
+            return self._get_tenant_instance(headers, cookies).get(
+                resource=self.PATHS["CEP_EXTENSION"].format(name=urllib.parse.quote(name))
+            )
+        except KeyError:
+            # c8y_api raises KeyError for 404
+            return None
+
+    @traced("c8y.get_cep_ctrl_status")
     def get_cep_ctrl_status(self, request) -> Dict:
         [headers, cookies] = self.prepare_header(request)
         return self._get_tenant_instance(headers, cookies).get(
@@ -172,6 +370,7 @@ class C8YAgent:
                 "url": value_dict.get("url", ""),
                 "accessToken": value_dict.get("accessToken", ""),
                 "enabled": value_dict.get("enabled", False),
+                "fetchMode": value_dict.get("fetchMode", self.FETCH_MODE_CONTENTS),
             }
             # If there's an access token and replace_access_token, replace it with dummy
             if value_dict.get("accessToken") and replace_access_token:
@@ -189,130 +388,177 @@ class C8YAgent:
                 "enabled": False,
             }
 
+    @traced("c8y.load_repositories")
     def load_repositories(self, request) -> List[Dict]:
         [headers, cookies] = self.prepare_header(request)
         tenant = self._get_tenant_instance(headers, cookies)
-        tenant_options = tenant.tenant_options.get_all(
-            category=self.ANALYTICS_MANAGEMENT_REPOSITORIES
-        )
+        with timed(C8Y_REQUEST_SECONDS, C8Y_ERRORS, tenant=tenant.tenant_id, operation="tenant_options_list"):
+            tenant_options = tenant.tenant_options.get_all(
+                category=self.ANALYTICS_MANAGEMENT_REPOSITORIES
+            )
+        for option in tenant_options:
+            self.repository_cache.put((tenant.tenant_id, option.key), option.value)
         return [
             self._process_repository_data(option, option.key, True)
             for option in tenant_options
         ]
 
+    @traced("c8y.load_repository")
     def load_repository(
         self, request, repository_id: str, replace_access_token: boolean
     ) -> Dict:
         [headers, cookies] = self.prepare_header(request)
         tenant = self._get_tenant_instance(headers, cookies)
-        tenant_option = tenant.tenant_options.get(
-            category=self.ANALYTICS_MANAGEMENT_REPOSITORIES, key=repository_id
-        )
-        # Print various attributes of the TenantOption object
-        print(f"TenantOption contents:")
-        print(f"Category: {tenant_option.category}")
-        print(f"Key: {tenant_option.key}")
-        print(f"Value: {tenant_option.value}")
-
-        # Print the entire object
-        print(f"Complete TenantOption object: {vars(tenant_option)}")
-        return self._process_repository_data(
-            tenant_option, repository_id, replace_access_token
-        )
+        # The tenant ID is part of the key, a configuration never reaches another tenant
+        key = (tenant.tenant_id, repository_id)
+        value = self.repository_cache.get(key)
+        if value is None:
+            with timed(C8Y_REQUEST_SECONDS, C8Y_ERRORS, tenant=tenant.tenant_id, operation="tenant_option_get"):
+                tenant_option = tenant.tenant_options.get(
+                    category=self.ANALYTICS_MANAGEMENT_REPOSITORIES, key=repository_id
+                )
+            value = tenant_option.value
+            self.repository_cache.put(key, value)
+        # Processed on every call, callers get their own copy
+        return self._process_repository_data(value, repository_id, replace_access_token)
 
+    @traced("c8y.update_repositories")
     def update_repositories(
         self, request, repositories: List[Dict]
     ) -> Tuple[Dict, int]:
+        """
+        Replace the configured repositories with the given list. The changes are
+        computed against one listing of the tenant options: unchanged repositories
+        are not written, the required writes and deletes run concurrently.
+
+        Returns:
+            Tuple of the result, with the outcome per repository (created, updated,
+            unchanged, deleted or failed), and the HTTP status
+        """
+        tenant = None
         try:
             [headers, cookies] = self.prepare_header(request)
             tenant = self._get_tenant_instance(headers, cookies)
 
-            existing_repos = self.load_repositories(request)
+            with timed(C8Y_REQUEST_SECONDS, C8Y_ERRORS, tenant=tenant.tenant_id, operation="tenant_options_list"):
+                existing = {
+                    option.key: self._stored_repository_value(option.value)
+                    for option in tenant.tenant_options.get_all(
+                        category=self.ANALYTICS_MANAGEMENT_REPOSITORIES
+                    )
+                }
             new_repo_ids = {repo.get("id") for repo in repositories}
-            existing_repo_ids = {repo.get("id") for repo in existing_repos}
-            repos_to_delete = existing_repo_ids - new_repo_ids
 
-            # Batch process repositories
+            outcomes: List[Dict] = []
+            writes = []
             for repository in repositories:
-                self._update_single_repository(tenant, repository)
-
-            # Batch delete obsolete repositories
-            self._delete_repositories(tenant, repos_to_delete)
-
-            return {"message": "Repositories updated successfully"}, 200
+                repo_id = repository.get("id")
+                existing_data = existing.get(repo_id)
+                value_dict = self._repository_value(repository, existing_data)
+                if value_dict == existing_data:
+                    outcomes.append({"id": repo_id, "status": "unchanged"})
+                else:
+                    status = "updated" if repo_id in existing else "created"
+                    writes.append((repo_id, status, value_dict))
+
+            with ThreadPoolExecutor(
+                max_workers=REPOSITORY_UPDATE_PARALLELISM, thread_name_prefix="repository-update"
+            ) as executor:
+                futures = {
+                    executor.submit(in_caller_context(self._write_repository), tenant, repo_id, value_dict): (repo_id, status)
+                    for repo_id, status, value_dict in writes
+                }
+                futures.update(
+                    {
+                        executor.submit(in_caller_context(self._delete_repository), tenant, repo_id): (repo_id, "deleted")
+                        for repo_id in existing.keys() - new_repo_ids
+                    }
+                )
+                for future, (repo_id, status) in futures.items():
+                    try:
+                        future.result()
+                        outcomes.append({"id": repo_id, "status": status})
+                    except Exception as e:
+                        self._logger.error(f"Failed to update repository {repo_id}: {str(e)}")
+                        outcomes.append({"id": repo_id, "status": "failed", "error": str(e)})
+
+            failed = [outcome["id"] for outcome in outcomes if outcome["status"] == "failed"]
+            if failed:
+                return {"error": f"Failed to update repositories {', '.join(failed)}", "repositories": outcomes}, 500
+            return {"message": "Repositories updated successfully", "repositories": outcomes}, 200
 
         except Exception as e:
             self._logger.error("Failed to update repositories:", exc_info=True)
             return {"error": str(e)}, 500
+        finally:
+            # Also after a partial update, the next read must see the tenant options
+            if tenant is not None:
+                self.repository_cache.invalidate(tenant_id=tenant.tenant_id)
 
-    def _update_single_repository(self, tenant, repository: Dict) -> None:
-        """Helper method to update a single repository"""
+    @staticmethod
+    def _stored_repository_value(value: str) -> Optional[Dict]:
         try:
-            # Get existing repository data
-            existing_data = None
-            existing_repo = None
-            try:
-                existing_repo = tenant.tenant_options.get(
-                    category=self.ANALYTICS_MANAGEMENT_REPOSITORIES,
-                    key=repository.get("id"),
-                )
-            except KeyError:  # Specific exception for when the repository doesn't exist
-                self._logger.debug("Have to create new repository", exc_info=True)
-            except Exception as e:  # General exception for other errors
-                self._logger.error(f"Error accessing repository: {str(e)}", exc_info=True)
-
-            if existing_repo:
-                existing_data = json.loads(existing_repo.value) if existing_repo else {}
-
-            # Handle access token
-            new_access_token = False
-            if repository.get("accessToken") == self.DUMMY_ACCESS_TOKEN:
-                access_token = existing_data.get("accessToken", "")
-            else:
-                access_token = repository.get("accessToken", "")
-                new_access_token = True
-
-            # Check if URL has changed
-            if existing_data and existing_data.get("url") != repository.get("url"):
-                # URL has changed, remove access token if it was not submitted again
-                if not new_access_token:
-                    access_token = ""
-                self._logger.info(f"URL changed for repository {repository.get('id')}, removing access token")
-
-            value_dict = {
-                "name": repository.get("name"),
-                "url": repository.get("url"),
-                "enabled": bool(repository.get("enabled", False)),
-            }
-
-            # Only add access token if it exists
-            if access_token:
-                value_dict["accessToken"] = access_token
-
-            option = TenantOption(
-                category=self.ANALYTICS_MANAGEMENT_REPOSITORIES,
-                key=repository.get("id"),
-                value=json.dumps(value_dict),
-            )
+            value_dict = json.loads(value)
+        except (TypeError, json.JSONDecodeError):
+            return None
+        return value_dict if isinstance(value_dict, dict) else None
+
+    def _repository_value(self, repository: Dict, existing_data: Optional[Dict]) -> Dict:
+        """Build the value to store for a repository, keeping the stored access token if it was not submitted"""
+        existing_data = existing_data or {}
+
+        # Handle access token
+        new_access_token = False
+        if repository.get("accessToken") == self.DUMMY_ACCESS_TOKEN:
+            access_token = existing_data.get("accessToken", "")
+        else:
+            access_token = repository.get("accessToken", "")
+            new_access_token = True
+
+        # Check if URL has changed
+        if existing_data and existing_data.get("url") != repository.get("url"):
+            # URL has changed, remove access token if it was not submitted again
+            if not new_access_token:
+                access_token = ""
+            self._logger.info(f"URL changed for repository {repository.get('id')}, removing access token")
+
+        value_dict = {
+            "name": repository.get("name"),
+            "url": repository.get("url"),
+            "enabled": bool(repository.get("enabled", False)),
+        }
+
+        # Only store the fetch mode if it deviates from the default
+        if repository.get("fetchMode") and repository.get("fetchMode") != self.FETCH_MODE_CONTENTS:
+            value_dict["fetchMode"] = repository.get("fetchMode")
+
+        # Only add access token if it exists
+        if access_token:
+            value_dict["accessToken"] = access_token
+        return value_dict
+
+    @traced("c8y.write_repository")
+    def _write_repository(self, tenant, repo_id: str, value_dict: Dict) -> None:
+        """Helper method to create or update a single repository"""
+        from c8y_api.model import TenantOption
+
+        option = TenantOption(
+            category=self.ANALYTICS_MANAGEMENT_REPOSITORIES,
+            key=repo_id,
+            value=json.dumps(value_dict),
+        )
+        with timed(C8Y_REQUEST_SECONDS, C8Y_ERRORS, tenant=tenant.tenant_id, operation="tenant_option_write"):
             tenant.tenant_options.create(option)
-            self._logger.info(f"Updated repository: {repository.get('id')}")
-
-        except Exception as e:
-            self._logger.error(
-                f"Failed to update repository {repository.get('id')}: {str(e)}"
+        self._logger.info(f"Updated repository: {repo_id}")
+
+    @traced("c8y.delete_repository")
+    def _delete_repository(self, tenant, repo_id: str) -> None:
+        """Helper method to delete a single repository"""
+        with timed(C8Y_REQUEST_SECONDS, C8Y_ERRORS, tenant=tenant.tenant_id, operation="tenant_option_delete"):
+            tenant.tenant_options.delete_by(
+                category=self.ANALYTICS_MANAGEMENT_REPOSITORIES, key=repo_id
             )
-            raise
-
-    def _delete_repositories(self, tenant, repo_ids: Set[str]) -> None:
-        """Helper method to delete multiple repositories"""
-        for repo_id in repo_ids:
-            try:
-                tenant.tenant_options.delete_by(
-                    category=self.ANALYTICS_MANAGEMENT_REPOSITORIES, key=repo_id
-                )
-                self._logger.info(f"Deleted repository: {repo_id}")
-            except Exception as e:
-                self._logger.warning(f"Failed to delete repository {repo_id}: {str(e)}")
+        self._logger.info(f"Deleted repository: {repo_id}")
 
     @staticmethod
     def prepare_header(request) -> Dict:
@@ -0,0 +1,187 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from c8y_agent import C8YAgent
+from solution_utils import RequestSnapshot, in_caller_context
+
+logger = logging.getLogger("cep_extensions")
+logger.setLevel(logging.INFO)
+
+# Seconds the aggregated view is served before CEP is asked again, restarts through the service invalidate it earlier
+CEP_EXTENSION_CACHE_TTL = int(os.getenv("CEP_EXTENSION_CACHE_TTL", "600"))
+# Number of concurrent requests to CEP when collecting extension details
+CEP_FANOUT_WORKERS = int(os.getenv("CEP_FANOUT_WORKERS", "8"))
+
+# Blocks in these packages ship with Analytics Builder
+_BUILTIN_BLOCK_PACKAGES = (
+    "apama.analyticsbuilder.blocks",
+    "apama.analyticskit.blocks.core",
+    "apama.analyticskit.blocks.cumulocity",
+)
+
+_executor = ThreadPoolExecutor(max_workers=CEP_FANOUT_WORKERS, thread_name_prefix="cep-fanout")
+
+
+def _remove_file_extension(name: str) -> str:
+    base, dot, _ = name.rpartition(".")
+    return base if dot else name
+
+
+class CepExtensionCatalog:
+    """
+    Deployed extensions and their blocks, aggregated from the inventory binaries
+    (pas_extension), the extensions loaded by CEP and the block list of every
+    loaded extension. The CEP calls are issued concurrently.
+
+    The result is cached per tenant until the next CEP restart, which callers
+    signal with invalidate(), at most CEP_EXTENSION_CACHE_TTL seconds.
+    """
+
+    def __init__(self, agent: C8YAgent, ttl: int = CEP_EXTENSION_CACHE_TTL):
+        self.agent = agent
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._catalogs: Dict[str, Dict] = {}
+        self._collect_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, request, refresh: bool = False) -> Dict:
+        """
+        Return the aggregated view of the deployed extensions of the tenant.
+
+        Args:
+            request: The incoming request
+            refresh (bool): Ignore the cached view, e.g. after a restart outside the service
+
+        Returns:
+            dict with "extensions" (inventory binaries enriched with loaded,
+            extensionType and blocksCount), "blocks" (blocks of all loaded
+            extensions), "metadatas" and "messages" as reported by CEP, and
+            "collectedAt"
+        """
+        tenant_id = self.agent.get_tenant_id(request)
+        catalog = None if refresh else self._cached(tenant_id)
+        if catalog is not None:
+            return catalog
+
+        with self._collect_lock(tenant_id):
+            # Another request may have collected the view while we were waiting
+            catalog = None if refresh else self._cached(tenant_id, count=False)
+            if catalog is None:
+                catalog = self._collect(RequestSnapshot(request))
+                with self._lock:
+                    self._catalogs[tenant_id] = catalog
+            return catalog
+
+    def get_extension(self, request, name: str) -> Optional[Dict]:
+        """
+        Return the details of one extension: its blocks, whether it is loaded and,
+        for zip extensions, the files it contains. None if the extension is unknown.
+        """
+        catalog = self.get(request)
+        return catalog["details"].get(name)
+
+    def invalidate(self, tenant_id: Optional[str] = None) -> None:
+        """Drop the cached view of a tenant, of all tenants if None"""
+        with self._lock:
+            if tenant_id is None:
+                self._catalogs.clear()
+            else:
+                self._catalogs.pop(tenant_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"tenants": len(self._catalogs), "hits": self.hits, "misses": self.misses}
+
+    def _cached(self, tenant_id: str, count: bool = True) -> Optional[Dict]:
+        with self._lock:
+            catalog = self._catalogs.get(tenant_id)
+            fresh = catalog is not None and time.time() - catalog["collectedAt"] <= self.ttl
+            if count:
+                if fresh:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            return catalog if fresh else None
+
+    def _collect_lock(self, tenant_id: str) -> threading.Lock:
+        with self._lock:
+            return self._collect_locks.setdefault(tenant_id, threading.Lock())
+
+    def _collect(self, snapshot: RequestSnapshot) -> Dict:
+        start = time.perf_counter()
+        binaries_future = _executor.submit(in_caller_context(self.agent.get_extension_binaries), snapshot)
+        metadata_future = _executor.submit(in_caller_context(self.agent.get_cep_extension_metadata), snapshot)
+        names_future = _executor.submit(in_caller_context(self._extension_names), snapshot)
+
+        metadata = metadata_future.result() or {}
+        loaded_files: List[str] = metadata.get("metadatas") or []
+        loaded_names = [_remove_file_extension(file) for file in loaded_files]
+        detail_futures = {
+            name: _executor.submit(in_caller_context(self.agent.get_cep_extension), snapshot, name)
+            for name in loaded_names
+        }
+        binaries = binaries_future.result()
+        extension_names = names_future.result()
+
+        details: Dict[str, Dict] = {}
+        blocks = []
+        for name, future in detail_futures.items():
+            detail = future.result()
+            if detail is None:
+                continue
+            detail = {**detail, "name": name, "loaded": True}
+            for block in detail.get("analytics", []):
+                block["custom"] = not block.get("id", "").startswith(_BUILTIN_BLOCK_PACKAGES)
+                block["extension"] = name
+                blocks.append(block)
+            details[name] = detail
+
+        extensions = []
+        for binary in binaries:
+            name = _remove_file_extension(binary.get("name", ""))
+            extension = {**binary, "name": name}
+            json_file = f"{name}.json"
+            extension["loaded"] = any(file in json_file for file in loaded_files)
+            if not extension["loaded"]:
+                extension["loaded"] = f"{name}.zip" in extension_names
+                extension["extensionType"] = "zip"
+            detail = details.get(name)
+            if extension["loaded"] and detail is not None:
+                extension["blocksCount"] = len(detail.get("analytics", []))
+            extensions.append(extension)
+
+            # Zip extensions are listed with their files, the details page shows them
+            zip_entry = extension_names.get(f"{name}.zip")
+            if zip_entry is not None:
+                detail = details.setdefault(
+                    name, {"name": name, "analytics": [], "loaded": extension["loaded"]}
+                )
+                detail["extensionType"] = "zip"
+                detail["contents"] = zip_entry.get("contents", [])
+
+        logger.info(
+            f"Collected {len(extensions)} extensions, {len(details)} loaded, "
+            f"{len(blocks)} blocks in {time.perf_counter() - start:.3f}s"
+        )
+        return {
+            "extensions": extensions,
+            "blocks": blocks,
+            "metadatas": loaded_files,
+            "messages": metadata.get("messages", []),
+            "details": details,
+            "collectedAt": time.time(),
+        }
+
+    def _extension_names(self, snapshot: RequestSnapshot) -> Dict:
+        # Older CEP versions have no extensionNames diagnostics, treat as no zip extensions
+        try:
+            return self.agent.get_cep_extension_names(snapshot) or {}
+        except Exception as e:
+            logger.warning(f"Could not get extension names from CEP diagnostics: {e}")
+            return {}
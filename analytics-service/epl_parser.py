@@ -0,0 +1,181 @@
+import codecs
+import re
+from typing import Iterable, List, Optional, Union
+
+_WHITESPACE = re.compile(r"\s+")
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$.]*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+
+
+class EplHeader:
+    """Metadata found in the header of an EPL monitor"""
+
+    def __init__(self):
+        self.package: Optional[str] = None
+        self.events: List[str] = []
+        self.block_name: Optional[str] = None
+        self.block_doc: Optional[str] = None
+        # Number of characters consumed before the parser stopped
+        self.consumed = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.package is not None and self.block_doc is not None
+
+
+class EplHeaderParser:
+    """
+    Incremental parser for the header of an EPL monitor.
+
+    Chunks of source are fed one after another, the parser stops as soon as it
+    has found the package, the block doc comment (the doc comment carrying a
+    @$blockCategory) and the event it documents. Comments and string literals
+    are skipped, so a "package" inside them is never taken for the declaration.
+    Events declared after the block event are not reported. With
+    until="package" the parser stops at the package declaration instead.
+    """
+
+    def __init__(self, until: str = "header"):
+        if until not in ("header", "package"):
+            raise ValueError(f"until must be 'header' or 'package', not {until!r}")
+        self.until = until
+        self.header = EplHeader()
+        self._buffer = ""
+        self._depth = 0
+        self._expect: Optional[str] = None
+        self._package: List[str] = []
+        self._last_doc: Optional[str] = None
+
+    def feed(self, chunk: str) -> bool:
+        """Parse the next chunk, return True once the parser is done"""
+        if self.done:
+            return True
+        self._buffer += chunk
+        self._parse(final=False)
+        return self.done
+
+    def close(self) -> EplHeader:
+        """Parse what is left at the end of the source and return the header"""
+        if not self.done:
+            self._parse(final=True)
+        return self.header
+
+    @property
+    def done(self) -> bool:
+        if self.until == "package":
+            return self.header.package is not None
+        return self.header.complete
+
+    def _parse(self, final: bool) -> None:
+        buffer, position, length = self._buffer, 0, len(self._buffer)
+        while position < length and not self.done:
+            char = buffer[position]
+
+            if char.isspace():
+                position = _WHITESPACE.match(buffer, position).end()
+                continue
+
+            if buffer.startswith("//", position):
+                end = buffer.find("\n", position)
+                if end < 0:
+                    if not final:
+                        break
+                    end = length
+                position = end + 1
+                continue
+
+            if buffer.startswith("/*", position):
+                end = buffer.find("*/", position + 2)
+                if end < 0:
+                    if not final:
+                        break
+                    end = length
+                if buffer.startswith("/**", position) and not buffer.startswith("/**/", position):
+                    self._last_doc = buffer[position + 3:end]
+                position = end + 2
+                continue
+
+            if char == "/" and position + 1 == length and not final:
+                # Could be the start of a comment, wait for the next chunk
+                break
+
+            if char == '"':
+                match = _STRING.match(buffer, position)
+                if not match:
+                    if not final:
+                        break
+                    position = length
+                    continue
+                position = match.end()
+                self._expect = None
+                continue
+
+            match = _IDENTIFIER.match(buffer, position)
+            if match:
+                if match.end() == length and not final:
+                    # The identifier may continue in the next chunk
+                    break
+                self._token(match.group())
+                position = match.end()
+                continue
+
+            self._symbol(char)
+            position += 1
+
+        self.header.consumed += position
+        self._buffer = buffer[position:]
+
+    def _token(self, token: str) -> None:
+        if self._expect == "package":
+            self._package.append(token)
+        elif self._expect == "event":
+            self._expect = None
+            self.header.events.append(token)
+            if self._last_doc is not None and "@$blockCategory" in self._last_doc:
+                self.header.block_name = token
+                self.header.block_doc = self._last_doc
+        elif self._depth == 0 and token == "package" and self.header.package is None:
+            self._expect = "package"
+        elif self._depth == 0 and token == "event":
+            self._expect = "event"
+        else:
+            self._last_doc = None
+
+    def _symbol(self, char: str) -> None:
+        if self._expect == "package" and char == ".":
+            # EPL allows whitespace around the dots of a package name
+            self._package.append(char)
+        elif self._expect == "package" and char == ";":
+            self.header.package = "".join(self._package)
+            self._expect = None
+        elif char == "{":
+            self._depth += 1
+            self._last_doc = None
+        elif char == "}":
+            self._depth = max(self._depth - 1, 0)
+        if self._expect != "package":
+            self._expect = None
+
+
+def parse_epl_header(chunks: Iterable[Union[str, bytes]], until: str = "header") -> EplHeader:
+    """
+    Parse the header of an EPL monitor from an iterable of chunks, e.g.
+    response.iter_content(). Stops reading once the header is complete, or
+    once the package is declared with until="package".
+
+    Args:
+        chunks: Source of the monitor, as str or UTF-8 encoded bytes
+        until: "header" or "package", what to read before stopping
+
+    Returns:
+        EplHeader with package, events, block name and block doc comment
+    """
+    parser = EplHeaderParser(until)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if parser.feed(chunk):
+            return parser.header
+    parser.feed(decoder.decode(b"", final=True))
+    return parser.close()
@@ -1,28 +1,139 @@
-import subprocess
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+from blob_cache import BlobCache
+from builder_pool import BuilderPool
+from metrics import BUILD_SECONDS, BUILDS, count, timed
+from tracing import span, tag
+
+logger = logging.getLogger("extension_builder")
+logger.setLevel(logging.INFO)
+
+ANALYTICS_BUILDER_SDK_DIR = os.getenv(
+    "ANALYTICS_BUILDER_SDK_DIR", "/apama_work/apama-analytics-builder-block-sdk"
+)
+ANALYTICS_BUILDER = os.path.join(ANALYTICS_BUILDER_SDK_DIR, "analytics_builder")
+BUILD_CACHE_DIR = os.getenv(
+    "BUILD_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "analytics-ext-service", "builds"),
+)
+BUILD_CACHE_MAX_BYTES = int(os.getenv("BUILD_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Number of sections of a YAML manifest built concurrently, each build is an analytics_builder process
+EXTENSION_BUILD_PARALLELISM = int(os.getenv("EXTENSION_BUILD_PARALLELISM", "4"))
+
+# Warm analytics_builder workers shared by all builds of the process
+builder_pool = BuilderPool(ANALYTICS_BUILDER)
+
+_sdk_version: Optional[str] = None
+
+
+def sdk_version() -> str:
+    """
+    Return the version of the block SDK, the commit it was cloned at if available.
+    Can be overridden with ANALYTICS_BUILDER_SDK_VERSION.
+    """
+    global _sdk_version
+    if _sdk_version is None:
+        _sdk_version = os.getenv("ANALYTICS_BUILDER_SDK_VERSION") or _read_sdk_commit() or "unknown"
+    return _sdk_version
+
+
+def _read_sdk_commit() -> Optional[str]:
+    git_dir = os.path.join(ANALYTICS_BUILDER_SDK_DIR, ".git")
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            return head
+        ref = head[len("ref: "):]
+        ref_path = os.path.join(git_dir, ref)
+        if os.path.exists(ref_path):
+            with open(ref_path) as f:
+                return f.read().strip()
+        with open(os.path.join(git_dir, "packed-refs")) as f:
+            for line in f:
+                if line.rstrip().endswith(f" {ref}"):
+                    return line.split()[0]
+    except OSError:
+        pass
+    return None
+
+
 class ExtensionBuilder:
     """Helper class for building extensions"""
 
-    def __init__(self, work_dir: str, extension_name: str):
+    def __init__(
+        self,
+        work_dir: str,
+        extension_name: str,
+        cache: Optional[BlobCache] = None,
+        namespace: Optional[str] = None,
+    ):
         self.work_dir = work_dir
         self.extension_name = extension_name
         self.extension_file = f"{extension_name}.zip"
         self.extension_path = os.path.join(work_dir, self.extension_file)
+        self.cache = cache
+        self.namespace = namespace
+        # True if the last build was served from the cache
+        self.cached = False
 
     def build(self) -> None:
-        """Build the extension using analytics_builder"""
-        subprocess.run(
-            [
-                "/apama_work/apama-analytics-builder-block-sdk/analytics_builder",
-                "build",
-                "extension",
-                "--input",
-                self.work_dir,
-                "--output",
-                self.extension_path,
-            ],
-            check=True,
+        """Build the extension using analytics_builder, reuse a cached build of identical input"""
+        key = self.cache_key() if self.cache is not None else None
+        if key is not None:
+            cached_path = self.cache.get_path(self.namespace, key)
+            if cached_path is not None:
+                shutil.copyfile(cached_path, self.extension_path)
+                self.cached = True
+                count(BUILDS, result="cached")
+                logger.info(f"Extension {self.extension_name} served from build cache")
+                return
+
+        start = time.perf_counter()
+        try:
+            with span("analytics_builder", extension=self.extension_name), timed(BUILD_SECONDS):
+                warm = builder_pool.run(
+                    ["build", "extension", "--input", self.work_dir, "--output", self.extension_path]
+                )
+                tag("warm", warm)
+        except Exception:
+            count(BUILDS, result="failed")
+            raise
+        count(BUILDS, result="built")
+        self.cached = False
+        logger.info(
+            f"Built extension {self.extension_name} in {time.perf_counter() - start:.1f}s"
+            f"{' on a warm worker' if warm else ''}"
         )
+        if key is not None:
+            self.cache.put_file(self.namespace, key, self.extension_path)
+
+    def cache_key(self) -> str:
+        """
+        Hash of the input files (relative paths and contents), the extension name
+        and the SDK version. The output file itself is not part of the input.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{sdk_version()}\0{self.extension_name}\0".encode())
+        for root, dirs, files in os.walk(self.work_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if path == self.extension_path:
+                    continue
+                relative_path = os.path.relpath(path, self.work_dir).replace(os.sep, "/")
+                digest.update(f"{relative_path}\0{os.path.getsize(path)}\0".encode())
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+        return BlobCache.key("build", digest.hexdigest())
 
     def get_file_path(self) -> str:
         """Get the path to the built extension file"""
-        return self.extension_path
\ No newline at end of file
+        return self.extension_path
@@ -0,0 +1,218 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("extension_jobs")
+logger.setLevel(logging.INFO)
+
+# Number of extension builds running at the same time in the background
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+# Number of jobs waiting for a worker, further submissions are rejected
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "20"))
+# Seconds a finished job and its artifact are kept for polling
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "900"))
+# Synchronous builds running at the same time, so they cannot take every server thread
+EXTENSION_BUILD_SLOTS = int(os.getenv("EXTENSION_BUILD_SLOTS", "4"))
+# Seconds a synchronous build waits for a free slot before it is answered with 503
+EXTENSION_BUILD_SLOT_WAIT = float(os.getenv("EXTENSION_BUILD_SLOT_WAIT", "5"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobError(Exception):
+    """Error of a build, with the HTTP status the synchronous endpoint answers with"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class QueueFullError(Exception):
+    """Raised when no more jobs can be queued"""
+
+
+class BuildResult:
+    """Outcome of a build: a JSON body or the path of a built extension to return as file"""
+
+    def __init__(
+        self,
+        status_code: int = 201,
+        body: Optional[Dict] = None,
+        file_path: Optional[str] = None,
+        file_name: Optional[str] = None,
+    ):
+        self.status_code = status_code
+        self.body = body
+        self.file_path = file_path
+        self.file_name = file_name
+
+
+class ExtensionJob:
+    """A build running in the background, with its phases and result"""
+
+    def __init__(self, tenant_id: str, kind: str, key: str, work_dir: str):
+        self.id = uuid.uuid4().hex
+        self.tenant_id = tenant_id
+        self.kind = kind
+        self.key = key
+        self.work_dir = work_dir
+        self.status = JOB_QUEUED
+        self.phase = JOB_QUEUED
+        self.phases: List[Dict] = [{"phase": JOB_QUEUED, "at": time.time()}]
+        # Live details reported by the build, e.g. the progress of YAML sections
+        self.details: Dict = {}
+        self.result: Optional[BuildResult] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.submissions = 1
+
+    def set_phase(self, phase: str) -> None:
+        """Report the phase the build entered, e.g. downloading, building, uploading"""
+        self.phase = phase
+        self.phases.append({"phase": phase, "at": time.time()})
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def to_json(self) -> Dict:
+        result = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "phase": self.phase,
+            "phases": self.phases,
+            "submissions": self.submissions,
+            "created": self.created,
+            "finished": self.finished,
+            **self.details,
+        }
+        if self.error:
+            result["error"] = self.error
+        if self.result is not None:
+            result["statusCode"] = self.result.status_code
+            if self.result.body is not None:
+                result["result"] = self.result.body
+            if self.result.file_path:
+                result["artifact"] = self.result.file_name
+        return result
+
+
+class ExtensionJobQueue:
+    """
+    Runs extension builds on a bounded pool of worker threads.
+
+    A submission that equals a queued or running build of the same tenant
+    (same key) returns the existing job instead of starting another build.
+    Finished jobs are kept JOB_RETENTION seconds, then their work directory is
+    removed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = JOB_MAX_WORKERS,
+        max_queued: int = JOB_MAX_QUEUED,
+        retention: float = JOB_RETENTION,
+    ):
+        self.max_queued = max_queued
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extension-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ExtensionJob] = {}
+        # (tenant ID, key) -> job that is queued or running
+        self._active: Dict[tuple, ExtensionJob] = {}
+
+    def submit(
+        self,
+        tenant_id: str,
+        kind: str,
+        key: str,
+        run: Callable[[ExtensionJob], BuildResult],
+        work_dir: str,
+    ) -> ExtensionJob:
+        """
+        Queue a build, or return the active job building the same.
+
+        Args:
+            tenant_id (str): Tenant the job belongs to, only this tenant can see it
+            kind (str): Type of build, e.g. repository, list or yaml
+            key (str): Identity of the build, equal keys are the same build
+            run (callable): Runs the build, receives the job to report progress
+            work_dir (str): Directory the build works in, removed with the job.
+                If the submission collapses into an existing job it is removed at once.
+        """
+        self._expire()
+        with self._lock:
+            job = self._active.get((tenant_id, key))
+            if job is not None:
+                job.submissions += 1
+                shutil.rmtree(work_dir, ignore_errors=True)
+                logger.info(f"Submission joins running job {job.id}")
+                return job
+            queued = sum(1 for active in self._active.values() if active.status == JOB_QUEUED)
+            if queued >= self.max_queued:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                raise QueueFullError(f"Too many queued extension builds ({queued})")
+            job = ExtensionJob(tenant_id, kind, key, work_dir)
+            self._jobs[job.id] = job
+            self._active[(tenant_id, key)] = job
+        self._executor.submit(self._run, job, run)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def get(self, tenant_id: str, job_id: str) -> Optional[ExtensionJob]:
+        """Return a job of the tenant, None if it does not exist or belongs to another tenant"""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None and job.tenant_id == tenant_id else None
+
+    def list(self, tenant_id: str) -> List[ExtensionJob]:
+        self._expire()
+        with self._lock:
+            return [job for job in self._jobs.values() if job.tenant_id == tenant_id]
+
+    def _run(self, job: ExtensionJob, run: Callable[[ExtensionJob], BuildResult]) -> None:
+        job.status = JOB_RUNNING
+        job.set_phase(JOB_RUNNING)
+        try:
+            job.result = run(job)
+            job.status = JOB_SUCCEEDED if job.result.status_code < 400 else JOB_FAILED
+            if job.status == JOB_FAILED and job.result.body:
+                job.error = job.result.body.get("message") or job.result.body.get("error")
+        except JobError as e:
+            job.status, job.error = JOB_FAILED, e.message
+        except Exception as e:
+            logger.error(f"Job {job.id} failed", exc_info=True)
+            job.status, job.error = JOB_FAILED, str(e)
+        finally:
+            job.finished = time.time()
+            job.set_phase(job.status)
+            with self._lock:
+                self._active.pop((job.tenant_id, job.key), None)
+            # Only a built extension returned as file is needed after the job
+            if job.result is None or not job.result.file_path:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+            logger.info(f"Job {job.id} {job.status} after {job.finished - job.created:.1f}s")
+
+    def _expire(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.done and now - job.finished > self.retention
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
@@ -1,17 +1,29 @@
 from typing import Dict, Optional
-import requests
-from flask import Flask, request, send_file, make_response, jsonify
+from flask import Flask, Response, g, request, send_file, make_response, jsonify
+import hashlib
+import json
 import logging
 import tempfile
 import os
-import re
-import base64
-import io
+import shutil
 import subprocess
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from blob_cache import BlobCache
+from block_index import BlockIndex
 from c8y_agent import C8YAgent
-from solution_utils import handle_errors,create_error_response,github_web_url_to_content_api,parse_boolean,remove_root_folders,extract_raw_path
-import yaml 
+from cep_extensions import CepExtensionCatalog
+from epl_parser import parse_epl_header
+from extension_builder import BUILD_CACHE_DIR, BUILD_CACHE_MAX_BYTES, EXTENSION_BUILD_PARALLELISM, ExtensionBuilder, builder_pool
+from extension_jobs import EXTENSION_BUILD_SLOT_WAIT, EXTENSION_BUILD_SLOTS, BuildResult, ExtensionJob, ExtensionJobQueue, JobError, QueueFullError
+from github_downloader import FETCH_MODE_ARCHIVE, GitHubDownloader, fetch_files
+from metrics import GITHUB_BYTES, GITHUB_ERRORS, GITHUB_REQUEST_SECONDS, HTTP_REQUEST_SECONDS, count, labels, render, reset_labels, set_labels, timed
+from rate_limit import RateLimitError, interactive, rate_limits
+from restart_coalescer import RestartCoalescer
+from solution_utils import RequestSnapshot,in_caller_context,handle_errors,create_error_response,github_web_url_to_content_api,parse_boolean,conditional_get,conditional_requests,extract_package,extract_raw_path,EPL_CHUNK_SIZE
+from tracing import current_span, end_trace, record_error, span, start_trace, tag, traced
 
 # Configure logging
 logging.basicConfig(
@@ -24,6 +36,65 @@ logger.setLevel(logging.INFO)
 
 app = Flask(__name__)
 agent = C8YAgent()
+blob_cache = BlobCache()
+build_cache = BlobCache(BUILD_CACHE_DIR, BUILD_CACHE_MAX_BYTES)
+block_index = BlockIndex(blob_cache)
+cep_extensions = CepExtensionCatalog(agent)
+extension_jobs = ExtensionJobQueue()
+# Synchronous builds block a server thread from download to restart, background jobs use the job pool
+build_slots = threading.BoundedSemaphore(EXTENSION_BUILD_SLOTS)
+# The Cumulocity app of the agent, PyYAML and the analytics_builder workers load on first use or
+# in the warm-up of boot.py, after /health answers
+
+
+@app.before_request
+def start_request_trace():
+    """Trace the request, continuing the trace of an incoming traceparent header"""
+    g._trace = start_trace(
+        f"{request.method} {request.endpoint or request.path}",
+        request.headers.get("traceparent"),
+        **{"http.method": request.method, "http.path": request.path},
+    )
+
+
+@app.before_request
+def bind_metric_labels():
+    """
+    Label the metrics recorded for the request with its endpoint. The tenant
+    label is added once the endpoint resolves the tenant (C8YAgent), requests
+    like /health and /metrics never do.
+    """
+    g._metrics_start = time.perf_counter()
+    g._metrics_labels = set_labels(None, request.endpoint)
+
+
+@app.after_request
+def observe_request(response):
+    start = g.pop("_metrics_start", None)
+    if start is not None:
+        HTTP_REQUEST_SECONDS.labels(
+            request.endpoint or "", request.method, str(response.status_code)
+        ).observe(time.perf_counter() - start)
+    root = current_span()
+    if root is not None:
+        root.set("http.status_code", response.status_code)
+        tenant = labels()[0]
+        if tenant:
+            root.set("tenant", tenant)
+        response.headers["X-Trace-Id"] = root.trace_id
+    return response
+
+
+@app.teardown_request
+def unbind_metric_labels(exception=None):
+    token = g.pop("_metrics_labels", None)
+    if token is not None:
+        reset_labels(token)
+
+
+@app.teardown_request
+def end_request_trace(exception=None):
+    end_trace(g.pop("_trace", None), exception)
 
 
 @app.route("/health")
@@ -31,8 +102,21 @@ def health():
     return jsonify({"status": "UP"})
 
 
+@app.route("/metrics")
+def get_metrics():
+    """
+    Get the metrics of the service in the Prometheus text format: request
+    durations per endpoint, GitHub requests, bytes and files, analytics_builder
+    runs, Cumulocity requests (extension uploads, CEP restarts, tenant options)
+    and errors, labelled by tenant and endpoint.
+    """
+    body, content_type = render()
+    return Response(body, content_type=content_type)
+
+
 @app.route("/repository/contentList", methods=["GET"])
 @handle_errors
+@interactive
 def get_content_list():
     """
     Retrieve a list of contents from a specified URL in a repository.
@@ -64,14 +148,17 @@ def get_content_list():
     )
     logger.info(f"Getting content list from: {decoded_content_url} {decoded_url}")
 
-    response = requests.get(decoded_content_url, headers=headers, allow_redirects=True)
-    response.raise_for_status()
+    with span("github.listing", "CLIENT", url=decoded_content_url), timed(GITHUB_REQUEST_SECONDS, GITHUB_ERRORS, operation="listing"):
+        response = conditional_get(decoded_content_url, headers=headers)
+        response.raise_for_status()
+    count(GITHUB_BYTES, len(response.content), operation="listing")
 
     return make_response(response.content, 200, {"Content-Type": "application/json"})
 
 
 @app.route("/repository/content", methods=["GET"])
 @handle_errors
+@interactive
 def get_content():
     """
     Download content from GitHub.
@@ -95,17 +182,129 @@ def get_content():
     headers = get_repository_headers(request, repository_id)
     decoded_url = urllib.parse.unquote(encoded_url)
 
-    response = requests.get(decoded_url, headers=headers, allow_redirects=True)
-    response.raise_for_status()
+    # Streamed responses are not revalidated, only stream when reading the package
+    with span("github.download", "CLIENT", url=decoded_url), timed(GITHUB_REQUEST_SECONDS, GITHUB_ERRORS, operation="download"):
+        response = conditional_get(decoded_url, headers=headers, stream=extract_fqn_cep_block)
+        response.raise_for_status()
+        if extract_fqn_cep_block:
+            # Only read the monitor until the package declaration
+            with response:
+                package = parse_epl_header(response.iter_content(EPL_CHUNK_SIZE), until="package").package
+        else:
+            content = response.content
 
     if extract_fqn_cep_block:
-        package = re.findall(r"(package\s)(.*?);", response.text)
         if not package:
             raise ValueError("Package name not found in monitor file")
-        fqn = f"{package[0][1]}.{cep_block_name}"
+        fqn = f"{package}.{cep_block_name}"
         return make_response(fqn, 200, {"Content-Type": "text/plain"})
 
-    return make_response(response.content, 200, {"Content-Type": "text/plain"})
+    count(GITHUB_BYTES, len(content), operation="download")
+    return make_response(content, 200, {"Content-Type": "text/plain"})
+
+
+@app.route("/repository/contentFqn", methods=["POST"])
+@handle_errors
+@interactive
+def get_content_fqn():
+    """
+    Extract the FQN names of the blocks in many monitors with a single call.
+    The monitors are downloaded concurrently.
+
+    Args (JSON body):
+        repository_id (str): ID of the repository
+        urls (list, optional): Content API URLs of the monitors
+        url (str, optional): Web URL of a repository folder, all monitors in it are
+            used if urls is not given. Defaults to the URL of the repository
+
+    Returns:
+        Response: JSON list with one entry per monitor:
+        {
+            "url": str,
+            "file": str,
+            "name": str,
+            "package": str,
+            "fqn": str,
+            "error": str        (only if the FQN could not be extracted)
+        }
+    """
+    data = request.get_json()
+    repository_id = data.get("repository_id")
+    urls = data.get("urls")
+
+    headers = get_repository_headers(request, repository_id)
+
+    if urls is None:
+        folder_url = data.get("url")
+        if not folder_url:
+            if not repository_id:
+                return create_error_response("Either urls, url or repository_id is required", 400)
+            folder_url = agent.load_repository(
+                request=request, repository_id=repository_id, replace_access_token=False
+            )["url"]
+        listing_url = github_web_url_to_content_api(folder_url)
+        with span("github.listing", "CLIENT", url=listing_url), timed(GITHUB_REQUEST_SECONDS, GITHUB_ERRORS, operation="listing"):
+            response = conditional_get(listing_url, headers=headers)
+            response.raise_for_status()
+        count(GITHUB_BYTES, len(response.content), operation="listing")
+        urls = [
+            item["url"]
+            for item in response.json()
+            if item.get("type") == "file" and item.get("name", "").lower().endswith(".mon")
+        ]
+
+    blocks = []
+    for url, content, error in fetch_files(urls, headers):
+        file_name = urllib.parse.unquote(extract_raw_path(url))
+        block = {"url": url, "file": file_name, "name": os.path.splitext(file_name)[0]}
+        package = extract_package(content.decode("utf-8", errors="replace")) if content else None
+        if package:
+            block["package"] = package
+            block["fqn"] = f"{package}.{block['name']}"
+        else:
+            block["error"] = str(error) if error else "Package name not found in monitor file"
+        blocks.append(block)
+
+    return jsonify(blocks)
+
+
+@app.route("/repository/index", methods=["GET"])
+@handle_errors
+@interactive
+def get_repository_index():
+    """
+    Get the block metadata index of a repository.
+
+    The index is persisted per tenant, repository and ref and rebuilt incrementally
+    once it is older than BLOCK_INDEX_MAX_AGE seconds: only monitors whose blob SHA
+    changed are downloaded and parsed again.
+
+    Args (via query parameters):
+        repository_id (str): ID of the repository
+        refresh (bool, optional): Rebuild the index even if it is recent
+
+    Returns:
+        Response: JSON object with repositoryId, url, builtAt and the list of blocks,
+        each with path, url, sha, file, package, name, fqn, title, description,
+        category, events and parameters
+    """
+    repository_id = request.args.get("repository_id")
+    refresh = parse_boolean(request.args.get("refresh", False))
+    if not repository_id:
+        return create_error_response("repository_id is required", 400)
+
+    repository_configuration = agent.load_repository(
+        request=request, repository_id=repository_id, replace_access_token=False
+    )
+    headers = get_repository_headers(request, repository_id)
+    index = block_index.get(
+        agent.get_tenant_id(request),
+        repository_id,
+        github_web_url_to_content_api(repository_configuration["url"]),
+        headers,
+        refresh,
+    )
+    return jsonify(index)
 
 
 @app.route("/repository/configuration", methods=["GET"])
@@ -151,217 +350,231 @@ def update_repositories():
     return agent.update_repositories(request, repositories)
 
 
-def download_github_content(url, headers, work_dir,skip_root_folder=True, item=None):
+def download_repository_content(
+    repository_configuration, urls, headers, work_dir, skip_root_folder=True, namespace=None
+):
     """
-    Download content from GitHub, handling both files and directories.
-    If item is provided, it's a specific file/directory to download.
-    If not, we fetch the contents at the URL.
+    Download content from GitHub using the fetch mode configured for the repository.
+    In archive mode all URLs are served from one repository tarball, if that fails
+    the content is downloaded file by file.
 
     Args:
-        url (str): URL pointing to GitHub API endpoint for repository content
+        repository_configuration (dict): Repository as returned by load_repository
+        urls (list): URLs pointing to GitHub API endpoints for repository content
         headers (dict): Headers to include in API requests (auth tokens, etc.)
         work_dir (str): Directory to save downloaded content to
-        item (dict, optional): Single item to process (used in recursive calls)
+        skip_root_folder (bool): Strip the leading folder of the repository paths
+        namespace (str): Tenant namespace in the blob cache
     """
-    if item is None:
-        # No specific item provided, get the contents from the URL
-        logger.info(f"Fetching contents from {url}")
-        response = requests.get(url, headers=headers, allow_redirects=True)
-        response.raise_for_status()
-
+    downloader = GitHubDownloader(
+        headers, work_dir, skip_root_folder, cache=blob_cache, namespace=namespace
+    )
+    if repository_configuration.get("fetchMode") == FETCH_MODE_ARCHIVE:
         try:
-            content_response = response.json()
-
-            # Check if response is a list of items or a single item
-            if isinstance(content_response, list):
-                for item in content_response:
-                    if (skip_root_folder):
-                        item["path"] = remove_root_folders(item["path"], 1)
-                    download_github_content(url, headers, work_dir, skip_root_folder, item)
-            else:
-                logger.warning(f"Unexpected content format from {url}")
-            return
-        except ValueError:
-            # Single file
-            file_name = extract_raw_path(url)
-            full_path = os.path.join(work_dir, file_name)
-            with open(full_path, "wb") as f:
-                f.write(response.content)
-            logger.info(f"Saving single file {url}, {full_path}")
+            downloader.download_archive(urls)
             return
+        except Exception:
+            logger.warning(
+                f"Archive download failed for {repository_configuration['id']}, falling back to file download",
+                exc_info=True,
+            )
+            for entry in os.scandir(work_dir):
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
 
-    # Process a specific item
-    item_path = item.get("path", "")
-    item_type = item.get("type", "")
-    item_url = item.get("url", "")
-    download_url = item.get("download_url")
+    for url in urls:
+        downloader.download(url)
 
-    logger.info(f"Processing {item_type}: {item_path}")
 
-    # Extract relative path by removing left folder name
-    if (skip_root_folder):
-        relative_path = remove_root_folders(item_path, 1)
-    else:
-        relative_path = item_path
-        
-
-    # Full path in the work directory
-    full_path = os.path.join(work_dir, relative_path)
-
-    logger.debug(f"Item path: {item_path}")
-    logger.debug(f"Relative path: {relative_path}")
-    logger.debug(f"Full path: {full_path}")
-
-    if item_type == "file":
-        # Create parent directories if they don't exist
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-
-        # Download file content
-        if download_url:
-            # Use the direct download URL if available
-            logger.info(f"Downloading file from {download_url}")
-            file_response = requests.get(
-                download_url, headers=headers, allow_redirects=True
-            )
-            file_response.raise_for_status()
+def upload_extension(request, extension_name, extension_zip):
+    """Upload an extension binary, the deployed extensions changed"""
+    id = agent.upload_extension(request, extension_name, extension_zip)
+    cep_extensions.invalidate(agent.get_tenant_id(request))
+    return id
 
-            # Write file content
-            with open(full_path, "wb") as f:
-                f.write(file_response.content)
 
-            logger.info(f"File downloaded and saved to: {full_path}")
-        else:
-            # Use the API URL and handle GitHub API response format
-            logger.info(f"Fetching file content from API: {item_url}")
-            content_response = requests.get(
-                item_url, headers=headers, allow_redirects=True
-            )
-            content_response.raise_for_status()
+def restart_cep_now(request):
+    """Restart CEP, the loaded extensions are collected again afterwards"""
+    agent.restart_cep(request)
+    cep_extensions.invalidate(agent.get_tenant_id(request))
 
-            try:
-                # Try to parse as JSON (GitHub API format)
-                content_data = content_response.json()
 
-                if isinstance(content_data, dict) and "content" in content_data:
-                    # GitHub API returns base64 encoded content
-                    content = base64.b64decode(content_data["content"])
+restart_coalescer = RestartCoalescer(restart_cep_now)
 
-                    with open(full_path, "wb") as f:
-                        f.write(content)
 
-                    logger.info(f"File downloaded and saved to: {full_path}")
-                else:
-                    logger.warning(f"Unexpected content format for file: {item_path}")
-            except ValueError:
-                # Not JSON, treat as raw content
-                with open(full_path, "wb") as f:
-                    f.write(content_response.content)
-
-                logger.info(f"Raw content saved to: {full_path}")
-
-    elif item_type == "dir":
-        # Create directory if it doesn't exist
-        os.makedirs(full_path, exist_ok=True)
-        logger.info(f"Created directory: {full_path}")
-
-        # Recursively process directory contents
-        dir_response = requests.get(item_url, headers=headers, allow_redirects=True)
-        dir_response.raise_for_status()
-
-        dir_contents = dir_response.json()
-
-        # Process each item in the directory
-        if isinstance(dir_contents, list):
-            for dir_item in dir_contents:
-                dir_item["path"] = remove_root_folders(dir_item["path"], 1)
-                download_github_content(url, headers, work_dir, skip_root_folder, dir_item)
-        else:
-            logger.warning(f"Expected directory listing as a list for {item_path}")
+def restart_cep(request, uploads):
+    """
+    Restart CEP to deploy uploaded extensions. Restarts requested for the tenant
+    while another is scheduled or running are merged into one, the call returns
+    once that restart happened or failed.
 
-    else:
-        logger.warning(f"Unknown item type: {item_type} for {item_path}")
+    Args:
+        request: The request, or a snapshot of it
+        uploads (list): Names of the uploaded extensions the restart deploys
 
+    Returns:
+        RestartHandle shared by all uploads deployed with the same restart
+    """
+    with span("cep.restart", extensions=",".join(uploads)):
+        handle = restart_coalescer.request_restart(
+            agent.get_tenant_id(request), RequestSnapshot(request), uploads
+        )
+        handle.wait()
+        tag("restart", handle.id)
+    return handle
 
-@app.route("/extension/repository", methods=["POST"])
-@handle_errors
-def create_extension():
+
+def run_build(kind, data, build):
     """
-    Get details for a specific extension.
+    Run a build in the request, or as background job if the request asks for it
+    with "async". A job answers 202 with the job, to be polled at /extension/jobs/<id>.
+    At most EXTENSION_BUILD_SLOTS builds run in requests at the same time, so
+    the server keeps threads for the other endpoints.
 
     Args:
-        name (str):         Name of the extension
-        repository (dict):  Repository with extensions
-        upload (boolean):   Upload extension
-        deploy (boolean):   Deploy/restart Analytics to deploy
+        kind (str): Type of build, e.g. repository, list or yaml
+        data (dict): Body of the request
+        build (callable): build(request, data, job, work_dir) -> BuildResult, where
+            request is the request or a snapshot of it when running as job
+    """
+    work_dir = tempfile.mkdtemp(prefix=f"extension-{kind}-")
+    if parse_boolean(data.get("async", False)):
+        snapshot = RequestSnapshot(request)
+        key = hashlib.sha256(
+            json.dumps({k: v for k, v in data.items() if k != "async"}, sort_keys=True).encode()
+        ).hexdigest()
+        try:
+            job = extension_jobs.submit(
+                agent.get_tenant_id(request),
+                kind,
+                f"{kind}:{key}",
+                in_caller_context(lambda job: build(snapshot, data, job, job.work_dir)),
+                work_dir,
+            )
+        except QueueFullError as e:
+            return create_error_response(str(e), 503)
+        return jsonify(job.to_json()), 202
 
+    if not build_slots.acquire(timeout=EXTENSION_BUILD_SLOT_WAIT):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return create_error_response(
+            f"All {EXTENSION_BUILD_SLOTS} build slots are busy, retry later or build with async", 503
+        )
+    # Progress of a synchronous build is only logged
+    job = ExtensionJob(None, kind, None, work_dir)
+    try:
+        response = build_response(build(request, data, job, work_dir))
+    except JobError as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return create_error_response(e.message, e.status_code)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    finally:
+        build_slots.release()
+    # A built extension is streamed from the work directory, remove it once sent
+    response.call_on_close(lambda: shutil.rmtree(work_dir, ignore_errors=True))
+    return response
+
+
+def build_response(result):
     """
-    data = request.get_json()
-    extension_name = data.get("extension_name")
-    repository = data.get("repository")
-    upload = data.get("upload", False)
-    deploy = data.get("deploy", False)
+    Turn a BuildResult into a response. A built extension is streamed from disk
+    in chunks, the file must exist until the response is closed.
+    """
+    if result.file_path:
+        return send_file(
+            result.file_path,
+            mimetype="application/zip",
+            as_attachment=True,
+            download_name=result.file_name,
+        )
+    return make_response(jsonify(result.body), result.status_code)
 
-    if not extension_name:
-        return create_error_response("Extension name is required", 400)
 
-    repository_configuration = agent.load_repository(
-        request=request, repository_id=repository["id"], replace_access_token=False
-    )
-    with tempfile.TemporaryDirectory() as work_temp_dir:
-        # Download and process monitors
-        try:
+def build_and_deliver(request, job, work_dir, extension_name, namespace, upload, deploy):
+    """
+    Build the extension from the downloaded monitors in work_dir, then upload and
+    deploy it or return it as file.
+    """
+    job.set_phase("building")
+    builder = ExtensionBuilder(work_dir, extension_name, build_cache, namespace)
+    try:
+        builder.build()
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        raise JobError(f"Failed to build extension: {str(e)}", 500)
+    job.details["cached"] = builder.cached
 
-            headers = get_repository_headers(request, repository_configuration["id"])
+    if not upload:
+        return BuildResult(200, file_path=builder.get_file_path(), file_name=builder.extension_file)
 
-            api_url = github_web_url_to_content_api(repository_configuration["url"])
-            download_github_content(api_url, headers, work_temp_dir)
+    # Handle the extension file
+    try:
+        job.set_phase("uploading")
+        with open(builder.get_file_path(), "rb") as extension_zip:
+            id = upload_extension(request, extension_name, extension_zip)
+        logger.info(f"Uploaded extension {extension_name} as {id}")
+
+        result = {"name": extension_name, "id": id}
+        if deploy:
+            job.set_phase("restarting")
+            result["restart"] = restart_cep(request, [extension_name]).to_json()
+    except Exception as e:
+        raise JobError(f"Failed to process extension: {str(e)}", 500)
+    return BuildResult(201, body=result)
 
-        except Exception as e:
-            logger.error(
-                f"Error downloading monitor: {repository_configuration}", exc_info=True
-            )
-            return create_error_response(f"Failed to download monitor: {str(e)}", 400)
 
-        # Create extension
-        result_extension_file = f"{extension_name}.zip"
-        result_extension_absolute = os.path.join(work_temp_dir, result_extension_file)
+@app.route("/extension/repository", methods=["POST"])
+@handle_errors
+def create_extension():
+    """
+    Create an extension from all monitors of a repository.
 
-        try:
-            subprocess.run(
-                [
-                    "/apama_work/apama-analytics-builder-block-sdk/analytics_builder",
-                    "build",
-                    "extension",
-                    "--input",
-                    work_temp_dir,
-                    "--output",
-                    result_extension_absolute,
-                ],
-                check=True,
-            )
-        except subprocess.CalledProcessError as e:
-            return create_error_response(f"Failed to build extension: {str(e)}", 500)
+    Args:
+        extension_name (str): Name of the extension
+        repository (dict):    Repository with extensions
+        upload (boolean):     Upload extension
+        deploy (boolean):     Deploy/restart Analytics to deploy
+        async (boolean):      Build as background job, answer 202 with the job
+    """
+    data = request.get_json()
+    if not data.get("extension_name"):
+        return create_error_response("Extension name is required", 400)
+    return run_build("repository", data, build_repository_extension)
 
-        # Handle the extension file
-        try:
-            with open(result_extension_absolute, "rb") as extension_zip:
-                if not upload:
-                    return send_file(
-                        io.BytesIO(extension_zip.read()),
-                        mimetype="application/zip",
-                        as_attachment=True,
-                        download_name=result_extension_file,
-                    )
-                else:
-                    id = agent.upload_extension(request, extension_name, extension_zip)
-                    logger.info(f"Uploaded extension {extension_name} as {id}")
 
-                    if deploy:
-                        agent.restart_cep(request)
+def build_repository_extension(request, data, job, work_dir):
+    """Build the extension of /extension/repository, see run_build"""
+    repository_configuration = agent.load_repository(
+        request=request, repository_id=data["repository"]["id"], replace_access_token=False
+    )
+    namespace = agent.get_tenant_id(request)
 
-                    return "", 201
-        except Exception as e:
-            return create_error_response(f"Failed to process extension: {str(e)}", 500)
+    # Download and process monitors
+    try:
+        job.set_phase("downloading")
+        headers = get_repository_headers(request, repository_configuration["id"])
+        api_url = github_web_url_to_content_api(repository_configuration["url"])
+        download_repository_content(
+            repository_configuration, [api_url], headers, work_dir, namespace=namespace
+        )
+    except Exception as e:
+        logger.error(
+            f"Error downloading monitor: {repository_configuration}", exc_info=True
+        )
+        raise JobError(f"Failed to download monitor: {str(e)}", 429 if isinstance(e, RateLimitError) else 400)
+
+    return build_and_deliver(
+        request,
+        job,
+        work_dir,
+        data["extension_name"],
+        namespace,
+        data.get("upload", False),
+        data.get("deploy", False),
+    )
 
 
 @app.route("/extension/yaml", methods=["POST"])
@@ -369,6 +582,9 @@ def create_extension():
 def create_extension_from_yaml():
     """
     Create multiple extension zip files from a YAML structure - one per section.
+    Sections are downloaded and built concurrently (EXTENSION_BUILD_PARALLELISM),
+    uploaded as they finish and deployed with a single restart. Without upload
+    the extension of the first valid section is returned as file.
 
     Args:
         name (string):        name for the extension
@@ -377,224 +593,290 @@ def create_extension_from_yaml():
         repository (dict):    Repository to access
         upload (boolean):     Upload extensions
         deploy (boolean):     Deploy/restart Analytics to deploy
+        async (boolean):      Build as background job, answer 202 with the job
+
+    Returns:
+        Response: The uploaded extensions and the progress of every section, with
+        status, number of files, download and build time and error if it failed
     """
     data = request.get_json()
+    if not data.get("yaml", {}):
+        return create_error_response("YAML structure is required", 400)
+    return run_build("yaml", data, build_yaml_extensions)
+
+
+def build_yaml_extensions(request, data, job, work_dir):
+    """Build the extensions of /extension/yaml, see run_build"""
     yaml_data = data.get("yaml", {})
     sections = data.get("sections", [])
-    repository = data.get("repository")
     upload = data.get("upload", False)
     deploy = data.get("deploy", False)
 
-    if not yaml_data:
-        return create_error_response("YAML structure is required", 400)
-
     repository_configuration = agent.load_repository(
-        request=request, repository_id=repository["id"], replace_access_token=False
+        request=request, repository_id=data["repository"]["id"], replace_access_token=False
     )
-    base_url = repository_configuration["url"]
     headers = get_repository_headers(request, repository_configuration["id"])
 
     # Get and parse the YAML content
     try:
         url = yaml_data["url"]
-        response = requests.get(url, headers=headers, allow_redirects=True)
+        with span("github.download", "CLIENT", url=url), timed(GITHUB_REQUEST_SECONDS, GITHUB_ERRORS, operation="download"):
+            response = conditional_get(url, headers=headers)
+        count(GITHUB_BYTES, len(response.content), operation="download")
         yaml_content = response.text
-        yaml_structure = yaml.safe_load(yaml_content)
-
-        if not yaml_structure or not isinstance(yaml_structure, dict):
-            return create_error_response("Invalid YAML structure", 400)
-        
-        # Assuming yaml_structure is your loaded YAML content
-        # and sections is your array of section names to include
+        import yaml
 
-        # If sections is empty, process all sections
-        if not sections:
-            sections_to_process = list(yaml_structure.keys())
-        else:
-            # Only process sections that exist in the YAML
-            sections_to_process = [s for s in sections if s in yaml_structure]
-            
+        yaml_structure = yaml.safe_load(yaml_content)
     except Exception as e:
         logger.error(f"Error fetching or parsing YAML: {e}", exc_info=True)
-        return create_error_response(f"Failed to fetch or parse YAML: {str(e)}", 400)
+        raise JobError(f"Failed to fetch or parse YAML: {str(e)}", 429 if isinstance(e, RateLimitError) else 400)
 
-    # Process each section as a separate extension
-    uploaded_extensions = []
-    section_idx = 0
-    # Process each selected section
+    if not yaml_structure or not isinstance(yaml_structure, dict):
+        raise JobError("Invalid YAML structure", 400)
+
+    # If sections is empty, process all sections
+    if not sections:
+        sections_to_process = list(yaml_structure.keys())
+    else:
+        # Only process sections that exist in the YAML
+        sections_to_process = [s for s in sections if s in yaml_structure]
+
+    # Only the first valid section is built when the extension is returned as a file
+    valid_sections = []
     for section_name in sections_to_process:
         section_data = yaml_structure[section_name]
-            # Check if this section has a 'files' key
-        if 'files' in section_data and isinstance(section_data['files'], list):
-            files = section_data['files']
-            section_idx = section_idx +1
-            logger.info(f"Processing section '{section_name}' with {len(files)} files")
-        
-            logger.info(f"Processing files for section '{section_name}':")
-                     
-                # Create a temp dir for this extension
-            with tempfile.TemporaryDirectory() as work_temp_dir:
-                # Download all files for this section
-                try:
-                    for file_path in files:
-                        file_url = f"{base_url}/{file_path}"
-                        logger.info(f"Downloading file '{file_url}', '{base_url}', '{file_path}'")
-                        api_url = github_web_url_to_content_api(file_url)
-                        download_github_content(api_url, headers, work_temp_dir, False)
-                        logger.info(f"Downloaded {file_path} from {api_url}")
-                        
-                except Exception as e:
-                    logger.error(f"Error downloading files for section '{section_name}': {e}", exc_info=True)
-                    return create_error_response(f"Failed to download files for '{section_name}': {str(e)}", 400)
-
-                # Build extension for this section
-                extension_name = section_name
-                result_extension_file = f"{extension_name}.zip"
-                result_extension_absolute = os.path.join(work_temp_dir, result_extension_file)
-                
-                try:
-                    subprocess.run(
-                        [
-                            "/apama_work/apama-analytics-builder-block-sdk/analytics_builder",
-                            "build",
-                            "extension",
-                            "--input",
-                            work_temp_dir,
-                            "--output",
-                            result_extension_absolute,
-                        ],
-                        check=True,
-                    )
-                except subprocess.CalledProcessError as e:
-                    return create_error_response(f"Failed to build extension for '{section_name}': {str(e)}", 500)
-
-                # Handle the extension file
-                try:
-                    with open(result_extension_absolute, "rb") as extension_zip:
-                        if not upload:
-                            # If not uploading, return the first extension as a file
-                            if section_idx == 0:
-                                return send_file(
-                                    io.BytesIO(extension_zip.read()),
-                                    mimetype="application/zip",
-                                    as_attachment=True,
-                                    download_name=result_extension_file,
-                                )
-                        else:
-                            # Upload the extension
-                            id = agent.upload_extension(request, extension_name, extension_zip)
-                            logger.info(f"Uploaded extension {extension_name} as {id}")
-                            uploaded_extensions.append({
-                                "name": extension_name,
-                                "id": id
-                            })
-                            
-                            # Only restart after the last extension is uploaded
-                            is_last_section = section_idx == len(yaml_structure) - 1
-                            if deploy and is_last_section and uploaded_extensions:
-                                logger.info("Restarting Analytics Builder engine")
-                                agent.restart_cep(request)
-                            
-                except Exception as e:
-                    return create_error_response(f"Failed to process extension for '{section_name}': {str(e)}", 500)
+        if isinstance(section_data, dict) and isinstance(section_data.get("files"), list):
+            valid_sections.append(section_name)
         else:
             logger.error(f"Section '{section_name}' has no 'files' list or invalid format")
+    if not valid_sections:
+        raise JobError("No valid sections found in YAML", 400)
+    if not upload:
+        valid_sections = valid_sections[:1]
+
+    # Sections are downloaded and built concurrently, each one is uploaded as soon as it is built
+    namespace = agent.get_tenant_id(request)
+    progress = {name: {"name": name, "status": "pending"} for name in valid_sections}
+    job.details["sections"] = [progress[name] for name in valid_sections]
+    job.set_phase("building")
+    uploaded_extensions = []
+    with ThreadPoolExecutor(
+        max_workers=EXTENSION_BUILD_PARALLELISM, thread_name_prefix="section-build"
+    ) as executor:
+        futures = {
+            executor.submit(
+                in_caller_context(build_yaml_section),
+                repository_configuration,
+                section_name,
+                yaml_structure[section_name]["files"],
+                headers,
+                namespace,
+                progress[section_name],
+                work_dir,
+            ): section_name
+            for section_name in valid_sections
+        }
+        for future in as_completed(futures):
+            section_name = futures[future]
+            section_progress = progress[section_name]
+            builder = future.result()
+            if builder is None:
+                continue
+            if not upload:
+                return BuildResult(
+                    200, file_path=builder.get_file_path(), file_name=builder.extension_file
+                )
+            try:
+                section_progress["status"] = "uploading"
+                with open(builder.get_file_path(), "rb") as extension_zip:
+                    id = upload_extension(request, section_name, extension_zip)
+                logger.info(f"Uploaded extension {section_name} as {id}")
+                uploaded_extensions.append({"name": section_name, "id": id})
+                section_progress.update(status="uploaded", id=id)
+            except Exception as e:
+                logger.error(f"Error processing extension for '{section_name}': {e}", exc_info=True)
+                section_progress.update(
+                    status="failed", error=f"Failed to process extension for '{section_name}': {str(e)}"
+                )
+            finally:
+                shutil.rmtree(builder.work_dir, ignore_errors=True)
+
+    result = {
+        "uploaded_extensions": uploaded_extensions,
+        "sections": [progress[name] for name in valid_sections],
+    }
+
+    # One restart deploys all uploaded extensions
+    if deploy and uploaded_extensions:
+        logger.info("Restarting Analytics Builder engine")
+        job.set_phase("restarting")
+        result["restart"] = restart_cep(
+            request, [extension["name"] for extension in uploaded_extensions]
+        ).to_json()
+    failed = [name for name in valid_sections if progress[name]["status"] == "failed"]
+    if failed:
+        result["message"] = f"Error: Failed to create extensions for {', '.join(failed)}"
+        return BuildResult(500, body=result)
+    return BuildResult(201, body=result)
+
+
+@traced("yaml.section", kind=None)
+def build_yaml_section(repository_configuration, section_name, files, headers, namespace, progress, work_dir):
+    """
+    Download the files of a YAML section and build its extension. Runs in a worker
+    thread, so it must not access the request.
+
+    Args:
+        repository_configuration (dict): Repository as returned by load_repository
+        section_name (str): Name of the section, used as name of the extension
+        files (list): Paths of the files of the section, relative to the repository URL
+        headers (dict): Headers to include in API requests
+        namespace (str): Tenant namespace in the blob and build cache
+        progress (dict): Progress of the section, updated in place
+        work_dir (str): Directory to create the work directory of the section in
+
+    Returns:
+        ExtensionBuilder of the built extension, None if the section failed. The
+        caller removes the work directory of the builder.
+    """
+    tag("section", section_name)
+    tag("files", len(files))
+    base_url = repository_configuration["url"]
+    work_dir = tempfile.mkdtemp(prefix="section-", dir=work_dir)
+    progress["files"] = len(files)
+    try:
+        progress["status"] = "downloading"
+        start = time.perf_counter()
+        api_urls = [github_web_url_to_content_api(f"{base_url}/{file_path}") for file_path in files]
+        download_repository_content(
+            repository_configuration, api_urls, headers, work_dir, False, namespace=namespace
+        )
+        progress["downloadSeconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Downloaded {len(api_urls)} files for section '{section_name}'")
+    except Exception as e:
+        record_error(e)
+        logger.error(f"Error downloading files for section '{section_name}': {e}", exc_info=True)
+        progress.update(status="failed", error=f"Failed to download files for '{section_name}': {str(e)}")
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return None
+
+    builder = ExtensionBuilder(work_dir, section_name, build_cache, namespace)
+    try:
+        progress["status"] = "building"
+        start = time.perf_counter()
+        builder.build()
+        progress["buildSeconds"] = round(time.perf_counter() - start, 3)
+        progress.update(status="built", cached=builder.cached)
+    except Exception as e:
+        record_error(e)
+        logger.error(f"Error building extension for section '{section_name}': {e}", exc_info=True)
+        progress.update(status="failed", error=f"Failed to build extension for '{section_name}': {str(e)}")
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return None
+    return builder
 
-    # Return the results of the uploads
-    if upload:
-        return {"uploaded_extensions": uploaded_extensions}, 201
-    else:
-        # If we get here without returning a file, it means there were no valid sections
-        return create_error_response("No valid sections found in YAML", 400)
 
 @app.route("/extension/list", methods=["POST"])
 @handle_errors
 def create_extension_from_list():
     """
-    Get details for a specific extension.
+    Create an extension from a list of monitors.
 
     Args:
         extension_name (str):  Name of the extension
         monitors (list):       List of monitors to include in the extensions
         repository (dict):     Repository to access
         upload (boolean):      Upload extension
-        deploy (boolean):       Deploy/restart Analytics to deploy
+        deploy (boolean):      Deploy/restart Analytics to deploy
+        async (boolean):       Build as background job, answer 202 with the job
     """
     data = request.get_json()
-    extension_name = data.get("extension_name")
-    monitors = data.get("monitors", [])
-    repository = data.get("repository")
-    upload = data.get("upload", False)
-    deploy = data.get("deploy", False)
-
-    if not extension_name:
+    if not data.get("extension_name"):
         return create_error_response("Extension name is required", 400)
 
-    if len(monitors) != 1:
+    if len(data.get("monitors", [])) != 1:
         return create_error_response("Exactly one item in monitors is required", 400)
+    return run_build("list", data, build_list_extension)
+
 
+def build_list_extension(request, data, job, work_dir):
+    """Build the extension of /extension/list, see run_build"""
     repository_configuration = agent.load_repository(
-        request=request, repository_id=repository["id"], replace_access_token=False
+        request=request, repository_id=data["repository"]["id"], replace_access_token=False
     )
-    with tempfile.TemporaryDirectory() as work_temp_dir:
-        # Download and process monitors
-        try:
+    namespace = agent.get_tenant_id(request)
 
-            headers = get_repository_headers(request, repository_configuration["id"])
+    # Download and process monitors
+    try:
+        job.set_phase("downloading")
+        headers = get_repository_headers(request, repository_configuration["id"])
+        api_url = data["monitors"][0]["url"]
+        download_repository_content(
+            repository_configuration, [api_url], headers, work_dir, namespace=namespace
+        )
+    except Exception as e:
+        logger.error(
+            f"Error downloading monitor: {repository_configuration}", exc_info=True
+        )
+        raise JobError(f"Failed to download monitor: {str(e)}", 429 if isinstance(e, RateLimitError) else 400)
+
+    return build_and_deliver(
+        request,
+        job,
+        work_dir,
+        data["extension_name"],
+        namespace,
+        data.get("upload", False),
+        data.get("deploy", False),
+    )
 
-            if monitors[0]["type"] == "file":
-                api_url = monitors[0]["url"]
-                download_github_content(api_url, headers, work_temp_dir)
-            else:
-                api_url = monitors[0]["url"]
-                download_github_content(api_url, headers, work_temp_dir)
 
-        except Exception as e:
-            logger.error(
-                f"Error downloading monitor: {repository_configuration}", exc_info=True
-            )
-            return create_error_response(f"Failed to download monitor: {str(e)}", 400)
+@app.route("/extension/jobs", methods=["GET"])
+@handle_errors
+def get_extension_jobs():
+    """
+    Get the extension build jobs of the calling tenant.
 
-        # Create extension
-        result_extension_file = f"{extension_name}.zip"
-        result_extension_absolute = os.path.join(work_temp_dir, result_extension_file)
+    Returns:
+        Response: JSON list of jobs, see get_extension_job
+    """
+    jobs = extension_jobs.list(agent.get_tenant_id(request))
+    return jsonify([job.to_json() for job in jobs])
 
-        try:
-            subprocess.run(
-                [
-                    "/apama_work/apama-analytics-builder-block-sdk/analytics_builder",
-                    "build",
-                    "extension",
-                    "--input",
-                    work_temp_dir,
-                    "--output",
-                    result_extension_absolute,
-                ],
-                check=True,
-            )
-        except subprocess.CalledProcessError as e:
-            return create_error_response(f"Failed to build extension: {str(e)}", 500)
 
-        # Handle the extension file
-        try:
-            with open(result_extension_absolute, "rb") as extension_zip:
-                if not upload:
-                    return send_file(
-                        io.BytesIO(extension_zip.read()),
-                        mimetype="application/zip",
-                        as_attachment=True,
-                        download_name=result_extension_file,
-                    )
-                else:
-                    id = agent.upload_extension(request, extension_name, extension_zip)
-                    logger.info(f"Uploaded extension {extension_name} as {id}")
+@app.route("/extension/jobs/<job_id>", methods=["GET"])
+@handle_errors
+def get_extension_job(job_id: str):
+    """
+    Get the state of an extension build job.
 
-                    if deploy:
-                        agent.restart_cep(request)
+    Args:
+        job_id (str): ID of the job, as returned by the build endpoints with async
 
-                    return "", 201
-        except Exception as e:
-            return create_error_response(f"Failed to process extension: {str(e)}", 500)
+    Returns:
+        Response: JSON object with id, kind, status (queued, running, succeeded,
+        failed), current phase, the phases with their start time, the result
+        or error, and the name of the artifact if the extension is returned as file
+    """
+    job = extension_jobs.get(agent.get_tenant_id(request), job_id)
+    if job is None:
+        return create_error_response(f"Job {job_id} not found", 404)
+    return jsonify(job.to_json())
+
+
+@app.route("/extension/jobs/<job_id>/artifact", methods=["GET"])
+@handle_errors
+def get_extension_job_artifact(job_id: str):
+    """
+    Download the extension built by a job that did not upload it.
+
+    Args:
+        job_id (str): ID of the job
+    """
+    job = extension_jobs.get(agent.get_tenant_id(request), job_id)
+    if job is None or job.result is None or not job.result.file_path:
+        return create_error_response(f"No extension for job {job_id}", 404)
+    return build_response(job.result)
 
 
 @app.route("/cep/extension/<name>", methods=["GET"])
@@ -604,7 +886,7 @@ def get_extension(name: str):
     Get details for a specific extension.
 
     Args:
-        name (str): Name of monitor to download
+        name (str): Name of the extension
 
     Returns:
         Response: JSON object containing extension details with the following structure:
@@ -614,7 +896,9 @@ def get_extension(name: str):
             "name": str,
             "analytics": List[CEP_Block],
             "version": str,
-            "loaded": bool
+            "loaded": bool,
+            "extensionType": str,       "zip" for zip extensions
+            "contents": List[str]       files of zip extensions
         }
 
         Where CEP_Block is:
@@ -633,27 +917,36 @@ def get_extension(name: str):
             "category": Category
         }
     """
-    # Implement actual extension retrieval logic
-    cep_extension = {"name": name}  # Placeholder
-    return jsonify(cep_extension)
+    extension = cep_extensions.get_extension(request, name)
+    if extension is None:
+        return create_error_response(f"Extension {name} not found", 404)
+    return jsonify(extension)
 
 
 @app.route("/cep/extension", methods=["GET"])
 @handle_errors
 def get_extension_metadata():
     """
-    Get details on all loaded extensions.
+    Get the deployed extensions and the blocks of all loaded extensions in one
+    response. CEP is queried concurrently, the result is cached until the next
+    restart of CEP through this service.
+
+    Args:
+        refresh (bool): Collect again, e.g. after CEP was restarted elsewhere
 
     Returns:
         Response: JSON object containing extension metadata with structure:
         {
+            "extensions": List[ManagedObject],   inventory binaries with loaded, extensionType, blocksCount
+            "blocks": List[CEP_Block],           blocks of the loaded extensions, with extension and custom
             "metadatas": List[str],
-            "messages": List[str]
+            "messages": List[str],
+            "collectedAt": float
         }
     """
-    # Implement actual metadata retrieval logic
-    cep_extension_metadata = []  # Placeholder
-    return jsonify(cep_extension_metadata)
+    refresh = parse_boolean(request.args.get("refresh", False))
+    catalog = cep_extensions.get(request, refresh)
+    return jsonify({key: value for key, value in catalog.items() if key != "details"})
 
 
 @app.route("/cep/id", methods=["GET"])
@@ -685,6 +978,137 @@ def get_cep_ctrl_status():
         return create_error_response("CEP control status not found", 404)
     return jsonify(result)
 
+
+@app.route("/cep/restart/<restart_id>", methods=["GET"])
+@handle_errors
+def get_cep_restart(restart_id: str):
+    """
+    Get a restart of CEP requested by a deployment. Deployments requested
+    while a restart is scheduled or running share one restart.
+
+    Args:
+        restart_id (str): ID of the restart, as returned in "restart" by the build endpoints
+
+    Returns:
+        Response: JSON object with id, status (scheduled, restarting, restarted,
+        failed), the error of a failed restart, the time it was requested,
+        scheduled (null while it waits for a running restart) and finished, and
+        the uploads it covers
+    """
+    restart = restart_coalescer.get(agent.get_tenant_id(request), restart_id)
+    if restart is None:
+        return create_error_response(f"Restart {restart_id} not found", 404)
+    return jsonify(restart.to_json())
+
+
+@app.route("/diagnostics/cache", methods=["GET"])
+@handle_errors
+def get_cache_diagnostics():
+    """
+    Get statistics of the repository blob cache and the extension build cache.
+
+    Returns:
+        Response: JSON object with hits, misses, evictions and size of the cache,
+        plus the same figures for the namespace of the calling tenant. The figures
+        of the build cache are included as "builds", those of the deployed
+        extensions view as "cepExtensions", those of the repository
+        configurations as "repositories" and the hits, misses and size of the
+        tenant cache of c8y_api as "tenants"
+    """
+    tenant_id = agent.get_tenant_id(request)
+    return jsonify(
+        {
+            **blob_cache.stats(tenant_id),
+            "builds": build_cache.stats(tenant_id),
+            "cepExtensions": cep_extensions.stats(),
+            "repositories": agent.repository_cache.stats(),
+            "tenants": agent.tenant_instances.stats(),
+        }
+    )
+
+
+@app.route("/extension/cache", methods=["DELETE"])
+@handle_errors
+def clear_build_cache():
+    """
+    Invalidate the cached extension builds of the calling tenant, the next build
+    of every extension runs analytics_builder again.
+
+    Returns:
+        Response: JSON object with the number of removed builds
+    """
+    removed = build_cache.clear(agent.get_tenant_id(request))
+    logger.info(f"Removed {removed} cached extension builds")
+    return jsonify({"removed": removed})
+
+
+@app.route("/diagnostics/http", methods=["GET"])
+@handle_errors
+def get_http_diagnostics():
+    """
+    Get statistics of the conditional requests sent to GitHub.
+
+    Returns:
+        Response: JSON object with the number of requests, how many of them were sent
+        as conditional requests and how many were answered with 304 Not Modified,
+        i.e. how many full downloads were saved
+    """
+    return jsonify(conditional_requests.stats())
+
+
+@app.route("/diagnostics/builder", methods=["GET"])
+@handle_errors
+def get_builder_diagnostics():
+    """
+    Get statistics of the warm analytics_builder workers.
+
+    Returns:
+        Response: JSON object with the configured size of the pool, the entry script
+        of the workers (null if the pool is off), the idle, busy and starting workers,
+        builds run on warm workers and as cold subprocess, workers recycled after
+        maxBuilds builds, workers that failed a build or health check and failed starts
+    """
+    return jsonify(builder_pool.stats())
+
+
+@app.route("/diagnostics/ratelimit", methods=["GET"])
+@handle_errors
+def get_rate_limit_diagnostics():
+    """
+    Get the GitHub rate limit budget of the repositories of the tenant, as last
+    reported by GitHub and tracked by the request scheduler.
+
+    Returns:
+        Response: JSON object with "repositories", one entry per repository with
+        id, name, the budget key of its token ("anonymous" without token) and the
+        budget (limit, remaining, reset, requests in flight, waits, secondary
+        limits hit and requests rejected, null before the first request), and
+        the scheduler settings in "scheduler"
+    """
+    repositories = []
+    for repository in agent.load_repositories(request):
+        identity = rate_limits.identity(get_repository_headers(request, repository["id"]))
+        repositories.append(
+            {
+                "id": repository["id"],
+                "name": repository.get("name"),
+                "token": identity,
+                "budget": rate_limits.budget(identity),
+            }
+        )
+    return jsonify(
+        {
+            "repositories": repositories,
+            "scheduler": {
+                "interactiveReserve": rate_limits.interactive_reserve,
+                "paceBelow": rate_limits.pace_below,
+                "maxWait": rate_limits.max_wait,
+                "retries": rate_limits.retries,
+            },
+        }
+    )
+
+
 def get_repository_headers(
     request, repository_id: Optional[str] = None
 ) -> Dict[str, str]:
@@ -701,4 +1125,5 @@ def get_repository_headers(
     return headers
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=80, debug=False)
+    # Development server, the container serves the app with gunicorn (gunicorn.conf.py)
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "80")), debug=False)
@@ -0,0 +1,445 @@
+import base64
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from blob_cache import BLOB_CACHE_LISTING_TTL, BlobCache
+from metrics import FILES, GITHUB_BYTES, GITHUB_ERRORS, GITHUB_REQUEST_SECONDS, count, timed
+from tracing import span, tag, traced
+from solution_utils import (
+    conditional_get,
+    in_caller_context,
+    http_sessions,
+    extract_raw_path,
+    parse_content_api_url,
+    remove_root_folders,
+)
+
+logger = logging.getLogger("github_downloader")
+logger.setLevel(logging.INFO)
+
+# Number of concurrent requests used for one tree download
+DOWNLOAD_MAX_WORKERS = int(os.getenv("DOWNLOAD_MAX_WORKERS", "8"))
+# Number of concurrent requests against one upstream host, shared by all downloads
+DOWNLOAD_MAX_PER_HOST = int(os.getenv("DOWNLOAD_MAX_PER_HOST", "16"))
+
+# Repository fetch modes, configured per repository as "fetchMode"
+FETCH_MODE_CONTENTS = "contents"
+FETCH_MODE_ARCHIVE = "archive"
+
+_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_host_limits_lock = threading.Lock()
+
+
+def _host_limit(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(DOWNLOAD_MAX_PER_HOST)
+        return _host_limits[host]
+
+
+def fetch_files(
+    urls: List[str], headers: Dict[str, str], max_workers: Optional[int] = None
+) -> List[Tuple[str, Optional[bytes], Optional[Exception]]]:
+    """
+    Fetch many files in parallel.
+
+    Args:
+        urls (List[str]): URLs of the files
+        headers (dict): Headers to include in the requests (auth tokens, etc.)
+        max_workers (int, optional): Number of concurrent requests
+
+    Returns:
+        List of (url, content, error) in the order of urls, error is set if the
+        download failed
+    """
+
+    def fetch(url: str) -> Tuple[str, Optional[bytes], Optional[Exception]]:
+        try:
+            return url, _get(url, headers).content, None
+        except Exception as e:
+            logger.warning(f"Failed to fetch {url}: {e}")
+            return url, None, e
+
+    if not urls:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers or DOWNLOAD_MAX_WORKERS, len(urls)),
+        thread_name_prefix="github-fetch",
+    ) as executor:
+        return list(executor.map(in_caller_context(fetch), urls))
+
+
+def list_tree(url: str, headers: Dict[str, str], max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    List all files below a directory, sub directories are listed level by level in parallel.
+
+    Args:
+        url (str): GitHub Content API URL of a directory
+        headers (dict): Headers to include in the requests (auth tokens, etc.)
+        max_workers (int, optional): Number of concurrent requests
+
+    Returns:
+        List of the Content API items of all files
+    """
+    level = _get(url, headers, "listing").json()
+    if not isinstance(level, list):
+        logger.warning(f"Expected directory listing as a list for {url}")
+        return []
+
+    files: List[Dict] = []
+    with ThreadPoolExecutor(
+        max_workers=max_workers or DOWNLOAD_MAX_WORKERS, thread_name_prefix="github-list"
+    ) as executor:
+        while level:
+            files.extend(item for item in level if item.get("type") == "file")
+            dirs = [item for item in level if item.get("type") == "dir"]
+            level = []
+            for listing in executor.map(in_caller_context(lambda item: _get(item["url"], headers, "listing").json()), dirs):
+                if isinstance(listing, list):
+                    level.extend(listing)
+    return files
+
+
+def _get(url: str, headers: Dict[str, str], operation: str = "download") -> requests.Response:
+    with _host_limit(url), span(f"github.{operation}", "CLIENT", url=url), timed(
+        GITHUB_REQUEST_SECONDS, GITHUB_ERRORS, operation=operation
+    ):
+        response = conditional_get(url, headers=headers)
+        tag("http.status_code", response.status_code)
+        response.raise_for_status()
+    count(GITHUB_BYTES, len(response.content), operation=operation)
+    return response
+
+
+class GitHubDownloader:
+    """Helper class for downloading content trees from the GitHub Content API"""
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        work_dir: str,
+        skip_root_folder: bool = True,
+        max_workers: Optional[int] = None,
+        cache: Optional[BlobCache] = None,
+        namespace: Optional[str] = None,
+    ):
+        self.headers = headers
+        self.work_dir = work_dir
+        self.skip_root_folder = skip_root_folder
+        self.max_workers = max_workers or DOWNLOAD_MAX_WORKERS
+        # Files are cached by URL and blob SHA, listings and refs for BLOB_CACHE_LISTING_TTL
+        self.cache = cache
+        self.namespace = namespace
+
+    def download(self, url: str) -> None:
+        """
+        Download the content behind a Content API URL into the work directory.
+
+        Directories are listed breadth-first, file bodies are fetched in parallel
+        by a bounded worker pool. A URL pointing to a single file is stored under
+        its file name.
+
+        Args:
+            url (str): GitHub Content API URL of a file or directory
+        """
+        logger.info(f"Fetching contents from {url}")
+        content = self._fetch_listing(url)
+
+        try:
+            content_response = json.loads(content)
+        except ValueError:
+            # Single file
+            full_path = os.path.join(self.work_dir, extract_raw_path(url))
+            self._write_file(full_path, content)
+            count(FILES, source="github")
+            logger.info(f"Saving single file {url}, {full_path}")
+            return
+
+        if not isinstance(content_response, list):
+            logger.warning(f"Unexpected content format from {url}")
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="github-download"
+        ) as executor:
+            file_futures: List[Future] = []
+            try:
+                self._download_tree(executor, content_response, file_futures)
+                for future in file_futures:
+                    future.result()
+            except Exception:
+                for future in file_futures:
+                    future.cancel()
+                raise
+
+    def download_archive(self, urls: List[str]) -> None:
+        """
+        Download the content behind Content API URLs from a repository archive.
+
+        The ref is resolved to a commit once per repository, then the tarball of that
+        commit is streamed and only the requested paths are extracted. The layout in
+        the work directory is the same as for download().
+
+        Args:
+            urls (List[str]): GitHub Content API URLs of files or directories
+
+        Raises:
+            ValueError: If a requested path is not part of the archive
+        """
+        archives: Dict[Tuple[str, str, str, str], List[str]] = {}
+        for url in urls:
+            api_base_url, user, repo, path, branch = parse_content_api_url(url)
+            archives.setdefault((api_base_url, user, repo, branch), []).append(path)
+
+        for (api_base_url, user, repo, branch), paths in archives.items():
+            commit_sha = self._resolve_ref(api_base_url, user, repo, branch)
+            archive_url = f"{api_base_url}/repos/{user}/{repo}/tarball/{commit_sha}"
+            logger.info(f"Fetching archive {archive_url} for {len(paths)} path(s)")
+            found = self._extract_archive(archive_url, paths)
+            missing = [path for path in paths if path not in found]
+            if missing:
+                raise ValueError(
+                    f"Paths {missing} not found in {user}/{repo} at {branch}"
+                )
+
+    def _resolve_ref(self, api_base_url: str, user: str, repo: str, branch: str) -> str:
+        url = f"{api_base_url}/repos/{user}/{repo}/commits/{branch}"
+        cache_key = BlobCache.key("ref", url)
+        if self.cache:
+            cached = self.cache.get(self.namespace, cache_key, BLOB_CACHE_LISTING_TTL)
+            if cached is not None:
+                return cached.decode()
+
+        headers = {**self.headers, "Accept": "application/vnd.github.sha"}
+        with _host_limit(url), span("github.ref", "CLIENT", url=url), timed(
+            GITHUB_REQUEST_SECONDS, GITHUB_ERRORS, operation="ref"
+        ):
+            response = conditional_get(url, headers=headers)
+            response.raise_for_status()
+        commit_sha = response.text.strip()
+        if self.cache:
+            self.cache.put(self.namespace, cache_key, commit_sha.encode())
+        return commit_sha
+
+    def _extract_archive(self, archive_url: str, paths: List[str]) -> set:
+        """Stream the tarball and extract the members below the given paths"""
+        # The archive URL contains the commit SHA, a cached archive never gets stale
+        cache_key = BlobCache.key("archive", archive_url)
+        cached_path = self.cache.get_path(self.namespace, cache_key) if self.cache else None
+        if cached_path:
+            logger.info(f"Using cached archive for {archive_url}")
+            with tarfile.open(cached_path, mode="r:gz") as archive:
+                return self._extract_members(archive, paths)
+
+        with _host_limit(archive_url):
+            response = http_sessions.get(archive_url, headers=self.headers, stream=True)
+        # The archive is extracted while it is streamed, the duration includes the extraction
+        with response, span("github.archive", "CLIENT", url=archive_url), timed(
+            GITHUB_REQUEST_SECONDS, GITHUB_ERRORS, operation="archive"
+        ):
+            try:
+                response.raise_for_status()
+                if not self.cache:
+                    with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+                        return self._extract_members(archive, paths)
+
+                # Keep a copy of the stream while extracting, to store it in the cache
+                with tempfile.NamedTemporaryFile(suffix=".tar.gz") as copy:
+                    stream = _TeeReader(response.raw, copy)
+                    with tarfile.open(fileobj=stream, mode="r|gz") as archive:
+                        found = self._extract_members(archive, paths)
+                    stream.drain()
+                    copy.flush()
+                    self.cache.put_file(self.namespace, cache_key, copy.name)
+                    return found
+            finally:
+                count(GITHUB_BYTES, response.raw.tell(), operation="archive")
+
+    def _extract_members(self, archive: tarfile.TarFile, paths: List[str]) -> set:
+        found = set()
+        for member in archive:
+            if not (member.isfile() or member.isdir()):
+                continue
+            # Members are prefixed with a "<user>-<repo>-<sha>/" folder
+            member_path = remove_root_folders(member.name.rstrip("/"), 1)
+            if not member_path or ".." in member_path.split("/"):
+                continue
+            for path in paths:
+                relative_path = self._archive_relative_path(member_path, path)
+                if relative_path is None:
+                    continue
+                found.add(path)
+                if member.isdir() and member_path == path:
+                    continue
+                full_path = os.path.join(self.work_dir, relative_path)
+                if member.isdir():
+                    os.makedirs(full_path, exist_ok=True)
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    with archive.extractfile(member) as source, open(full_path, "wb") as f:
+                        shutil.copyfileobj(source, f)
+                    count(FILES, source="archive")
+                    logger.info(f"Extracted {member_path} to: {full_path}")
+        return found
+
+    def _archive_relative_path(self, member_path: str, path: str) -> Optional[str]:
+        """Map an archive member to the path download() would use, None if not requested"""
+        if member_path == path:
+            # Single file, stored under its file name
+            return extract_raw_path(path)
+        if path and not member_path.startswith(f"{path}/"):
+            return None
+        is_root = "/" not in member_path[len(path):].lstrip("/")
+        return self._relative_path(member_path, is_root)
+
+    def _download_tree(
+        self, executor: ThreadPoolExecutor, root_items: List[Dict], file_futures: List[Future]
+    ) -> None:
+        """Walk the tree level by level, listing all directories of a level in parallel"""
+        level: List[Tuple[Dict, bool]] = [(item, True) for item in root_items]
+
+        while level:
+            listing_futures: Dict[Future, str] = {}
+            for item, is_root in level:
+                item_path = item.get("path", "")
+                item_type = item.get("type", "")
+                item_url = item.get("url", "")
+                full_path = os.path.join(
+                    self.work_dir, self._relative_path(item_path, is_root)
+                )
+                logger.info(f"Processing {item_type}: {item_path}")
+
+                if item_type == "file":
+                    file_futures.append(
+                        executor.submit(in_caller_context(self._download_file), item, full_path)
+                    )
+                elif item_type == "dir":
+                    os.makedirs(full_path, exist_ok=True)
+                    logger.info(f"Created directory: {full_path}")
+                    listing_futures[executor.submit(in_caller_context(self._fetch_listing), item_url)] = item_path
+                else:
+                    logger.warning(f"Unknown item type: {item_type} for {item_path}")
+
+            level = []
+            pending = set(listing_futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dir_contents = json.loads(future.result())
+                    if isinstance(dir_contents, list):
+                        level.extend((dir_item, False) for dir_item in dir_contents)
+                    else:
+                        logger.warning(
+                            f"Expected directory listing as a list for {listing_futures[future]}"
+                        )
+
+    def _relative_path(self, item_path: str, is_root: bool) -> str:
+        """
+        Map a repository path to the path inside the work directory.
+
+        Items returned by a nested directory listing always lose their first folder,
+        with skip_root_folder every item loses one more.
+        """
+        if not is_root or self.skip_root_folder:
+            item_path = remove_root_folders(item_path, 1)
+        if self.skip_root_folder:
+            item_path = remove_root_folders(item_path, 1)
+        return item_path
+
+    @traced("github.file", kind=None)
+    def _download_file(self, item: Dict, full_path: str) -> None:
+        item_path = item.get("path", "")
+        tag("path", item_path)
+        item_url = item.get("url", "")
+        download_url = item.get("download_url")
+
+        cache_key = BlobCache.key("blob", item_url, item["sha"]) if item.get("sha") else None
+        if self.cache and cache_key:
+            content = self.cache.get(self.namespace, cache_key)
+            if content is not None:
+                self._write_file(full_path, content)
+                count(FILES, source="cache")
+                tag("source", "cache")
+                logger.info(f"File served from cache and saved to: {full_path}")
+                return
+
+        content = self._fetch_file(item_path, item_url, download_url)
+        if content is None:
+            return
+        self._write_file(full_path, content)
+        count(FILES, source="github")
+        tag("source", "github")
+        logger.info(f"File downloaded and saved to: {full_path}")
+        if self.cache and cache_key:
+            self.cache.put(self.namespace, cache_key, content)
+
+    def _fetch_file(self, item_path: str, item_url: str, download_url: Optional[str]) -> Optional[bytes]:
+        if download_url:
+            # Use the direct download URL if available
+            logger.info(f"Downloading file from {download_url}")
+            return self._get(download_url).content
+
+        # Use the API URL and handle GitHub API response format
+        logger.info(f"Fetching file content from API: {item_url}")
+        content_response = self._get(item_url)
+        try:
+            # Try to parse as JSON (GitHub API format)
+            content_data = content_response.json()
+        except ValueError:
+            # Not JSON, treat as raw content
+            return content_response.content
+
+        if isinstance(content_data, dict) and "content" in content_data:
+            # GitHub API returns base64 encoded content
+            return base64.b64decode(content_data["content"])
+        logger.warning(f"Unexpected content format for file: {item_path}")
+        return None
+
+    def _fetch_listing(self, url: str) -> bytes:
+        """Fetch a directory listing (or single file), cached for BLOB_CACHE_LISTING_TTL"""
+        cache_key = BlobCache.key("listing", url)
+        if self.cache:
+            content = self.cache.get(self.namespace, cache_key, BLOB_CACHE_LISTING_TTL)
+            if content is not None:
+                return content
+        content = self._get(url, "listing").content
+        if self.cache:
+            self.cache.put(self.namespace, cache_key, content)
+        return content
+
+    def _get(self, url: str, operation: str = "download") -> requests.Response:
+        return _get(url, self.headers, operation)
+
+    @staticmethod
+    def _write_file(full_path: str, content: bytes) -> None:
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(content)
+
+
+class _TeeReader:
+    """File-like wrapper copying everything read from a stream into a second file"""
+
+    def __init__(self, source, copy):
+        self._source = source
+        self._copy = copy
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._source.read(size)
+        self._copy.write(data)
+        return data
+
+    def drain(self) -> None:
+        while self.read(64 * 1024):
+            pass
@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration of the service, used by the container:
+
+    gunicorn --config gunicorn.conf.py boot:app
+
+boot:app answers /health while the worker loads flask_wrapper in the
+background, see boot.py.
+
+Every worker process holds its own background jobs, restart coalescer and
+caches, so job polling only works if it reaches the worker that accepted the
+job. Scale with threads first, add workers only in front of a sticky proxy.
+
+WEB_WORKER_CLASS selects how a worker serves requests:
+- gthread (default): a fixed pool of WEB_THREADS threads, every request holds
+  one until it is answered.
+- gevent: the standard library is patched to cooperative I/O and every request
+  runs in a greenlet, so requests waiting for GitHub or Cumulocity cost no
+  thread and up to WEB_WORKER_CONNECTIONS can be in flight. CPU-bound work,
+  e.g. unpacking an archive, holds up all requests of the worker meanwhile.
+  Raise HTTP_POOL_SIZE along, it bounds the kept-alive connections per host.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '80')}"
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+# Worker processes
+workers = int(os.getenv("WEB_WORKERS", "1"))
+# Requests served at the same time per gthread worker, synchronous builds take at most EXTENSION_BUILD_SLOTS of them
+threads = int(os.getenv("WEB_THREADS", "32"))
+# Requests served at the same time per gevent worker
+worker_connections = int(os.getenv("WEB_WORKER_CONNECTIONS", "1000"))
+# Seconds a worker may be unresponsive before it is restarted, a long running request does not count
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+# Seconds running requests get to finish on shutdown
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "60"))
+# Seconds an idle keep-alive connection of the UI is kept open
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+accesslog = os.getenv("WEB_ACCESS_LOG", "-") or None
+
+
+# With more than one worker, set PROMETHEUS_MULTIPROC_DIR to an empty directory so /metrics covers all workers
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,154 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Directory the gunicorn workers write their metrics to, /metrics then aggregates all workers.
+# Must be set (and empty) before the service starts, see gunicorn.conf.py
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+_FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_SLOW_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+
+class _RequestLabels:
+    """Tenant and endpoint of a request, the tenant is filled in once the request resolves it"""
+
+    __slots__ = ("tenant", "endpoint")
+
+    def __init__(self, tenant: str, endpoint: str):
+        self.tenant = tenant
+        self.endpoint = endpoint
+
+
+# Labels of the request the current code works for
+_labels: contextvars.ContextVar = contextvars.ContextVar("metric_labels", default=None)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "analytics_http_request_seconds",
+    "Duration of requests to the service",
+    ["endpoint", "method", "status"],
+    buckets=_FAST_BUCKETS + (60, 120, 300),
+)
+GITHUB_REQUEST_SECONDS = Histogram(
+    "analytics_github_request_seconds",
+    "Duration of GitHub requests by operation (listing, download, ref, archive)",
+    ["operation", "tenant", "endpoint"],
+    buckets=_FAST_BUCKETS,
+)
+GITHUB_BYTES = Counter(
+    "analytics_github_bytes",
+    "Bytes received from GitHub",
+    ["operation", "tenant", "endpoint"],
+)
+GITHUB_ERRORS = Counter(
+    "analytics_github_errors",
+    "Failed GitHub requests",
+    ["operation", "tenant", "endpoint"],
+)
+FILES = Counter(
+    "analytics_files",
+    "Repository files written to build directories by source (github, cache, archive)",
+    ["source", "tenant", "endpoint"],
+)
+BUILD_SECONDS = Histogram(
+    "analytics_build_seconds",
+    "Duration of analytics_builder runs",
+    ["tenant", "endpoint"],
+    buckets=_SLOW_BUCKETS,
+)
+BUILDS = Counter(
+    "analytics_builds",
+    "Extension builds by result (built, cached, failed)",
+    ["result", "tenant", "endpoint"],
+)
+C8Y_REQUEST_SECONDS = Histogram(
+    "analytics_c8y_request_seconds",
+    "Duration of Cumulocity requests by operation",
+    ["operation", "tenant", "endpoint"],
+    buckets=_FAST_BUCKETS + (60, 120),
+)
+C8Y_ERRORS = Counter(
+    "analytics_c8y_errors",
+    "Failed Cumulocity requests by operation",
+    ["operation", "tenant", "endpoint"],
+)
+UPLOAD_BYTES = Counter(
+    "analytics_upload_bytes",
+    "Bytes of extensions uploaded to the inventory",
+    ["tenant", "endpoint"],
+)
+
+
+def set_labels(tenant: Optional[str], endpoint: Optional[str]) -> contextvars.Token:
+    """Set the tenant and endpoint following metrics are labelled with, returns the token to reset them"""
+    return _labels.set(_RequestLabels(tenant or "", endpoint or ""))
+
+
+def reset_labels(token: contextvars.Token) -> None:
+    _labels.reset(token)
+
+
+def bind_tenant(tenant: Optional[str]) -> None:
+    """Label the following metrics of the current request with the tenant it resolved"""
+    current = _labels.get()
+    if current is not None and tenant:
+        current.tenant = tenant
+
+
+def labels(tenant: Optional[str] = None) -> Tuple[str, str]:
+    """Tenant and endpoint of the current request, tenant overrides the tenant of the request"""
+    current = _labels.get()
+    if current is None:
+        return tenant or "", ""
+    return (tenant if tenant is not None else current.tenant), current.endpoint
+
+
+@contextmanager
+def timed(histogram: Histogram, errors: Optional[Counter] = None, tenant: Optional[str] = None, **extra):
+    """
+    Observe the duration of the block in histogram, count it in errors if it raises.
+
+    Args:
+        histogram: Histogram labelled with the extra labels, tenant and endpoint
+        errors: Counter with the same labels, optional
+        tenant: Tenant to label with, defaults to the tenant of the request
+        **extra: Further labels, e.g. operation
+    """
+    tenant, endpoint = labels(tenant)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            errors.labels(*extra.values(), tenant, endpoint).inc()
+        raise
+    finally:
+        histogram.labels(*extra.values(), tenant, endpoint).observe(time.perf_counter() - start)
+
+
+def count(counter: Counter, amount: float = 1, tenant: Optional[str] = None, **extra) -> None:
+    """Increase a counter labelled with the extra labels, tenant and endpoint"""
+    tenant, endpoint = labels(tenant)
+    counter.labels(*extra.values(), tenant, endpoint).inc(amount)
+
+
+def render() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, of all workers if PROMETHEUS_MULTIPROC_DIR is set"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
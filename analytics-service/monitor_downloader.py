@@ -1,5 +1,6 @@
-import requests
+import asyncio
 from typing import Dict, Any, Optional
+from solution_utils import FILE_CHUNK_SIZE, http_sessions, in_caller_context
 
 class MonitorDownloader:
     """Helper class for downloading monitors"""
@@ -8,9 +9,17 @@ class MonitorDownloader:
     async def download_monitor(
         url: str, headers: Dict[str, str], target_path: str
     ) -> None:
-        """Download a monitor file"""
-        response = requests.get(url, headers=headers, allow_redirects=True)
+        """Download a monitor file, the blocking request runs in the default executor of the loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, in_caller_context(MonitorDownloader._download), url, headers, target_path
+        )
+
+    @staticmethod
+    def _download(url: str, headers: Dict[str, str], target_path: str) -> None:
+        response = http_sessions.get(url, headers=headers, stream=True)
         response.raise_for_status()
 
-        with open(target_path, "wb") as f:
-            f.write(response.content)
+        with response, open(target_path, "wb") as f:
+            for chunk in response.iter_content(FILE_CHUNK_SIZE):
+                f.write(chunk)
@@ -0,0 +1,269 @@
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Mapping, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger("rate_limit")
+logger.setLevel(logging.INFO)
+
+# Requests of a token kept for interactive calls, bulk downloads wait for the reset instead
+RATE_LIMIT_INTERACTIVE_RESERVE = int(os.getenv("RATE_LIMIT_INTERACTIVE_RESERVE", "100"))
+# Below this share of the limit, bulk downloads are spread over the time until the reset
+RATE_LIMIT_PACE_BELOW = float(os.getenv("RATE_LIMIT_PACE_BELOW", "0.1"))
+# Seconds a bulk download may wait for budget, an interactive call waits RATE_LIMIT_INTERACTIVE_MAX_WAIT
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+RATE_LIMIT_INTERACTIVE_MAX_WAIT = float(os.getenv("RATE_LIMIT_INTERACTIVE_MAX_WAIT", "5"))
+# Retries of answers hitting a secondary rate limit, backing off from RATE_LIMIT_BACKOFF seconds
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+RATE_LIMIT_BACKOFF = float(os.getenv("RATE_LIMIT_BACKOFF", "5"))
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+# Requests are bulk unless issued by an endpoint marked as interactive
+_priority: contextvars.ContextVar = contextvars.ContextVar("github_request_priority", default=PRIORITY_BULK)
+
+
+def interactive(f):
+    """Mark an endpoint as interactive, its upstream requests are served before bulk downloads"""
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        token = _priority.set(PRIORITY_INTERACTIVE)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _priority.reset(token)
+
+    return wrapper
+
+
+class RateLimitError(Exception):
+    """Raised when the budget of a token is used up for longer than a request may wait"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitBudget:
+    """Budget of one token as reported by the X-RateLimit-* headers of the last answer"""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None
+        self.resource: Optional[str] = None
+        self.updated: Optional[float] = None
+        # Requests sent but not answered yet, not included in remaining
+        self.in_flight = 0
+        # Earliest time the next paced bulk request may be sent
+        self.next_bulk = 0.0
+        self.requests = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.secondary_limits = 0
+        self.rejected = 0
+
+    def to_json(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset": self.reset,
+            "resource": self.resource,
+            "updated": self.updated,
+            "inFlight": self.in_flight,
+            "requests": self.requests,
+            "waits": self.waits,
+            "waitedSeconds": round(self.waited_seconds, 3),
+            "secondaryLimits": self.secondary_limits,
+            "rejected": self.rejected,
+        }
+
+
+class RateLimitScheduler:
+    """
+    Paces upstream requests per token by the budget the upstream reports in the
+    X-RateLimit-* headers (GitHub does, other hosts are passed through).
+
+    - Bulk requests leave RATE_LIMIT_INTERACTIVE_RESERVE requests of the budget to
+      interactive ones and are spread over the time until the reset once less than
+      RATE_LIMIT_PACE_BELOW of the limit remains.
+    - A request that would have to wait longer than its priority allows raises
+      RateLimitError instead of running into a 403.
+    - Answers hitting a secondary rate limit are retried after Retry-After or with
+      exponential backoff, an exhausted primary limit after its reset if near.
+    """
+
+    def __init__(
+        self,
+        interactive_reserve: int = RATE_LIMIT_INTERACTIVE_RESERVE,
+        pace_below: float = RATE_LIMIT_PACE_BELOW,
+        max_wait: float = RATE_LIMIT_MAX_WAIT,
+        interactive_max_wait: float = RATE_LIMIT_INTERACTIVE_MAX_WAIT,
+        retries: int = RATE_LIMIT_RETRIES,
+        backoff: float = RATE_LIMIT_BACKOFF,
+    ):
+        self.interactive_reserve = interactive_reserve
+        self.pace_below = pace_below
+        self.max_wait = {PRIORITY_BULK: max_wait, PRIORITY_INTERACTIVE: interactive_max_wait}
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._budgets: Dict[str, RateLimitBudget] = {}
+
+    @staticmethod
+    def identity(headers: Optional[Mapping[str, str]]) -> str:
+        """Key of the budget of the credentials in headers, anonymous requests share one"""
+        authorization = CaseInsensitiveDict(headers or {}).get("Authorization")
+        if not authorization:
+            return "anonymous"
+        return hashlib.sha256(authorization.encode()).hexdigest()[:16]
+
+    def request(self, headers: Optional[Mapping[str, str]], send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Send a request once the budget of its token allows it.
+
+        Args:
+            headers (dict): Headers of the request, the Authorization header selects the budget
+            send (callable): Sends the request and returns the response
+
+        Returns:
+            The response, after retries of secondary rate limit answers
+
+        Raises:
+            RateLimitError: If the budget does not allow the request within the maximum wait
+        """
+        identity = self.identity(headers)
+        priority = _priority.get()
+        deadline = time.monotonic() + self.max_wait[priority]
+        attempt = 0
+        while True:
+            self._acquire(identity, priority, deadline)
+            try:
+                response = send()
+            finally:
+                with self._lock:
+                    self._budget(identity).in_flight -= 1
+            self._update(identity, response)
+
+            wait = self._limited(identity, response, attempt)
+            if wait is None:
+                return response
+            attempt += 1
+            if attempt > self.retries or time.monotonic() + wait > deadline:
+                self._reject(identity)
+                raise RateLimitError(
+                    f"GitHub rate limit of token {identity} reached, retry in {wait:.0f}s", wait
+                )
+            response.close()
+            logger.warning(f"GitHub rate limit of token {identity} reached, retrying in {wait:.1f}s")
+            self._sleep(identity, wait)
+
+    def budgets(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {identity: budget.to_json() for identity, budget in self._budgets.items()}
+
+    def budget(self, identity: str) -> Optional[Dict]:
+        with self._lock:
+            budget = self._budgets.get(identity)
+            return budget.to_json() if budget is not None else None
+
+    def _budget(self, identity: str) -> RateLimitBudget:
+        budget = self._budgets.get(identity)
+        if budget is None:
+            budget = self._budgets[identity] = RateLimitBudget()
+        return budget
+
+    def _acquire(self, identity: str, priority: str, deadline: float) -> None:
+        while True:
+            with self._lock:
+                budget = self._budget(identity)
+                wait = self._wait_time(budget, priority)
+                if wait <= 0:
+                    budget.in_flight += 1
+                    budget.requests += 1
+                    return
+            if time.monotonic() + wait > deadline:
+                self._reject(identity)
+                raise RateLimitError(
+                    f"GitHub rate limit budget of token {identity} used up, retry in {wait:.0f}s", wait
+                )
+            self._sleep(identity, wait)
+
+    def _wait_time(self, budget: RateLimitBudget, priority: str) -> float:
+        """Seconds until a request of the priority may be sent, 0 if it may be sent now"""
+        now = time.time()
+        if budget.remaining is None or budget.reset is None or budget.reset <= now:
+            # Unknown budget or a new window, the answer reports the budget
+            return 0
+        reserve = self.interactive_reserve if priority == PRIORITY_BULK else 0
+        available = budget.remaining - budget.in_flight - reserve
+        if available <= 0:
+            return budget.reset - now
+        if priority == PRIORITY_BULK and budget.limit and budget.remaining < budget.limit * self.pace_below:
+            # Spread the remaining bulk budget evenly over the time until the reset
+            if budget.next_bulk > now:
+                return budget.next_bulk - now
+            budget.next_bulk = now + (budget.reset - now) / available
+        return 0
+
+    def _update(self, identity: str, response: requests.Response) -> None:
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        try:
+            with self._lock:
+                budget = self._budget(identity)
+                budget.remaining = int(headers["X-RateLimit-Remaining"])
+                budget.limit = int(headers.get("X-RateLimit-Limit", budget.limit or 0)) or None
+                if "X-RateLimit-Reset" in headers:
+                    budget.reset = float(headers["X-RateLimit-Reset"])
+                budget.resource = headers.get("X-RateLimit-Resource", budget.resource)
+                budget.updated = time.time()
+        except ValueError:
+            logger.warning(f"Invalid rate limit headers for token {identity}")
+
+    def _limited(self, identity: str, response: requests.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a rate limited answer, None if it is not rate limited"""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            # Primary limit, the budget is back at the reset
+            try:
+                reset = float(response.headers.get("X-RateLimit-Reset", time.time()))
+            except ValueError:
+                return self.backoff * 2 ** attempt
+            return max(reset - time.time(), 1)
+        if retry_after is None:
+            # Reading the text would consume a streamed body the caller still has to read
+            body_read = not response.raw or getattr(response, "_content_consumed", False)
+            if not body_read or "secondary rate limit" not in response.text.lower():
+                return None
+        with self._lock:
+            self._budget(identity).secondary_limits += 1
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2 ** attempt
+
+    def _sleep(self, identity: str, seconds: float) -> None:
+        with self._lock:
+            budget = self._budget(identity)
+            budget.waits += 1
+            budget.waited_seconds += seconds
+        time.sleep(seconds)
+
+    def _reject(self, identity: str) -> None:
+        with self._lock:
+            self._budget(identity).rejected += 1
+
+
+rate_limits = RateLimitScheduler()
@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import labels, reset_labels, set_labels
+
+logger = logging.getLogger("restart_coalescer")
+logger.setLevel(logging.INFO)
+
+# Seconds the first restart request of a tenant waits for others before CEP is restarted, 0 restarts
+# immediately. Requests arriving while a restart is scheduled or running are merged either way.
+CEP_RESTART_DEBOUNCE = float(os.getenv("CEP_RESTART_DEBOUNCE", "0"))
+# Seconds a finished restart can still be looked up
+CEP_RESTART_RETENTION = int(os.getenv("CEP_RESTART_RETENTION", "900"))
+
+
+class RestartHandle:
+    """A pending or finished CEP restart, shared by all requests it covers"""
+
+    def __init__(self, tenant_id: str, scheduled_at: Optional[float]):
+        self.id = uuid.uuid4().hex
+        self.tenant_id = tenant_id
+        self.requested_at = time.time()
+        # None while it waits for the running restart of the tenant
+        self.scheduled_at = scheduled_at
+        self.started_at: Optional[float] = None
+        self.restarted_at: Optional[float] = None
+        # Error of a failed restart
+        self.error: Optional[str] = None
+        # Names of the uploads the restart deploys
+        self.covers: List[str] = []
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def status(self) -> str:
+        if self.done:
+            return "failed" if self.error is not None else "restarted"
+        return "restarting" if self.started_at is not None else "scheduled"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the restart finished or failed, return False on timeout"""
+        return self._done.wait(timeout)
+
+    def to_json(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "requestedAt": self.requested_at,
+            "scheduledAt": self.scheduled_at,
+            "restartedAt": self.restarted_at,
+            "covers": list(self.covers),
+        }
+
+
+class RestartCoalescer:
+    """
+    Merges overlapping CEP restarts of a tenant. A request restarts CEP right
+    away (after the debounce, if set) unless a restart of the tenant is already
+    scheduled, then it joins that one, or running, then it schedules the next
+    restart, which starts once the running one finished and is joined by all
+    requests until then.
+    """
+
+    def __init__(
+        self,
+        restart: Callable[[object], None],
+        debounce: float = CEP_RESTART_DEBOUNCE,
+        retention: float = CEP_RESTART_RETENTION,
+    ):
+        """
+        Args:
+            restart (callable): Restarts CEP, receives the request (or a snapshot) of the latest caller
+            debounce (float): Seconds the first request waits for others, 0 restarts immediately
+            retention (float): Seconds finished restarts are kept for lookups
+        """
+        self.restart = restart
+        self.debounce = debounce
+        self.retention = retention
+        self._lock = threading.Lock()
+        # tenant ID -> restart not yet sent
+        self._pending: Dict[str, RestartHandle] = {}
+        # tenant ID -> restart in progress
+        self._running: Dict[str, RestartHandle] = {}
+        # tenant ID -> request used to restart, the latest caller has the freshest credentials
+        self._requests: Dict[str, object] = {}
+        # tenant ID -> metric labels of that request, timers and follow-up threads run outside of it
+        self._labels: Dict[str, Tuple[str, str]] = {}
+        self._handles: Dict[str, RestartHandle] = {}
+        self.requested = 0
+        self.restarts = 0
+        self.failed = 0
+
+    def request_restart(self, tenant_id: str, request, covers: List[str]) -> RestartHandle:
+        """
+        Request a restart of CEP for a tenant.
+
+        Args:
+            tenant_id (str): Tenant to restart CEP for
+            request: The request, or a snapshot of it if the restart may run after the request
+            covers (list): Names of the uploads the restart deploys
+
+        Returns:
+            RestartHandle shared with all requests merged into the same restart
+        """
+        self._expire()
+        fire = False
+        with self._lock:
+            self.requested += 1
+            handle = self._pending.get(tenant_id)
+            if handle is None:
+                running = tenant_id in self._running
+                handle = RestartHandle(tenant_id, None if running else time.time() + self.debounce)
+                self._pending[tenant_id] = handle
+                self._handles[handle.id] = handle
+                # With a restart running, _fire starts this one once it finished
+                if not running and self.debounce > 0:
+                    timer = threading.Timer(self.debounce, self._fire, (tenant_id,))
+                    timer.daemon = True
+                    timer.start()
+                elif not running:
+                    fire = True
+            handle.covers.extend(covers)
+            self._requests[tenant_id] = request
+            self._labels[tenant_id] = labels(tenant_id)
+
+        if fire:
+            self._fire(tenant_id)
+        else:
+            logger.info(f"Restart of CEP for {', '.join(covers)} merged into restart {handle.id}")
+        return handle
+
+    def get(self, tenant_id: str, handle_id: str) -> Optional[RestartHandle]:
+        """Return a restart of the tenant, None if it does not exist or belongs to another tenant"""
+        self._expire()
+        with self._lock:
+            handle = self._handles.get(handle_id)
+        return handle if handle is not None and handle.tenant_id == tenant_id else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "debounce": self.debounce,
+                "requested": self.requested,
+                "restarts": self.restarts,
+                "failed": self.failed,
+                "pending": len(self._pending),
+                "running": len(self._running),
+            }
+
+    def _fire(self, tenant_id: str) -> None:
+        with self._lock:
+            handle = self._pending.pop(tenant_id, None)
+            request = self._requests.pop(tenant_id, None)
+            request_labels = self._labels.pop(tenant_id, (tenant_id, ""))
+            if handle is None:
+                return
+            self._running[tenant_id] = handle
+            self.restarts += 1
+            handle.started_at = time.time()
+        logger.info(f"Restarting CEP once for {', '.join(handle.covers)}")
+        token = set_labels(*request_labels)
+        try:
+            self.restart(request)
+        except Exception as e:
+            logger.error(f"Restart {handle.id} failed", exc_info=True)
+            handle.error = str(e) or type(e).__name__
+            with self._lock:
+                self.failed += 1
+        finally:
+            reset_labels(token)
+            handle.restarted_at = time.time()
+            handle._done.set()
+            with self._lock:
+                del self._running[tenant_id]
+                follow_up = tenant_id in self._pending
+            if follow_up:
+                # Requests that arrived meanwhile need a restart after this one
+                threading.Thread(target=self._fire, args=(tenant_id,), name="cep-restart", daemon=True).start()
+
+    def _expire(self) -> None:
+        now = time.time()
+        with self._lock:
+            for handle_id in [
+                handle_id
+                for handle_id, handle in self._handles.items()
+                if handle.done and now - handle.restarted_at > self.retention
+            ]:
+                del self._handles[handle_id]
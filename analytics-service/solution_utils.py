@@ -1,10 +1,27 @@
 from flask import Response
+import contextvars
+import hashlib
+import io
 import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from werkzeug.datastructures import Headers
+from epl_parser import parse_epl_header
+from rate_limit import RateLimitError, rate_limits
+from tracing import record_error
 import json
 from functools import wraps
-from typing import Dict, Any, Optional
-from urllib.parse import urlparse, parse_qs
+from typing import BinaryIO, Callable, Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
 
 # Configure logging
 logging.basicConfig(
@@ -16,6 +33,24 @@ logger = logging.getLogger("flask_wrapper")
 logger.setLevel(logging.INFO)
 
 DEFAULT_BRANCH = "main"
+# GitHub instance hosting the repositories, e.g. GitHub Enterprise or the stub of the benchmarks
+GITHUB_WEB_URL = os.getenv("GITHUB_WEB_URL", "https://github.com").rstrip("/")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+# Connections kept alive per upstream host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+# Retries for connection errors and 5xx answers of idempotent requests
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+# Chunk size used when streaming monitors through the EPL header parser
+EPL_CHUNK_SIZE = int(os.getenv("EPL_CHUNK_SIZE", "4096"))
+# Number of responses kept to revalidate them with conditional requests
+CONDITIONAL_CACHE_MAX_ENTRIES = int(os.getenv("CONDITIONAL_CACHE_MAX_ENTRIES", "2000"))
+# Responses larger than this are not kept, they are fetched in full every time
+CONDITIONAL_CACHE_MAX_BODY = int(os.getenv("CONDITIONAL_CACHE_MAX_BODY", str(1024 * 1024)))
+# Chunk size used when streaming files from disk, to clients and to Cumulocity
+FILE_CHUNK_SIZE = int(os.getenv("FILE_CHUNK_SIZE", str(64 * 1024)))
 
 
 # Error handling decorator
@@ -24,11 +59,19 @@ def handle_errors(f):
     def wrapper(*args, **kwargs):
         try:
             return f(*args, **kwargs)
+        except RateLimitError as e:
+            record_error(e)
+            logger.warning(f"Rate limited: {e}")
+            response = create_error_response(str(e), 429)
+            response.headers["Retry-After"] = str(int(e.retry_after) + 1)
+            return response
         except HTTPError as e:
+            record_error(e)
             status_code = e.response.status_code
             logger.error(f"HTTP Error: {status_code}", exc_info=True)
             return create_error_response(str(e), status_code)
         except Exception as e:
+            record_error(e)
             logger.error("Unexpected error", exc_info=True)
             return create_error_response(str(e), 500)
 
@@ -61,7 +104,7 @@ def github_web_url_to_content_api(github_web_url: str) -> str:
         parsed_url = urlparse(github_web_url)
 
         # Verify it's a GitHub URL
-        if "github.com" not in parsed_url.netloc:
+        if urlparse(GITHUB_WEB_URL).netloc not in parsed_url.netloc:
             raise ValueError("Not a GitHub URL")
 
         # Extract repo info from path
@@ -86,7 +129,7 @@ def github_web_url_to_content_api(github_web_url: str) -> str:
             path_in_repo = "/".join(path_parts[2:])
 
         # Build the Content API URL
-        content_api_url = f"https://api.github.com/repos/{user}/{repo}/contents"
+        content_api_url = f"{GITHUB_API_URL}/repos/{user}/{repo}/contents"
 
         if path_in_repo:
             content_api_url += f"/{path_in_repo}"
@@ -117,7 +160,7 @@ def content_api_to_github_web_url(content_api_url: str) -> str:
         parsed_url = urlparse(content_api_url)
 
         # Verify it's a GitHub API URL
-        if "api.github.com" not in parsed_url.netloc:
+        if urlparse(GITHUB_API_URL).netloc not in parsed_url.netloc:
             raise ValueError("Not a GitHub API URL")
 
         # Extract path parts
@@ -142,7 +185,7 @@ def content_api_to_github_web_url(content_api_url: str) -> str:
         path_in_repo = "/".join(path_parts[4:]) if len(path_parts) > 4 else ""
 
         # Build the GitHub web URL
-        github_web_url = f"https://github.com/{user}/{repo}"
+        github_web_url = f"{GITHUB_WEB_URL}/{user}/{repo}"
 
         if path_in_repo:
             github_web_url += f"/tree/{branch}/{path_in_repo}"
@@ -155,6 +198,30 @@ def content_api_to_github_web_url(content_api_url: str) -> str:
         raise ValueError(f"Failed to convert GitHub API URL: {str(e)}")
 
 
+def parse_content_api_url(content_api_url: str) -> Tuple[str, str, str, str, str]:
+    """
+    Splits a GitHub Content API URL into its parts
+
+    Args:
+        content_api_url: A GitHub Content API URL
+
+    Returns:
+        Tuple of API base URL, user, repository, path in the repository and branch
+
+    Raises:
+        ValueError: If the URL is not a valid GitHub Content API URL
+    """
+    parsed_url = urlparse(content_api_url)
+    path_parts = [unquote(part) for part in parsed_url.path.split("/") if part]
+
+    if len(path_parts) < 4 or path_parts[0] != "repos" or path_parts[3] != "contents":
+        raise ValueError(f"Invalid GitHub Content API URL format: {content_api_url}")
+
+    api_base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    branch = parse_qs(parsed_url.query).get("ref", [DEFAULT_BRANCH])[0]
+    return api_base_url, path_parts[1], path_parts[2], "/".join(path_parts[4:]), branch
+
+
 def extract_relative_path(url_file, url_repository):
     """
     Extract the relative path from a file URL using a repository URL as reference.
@@ -197,9 +264,325 @@ def extract_raw_path(path: str) -> str:
     return path_without_query.rsplit("/", 1)[-1]
 
 
+def extract_package(monitor: str) -> Optional[str]:
+    """Return the package declared in an EPL monitor, None if there is none"""
+    return parse_epl_header([monitor], until="package").package
+
+
+class RequestSnapshot:
+    """
+    Headers and cookies of a request. Can be passed to C8YAgent in place of the
+    request from worker threads, which have no request context.
+    """
+
+    def __init__(self, request):
+        self.headers = Headers(request.headers)
+        self.cookies = dict(request.cookies)
+
+
+def in_caller_context(f: Callable) -> Callable:
+    """
+    Bind f to a copy of the caller's context variables, e.g. the request priority,
+    metric labels and current trace span, for functions run in worker threads.
+    """
+    context = contextvars.copy_context()
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(f, *args, **kwargs)
+
+    return wrapper
+
+
 def remove_root_folders(item_path: str, n: int) -> str:
     item_path_parts = item_path.split("/")
     if len(item_path_parts) > 1:
         return "/".join(item_path_parts[n:])
     else:
         return ""
+
+
+class TtlCache:
+    """
+    Thread-safe in-memory cache whose entries expire ttl seconds after they were
+    stored. Keys are tuples starting with the tenant ID, so the entries of a
+    tenant can be dropped together.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expiry, value), least recently used first
+        self._entries: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[Any]:
+        """Return the value stored for key, None if there is none or it expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, expiring after ttl seconds (default: the ttl of the cache)"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: Optional[str] = None, key: Optional[tuple] = None) -> None:
+        """Drop one entry, all entries of a tenant or, without arguments, everything"""
+        with self._lock:
+            if key is not None:
+                self._entries.pop(key, None)
+            elif tenant_id is not None:
+                for cached_key in [k for k in self._entries if k[0] == tenant_id]:
+                    del self._entries[cached_key]
+            else:
+                self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 3) if lookups else None,
+                "ttl": self.ttl,
+            }
+
+
+class MultipartFileStream:
+    """
+    multipart/form-data body with a JSON "object" part and a "file" part, as
+    expected by the inventory binary API. The file is read in chunks while the
+    body is sent, requests would assemble the whole body in memory for files=.
+    Passed as data= the body is sent with its Content-Length, not chunked.
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        object: Dict,
+        file_content_type: str = "application/octet-stream",
+        chunk_size: int = FILE_CHUNK_SIZE,
+    ):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self.chunk_size = chunk_size
+        self._head = (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="object"\r\n\r\n'
+            f"{json.dumps(object)}\r\n"
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"\r\n'
+            f"Content-Type: {file_content_type}\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+        self._length = len(self._head) + os.fstat(file.fileno()).st_size - file.tell() + len(self._tail)
+        self._parts = [io.BytesIO(self._head), file, io.BytesIO(self._tail)]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        data = b""
+        while self._parts and (size < 0 or len(data) < size):
+            chunk = self._parts[0].read(-1 if size < 0 else size - len(data))
+            if not chunk:
+                self._parts.pop(0)
+            data += chunk
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(self.chunk_size), b"")
+
+
+class SessionPool:
+    """
+    Pooled keep-alive sessions, one per upstream host.
+
+    Every session retries connection errors and 5xx answers with exponential
+    backoff and applies default timeouts, so a hanging upstream cannot block a
+    worker forever. Cookies are never stored, sessions are shared by all tenants.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = HTTP_POOL_SIZE,
+        retries: int = HTTP_RETRIES,
+        backoff_factor: float = HTTP_BACKOFF_FACTOR,
+        timeout: Tuple[float, float] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+    ):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        """Get the session for the host of the URL"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._sessions:
+                self._sessions[host] = self._create_session()
+            return self._sessions[host]
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET a URL once the rate limit budget of its credentials allows it, see RateLimitScheduler"""
+        kwargs.setdefault("allow_redirects", True)
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session(url)
+        return rate_limits.request(kwargs.get("headers"), lambda: session.get(url, **kwargs))
+
+    def _create_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+
+http_sessions = SessionPool()
+
+
+class ConditionalRequestCache:
+    """
+    Shared HTTP layer for GitHub GET requests.
+
+    Keeps the validators (ETag, Last-Modified) and the body of responses per URL,
+    Accept header and credentials. Repeated requests are sent as conditional
+    requests, a 304 Not Modified answer is served from the kept body.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CONDITIONAL_CACHE_MAX_ENTRIES,
+        max_body: int = CONDITIONAL_CACHE_MAX_BODY,
+    ):
+        self.max_entries = max_entries
+        self.max_body = max_body
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.conditional_requests = 0
+        self.not_modified = 0
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """
+        Issue a GET request, conditional if a validated response for the URL is kept.
+
+        Args:
+            url (str): URL to request
+            headers (dict, optional): Request headers
+            **kwargs: Passed on to SessionPool.get
+
+        Returns:
+            requests.Response: The response, a 304 answer is returned as the kept 200 response
+        """
+        headers = dict(headers or {})
+        key = self._key(url, headers)
+        with self._lock:
+            self.requests += 1
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = http_sessions.get(url, headers=headers, **kwargs)
+
+        if entry:
+            with self._lock:
+                self.conditional_requests += 1
+                if response.status_code == 304:
+                    self.not_modified += 1
+            if response.status_code == 304:
+                return self._cached_response(url, entry)
+
+        if response.status_code == 200 and not kwargs.get("stream"):
+            self._store(key, response)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "requests": self.requests,
+                "conditionalRequests": self.conditional_requests,
+                "notModified": self.not_modified,
+            }
+
+    def _store(self, key: str, response: requests.Response) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified) or len(response.content) > self.max_body:
+            return
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content": response.content,
+            "encoding": response.encoding,
+            "headers": {
+                name: response.headers[name]
+                for name in ("Content-Type", "ETag", "Last-Modified")
+                if name in response.headers
+            },
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _cached_response(url: str, entry: Dict[str, Any]) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = entry["content"]
+        response._content_consumed = True
+        response.encoding = entry["encoding"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        return response
+
+    @staticmethod
+    def _key(url: str, headers: Dict[str, str]) -> str:
+        # Credentials are part of the key, kept responses are never shared between tokens
+        lookup = CaseInsensitiveDict(headers)
+        identity = hashlib.sha256(lookup.get("Authorization", "").encode()).hexdigest()
+        return f"{url}|{lookup.get('Accept', '')}|{identity}"
+
+
+conditional_requests = ConditionalRequestCache()
+
+
+def conditional_get(url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+    """GET a URL through the shared ConditionalRequestCache"""
+    return conditional_requests.get(url, headers, **kwargs)
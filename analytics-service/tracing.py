@@ -0,0 +1,289 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger("tracing")
+logger.setLevel(logging.INFO)
+
+# File finished spans are appended to, one JSON object per line
+TRACE_FILE = os.getenv("TRACE_FILE")
+# Zipkin v2 compatible endpoint spans are posted to, e.g. http://localhost:9411/api/v2/spans
+TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL")
+# Share of requests without an incoming traceparent header that are traced
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# Finished spans buffered for the exporter, further spans are dropped until it catches up
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+# Maximum spans the exporter writes or posts at once
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "512"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "analytics-ext-service")
+
+TRACING_ENABLED = bool(TRACE_FILE or TRACE_COLLECTOR_URL)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Span the current code runs in, child spans are started below it
+_current: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One timed operation of a trace, exported in the Zipkin v2 JSON format"""
+
+    __slots__ = ("trace_id", "id", "parent_id", "name", "kind", "sampled", "tags", "timestamp", "_start", "duration")
+
+    def __init__(
+        self,
+        trace_id: str,
+        name: str,
+        parent_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        sampled: bool = True,
+        tags: Optional[Dict] = None,
+    ):
+        self.trace_id = trace_id
+        self.id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.tags = {key: str(value) for key, value in tags.items() if value is not None} if tags else {}
+        self.timestamp = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set(self, key: str, value) -> None:
+        if value is not None:
+            self.tags[key] = str(value)
+
+    def set_error(self, error: BaseException) -> None:
+        self.tags["error"] = f"{type(error).__name__}: {error}"
+
+    def traceparent(self) -> str:
+        """W3C traceparent header continuing the trace below this span"""
+        return f"00-{self.trace_id}-{self.id}-{'01' if self.sampled else '00'}"
+
+    def finish(self) -> None:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            if self.sampled:
+                exporter.export(self)
+
+    def to_json(self) -> Dict:
+        span = {
+            "traceId": self.trace_id,
+            "id": self.id,
+            "name": self.name,
+            "timestamp": int(self.timestamp * 1_000_000),
+            "duration": max(1, int((self.duration or 0) * 1_000_000)),
+            "localEndpoint": {"serviceName": TRACE_SERVICE_NAME},
+            "tags": self.tags,
+        }
+        if self.parent_id:
+            span["parentId"] = self.parent_id
+        if self.kind:
+            span["kind"] = self.kind
+        return span
+
+
+class SpanExporter:
+    """
+    Writes finished spans to TRACE_FILE and posts them to TRACE_COLLECTOR_URL
+    from a background thread, so a request only pays for queueing its spans.
+    """
+
+    def __init__(
+        self,
+        file: Optional[str] = TRACE_FILE,
+        collector_url: Optional[str] = TRACE_COLLECTOR_URL,
+        queue_size: int = TRACE_QUEUE_SIZE,
+        batch_size: int = TRACE_BATCH_SIZE,
+    ):
+        self.file = file
+        self.collector_url = collector_url
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Span]" = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def flush(self, timeout: float = 5) -> bool:
+        """Wait until the queued spans are exported, returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "file": self.file,
+                "collectorUrl": self.collector_url,
+                "queued": self._queue.qsize(),
+                "exported": self.exported,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+    def _start(self) -> None:
+        # Started by the first span, so every gunicorn worker runs its own thread
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write([span.to_json() for span in batch])
+                with self._lock:
+                    self.exported += len(batch)
+            except Exception as e:
+                logger.warning(f"Exporting {len(batch)} spans failed: {e}")
+                with self._lock:
+                    self.failed += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, spans: List[Dict]) -> None:
+        if self.file:
+            with open(self.file, "a") as f:
+                f.write("".join(json.dumps(span, separators=(",", ":")) + "\n" for span in spans))
+        if self.collector_url:
+            response = requests.post(self.collector_url, json=spans, timeout=10)
+            response.raise_for_status()
+
+
+exporter = SpanExporter()
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, kind: str = "SERVER", **tags) -> Optional[Span]:
+    """
+    Start the root span of a request and make it the current span.
+
+    Args:
+        name (str): Name of the span, e.g. the endpoint
+        traceparent (str, optional): Incoming W3C traceparent header, the trace is continued below it
+        kind (str): Zipkin span kind
+        **tags: Tags of the span
+
+    Returns:
+        The span, to be ended with end_trace, None if tracing is disabled
+    """
+    if not TRACING_ENABLED:
+        return None
+    match = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+    if match and match.group(1) != "0" * 32:
+        trace_id, parent_id = match.group(1), match.group(2)
+        sampled = bool(int(match.group(3), 16) & 1)
+    else:
+        trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+        sampled = random.random() < TRACE_SAMPLE_RATE
+    root = Span(trace_id, name, parent_id=parent_id, kind=kind, sampled=sampled, tags=tags)
+    _current.set(root)
+    return root
+
+
+def end_trace(root: Optional[Span], error: Optional[BaseException] = None) -> None:
+    """End the root span of a request, the thread serves the next request outside of a trace"""
+    if root is None:
+        return
+    if error is not None:
+        root.set_error(error)
+    root.finish()
+    _current.set(None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+class _ChildSpan:
+    """Context manager making a child span the current span while the block runs"""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, parent: Span, name: str, kind: Optional[str], tags: Dict):
+        self.span = Span(parent.trace_id, name, parent_id=parent.id, kind=kind, tags=tags)
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if isinstance(exc, Exception):
+            self.span.set_error(exc)
+        _current.reset(self._token)
+        self.span.finish()
+
+
+# Yields None, outside of a sampled trace a span costs no more than this
+_NO_SPAN = nullcontext()
+
+
+def span(name: str, kind: Optional[str] = None, **tags):
+    """
+    Trace a with block as a child of the current span. Outside of a sampled
+    trace nothing is recorded and None is yielded.
+    """
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        return _NO_SPAN
+    return _ChildSpan(parent, name, kind, tags)
+
+
+def traced(name: str, kind: Optional[str] = "CLIENT"):
+    """Decorator tracing every call of the function as a span"""
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def tag(key: str, value) -> None:
+    """Tag the current span, if any"""
+    current = _current.get()
+    if current is not None and current.sampled:
+        current.set(key, value)
+
+
+def record_error(error: BaseException) -> None:
+    """Mark the current span as failed, for errors handled before they leave it"""
+    current = _current.get()
+    if current is not None and current.sampled:
+        current.set_error(error)
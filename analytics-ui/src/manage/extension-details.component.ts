@@ -53,9 +53,13 @@ export class ExtensionDetailsComponent {
   async loadExtension() {
     const { name } = this.activatedRoute.snapshot.params;
     this.extension = await this.analyticsService.getExtensionDetailFromCEP(name);
-    const extensionNames = await this.analyticsService.getExtensionNamesFromCEP();
-    const key = `${name}.zip`;
-    this.extensionContent = extensionNames[key]?.contents?.map(fileName => {
+    // The backend includes the contents of zip extensions in the details
+    let contents: string[] = this.extension?.contents;
+    if (!contents) {
+      const extensionNames = await this.analyticsService.getExtensionNamesFromCEP();
+      contents = extensionNames[`${name}.zip`]?.contents;
+    }
+    this.extensionContent = contents?.map(fileName => {
       return fileName.startsWith('files/') ? fileName.substring(6) : fileName;
     }) || [];
     // console.log( "Content", this.extensionContent, this.extension?.analytics?.length);
@@ -27,6 +27,7 @@ export class RepositoriesModalComponent implements OnInit {
   saveRequired: boolean = false;
   labels: ModalLabels = { ok: 'Save', cancel: 'Cancel' };
   popupPAT = `Enter Personal Access Token (PAT) created <a href="https://github.com/settings/tokens/new" target="_blank">here</a>. Select the scope <code>public_repo</code> and enable SSO for the token!`;
+  popupFetchMode = `<code>Content API</code> downloads every file separately. <code>Archive</code> downloads the repository as one tarball and extracts the required files.`;
   popRepositoryUrl = `Enter the last parts to a github repository. If no branch name is given, the default branch <code>main</code> is assumed.`;
   GITHUB_API = 'https://api.github.com/repos/';
   GITHUB_URL = 'https://github.com/';
@@ -51,6 +52,7 @@ export class RepositoriesModalComponent implements OnInit {
       accessToken: ['', {
         autocomplete: 'new-password'
       }],
+      fetchMode: ['contents'],
     });
   }
 
@@ -1,3 +1,4 @@
+import { IManagedObject } from '@c8y/client';
 import { uuidCustom } from './utils';
 
 export interface ApplicationState {
@@ -40,6 +41,30 @@ export interface CEP_Extension {
   version: string;
   loaded: true;
   extensionType?: ExtensionType;
+  contents?: string[];
+}
+
+export interface ExtensionJob {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  phase: string;
+  statusCode?: number;
+  result?: any;
+  error?: string;
+}
+
+export interface ExtensionJobResponse {
+  status: number;
+  job: ExtensionJob;
+}
+
+export interface CEP_ExtensionCatalog {
+  extensions: IManagedObject[];
+  blocks: CEP_Block[];
+  metadatas: string[];
+  messages: string[];
+  collectedAt: number;
 }
 
 export interface CEP_Block {
@@ -82,8 +107,11 @@ export interface Repository {
   url: string;
   accessToken: string;
   enabled: boolean;
+  fetchMode?: RepositoryFetchMode;
 }
 
+export type RepositoryFetchMode = 'contents' | 'archive';
+
 export interface RepositoryTestResult {
   success: boolean;
   message?: string;
@@ -101,8 +129,10 @@ export const CEP_PATH_STATUS = `${CEP_PATH_DIAGNOSTICS}/apamaCtrlStatus`;
 export const BACKEND_PATH_BASE = 'service/analytics-ext-service';
 export const EXTENSION_ENDPOINT = 'extension';
 export const CEP_ENDPOINT = 'cep';
+export const EXTENSION_JOB_POLL_INTERVAL = 2000;
 export const REPOSITORY_CONTENT_ENDPOINT = 'repository/content';
 export const REPOSITORY_CONTENT_LIST_ENDPOINT = 'repository/contentList';
+export const REPOSITORY_CONTENT_FQN_ENDPOINT = 'repository/contentFqn';
 export const REPOSITORY_CONFIGURATION_ENDPOINT = 'repository/configuration';
 export const APPLICATION_ANALYTICS_BUILDER_SERVICE = 'analytics-ext-service';
 export const ANALYTICS_REPOSITORIES_TYPE = 'c8y_CEP_repository';
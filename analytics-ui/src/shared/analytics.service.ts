@@ -20,6 +20,7 @@ import { BehaviorSubject, Observable, ReplaySubject, shareReplay, Subject } from
 import {
   CEP_Block,
   CEP_Extension,
+  CEP_ExtensionCatalog,
   CEP_ExtensionsMetadata,
   CEP_PATH_EN,
   CEP_PATH_METADATA_EN,
@@ -45,6 +46,8 @@ export class AnalyticsService {
   private _cepCtrlStatus: Promise<CEPStatusObject>;
   private _blocksDeployed: Promise<CEP_Block[]>;
   private _extensionsDeployed: Promise<IManagedObject[]>;
+  private _extensionCatalog: Promise<CEP_ExtensionCatalog>;
+  private _refreshExtensionCatalog = false;
   private _isBackendDeployed: Promise<boolean>;
   private cepOperationObject$: ReplaySubject<IManagedObject> =
     new ReplaySubject<IManagedObject>(1);
@@ -81,6 +84,11 @@ export class AnalyticsService {
   }
 
   async getExtensionsMetadataEnriched(): Promise<IManagedObject[]> {
+    if (!this._extensionsDeployed && (await this.isBackendDeployed())) {
+      this._extensionsDeployed = this.getExtensionCatalog().then(
+        (catalog) => catalog.extensions
+      );
+    }
     if (!this._extensionsDeployed) {
       const { data } = await this.getExtensionsMetadataFromInventory();
       const extensions = data;
@@ -126,11 +134,19 @@ export class AnalyticsService {
   async clearCaches() {
     this._blocksDeployed = undefined;
     this._extensionsDeployed = undefined;
+    this._extensionCatalog = undefined;
+    // CEP may have been restarted elsewhere, the backend has to collect again
+    this._refreshExtensionCatalog = true;
     this._cepOperationObjectId = undefined;
     this.subscribeMonitoringChannel();
   }
 
   async getLoadedBlocksFromCEP(): Promise<CEP_Block[]> {
+    if (!this._blocksDeployed && (await this.isBackendDeployed())) {
+      this._blocksDeployed = this.getExtensionCatalog().then(
+        (catalog) => catalog.blocks
+      );
+    }
     if (!this._blocksDeployed) {
       const blocks: CEP_Block[] = [];
       const meta: CEP_ExtensionsMetadata =
@@ -157,6 +173,34 @@ export class AnalyticsService {
     return this._blocksDeployed;
   }
 
+  /**
+   * Deployed extensions and blocks of all loaded extensions, aggregated by the backend
+   * in one request instead of one CEP request per extension.
+   */
+  async getExtensionCatalog(): Promise<CEP_ExtensionCatalog> {
+    if (!this._extensionCatalog) {
+      const refresh = this._refreshExtensionCatalog;
+      this._refreshExtensionCatalog = false;
+      this._extensionCatalog = this.fetchClient
+        .fetch(`${BACKEND_PATH_BASE}/${CEP_ENDPOINT}/extension?refresh=${refresh}`, {
+          headers: {
+            accept: 'application/json',
+            'content-type': 'application/json'
+          },
+          method: 'GET'
+        })
+        .then((response: IFetchResponse) => {
+          if (response.status >= 400) {
+            throw new Error(`Could not load deployed extensions: ${response.status}`);
+          }
+          return response.json();
+        });
+      // Do not keep a failed request, the next call tries again
+      this._extensionCatalog.catch(() => (this._extensionCatalog = undefined));
+    }
+    return this._extensionCatalog;
+  }
+
   async getExtensionsMetadataFromCEP(): Promise<CEP_ExtensionsMetadata> {
     const response: IFetchResponse = await this.fetchClient.fetch(
       `/${CEP_PATH_METADATA_EN}`,
@@ -188,8 +232,12 @@ export class AnalyticsService {
   }
 
   async getExtensionDetailFromCEP(name: string): Promise<CEP_Extension> {
+    const backendDeployed = await this.isBackendDeployed();
+    const url = backendDeployed
+      ? `${BACKEND_PATH_BASE}/${CEP_ENDPOINT}/extension/${encodeURIComponent(name)}`
+      : `${CEP_PATH_EN}/${name}.json`;
     const response: IFetchResponse = await this.fetchClient.fetch(
-      `${CEP_PATH_EN}/${name}.json`,
+      url,
       {
         headers: {
           accept: 'application/json',
@@ -2,10 +2,7 @@
 
 import { HttpClient, HttpErrorResponse, HttpHeaders } from '@angular/common/http';
 import { Injectable } from '@angular/core';
-import {
-  FetchClient,
-  IFetchResponse,
-} from '@c8y/client';
+import { FetchClient } from '@c8y/client';
 import { AlertService, gettext } from '@c8y/ngx-components';
 import * as _ from 'lodash';
 import { BehaviorSubject, EMPTY, forkJoin, from, Observable, of } from 'rxjs';
@@ -15,9 +12,13 @@ import {
   CEP_Block,
   DESCRIPTOR_YAML,
   EXTENSION_ENDPOINT,
+  EXTENSION_JOB_POLL_INTERVAL,
+  ExtensionJob,
+  ExtensionJobResponse,
   Repository,
   REPOSITORY_CONFIGURATION_ENDPOINT,
   REPOSITORY_CONTENT_ENDPOINT,
+  REPOSITORY_CONTENT_FQN_ENDPOINT,
   REPOSITORY_CONTENT_LIST_ENDPOINT,
   RepositoryItem,
   RepositoryTestResult
@@ -360,17 +361,42 @@ export class RepositoryService {
     const blocks = Object.values(data)
       .filter(item => getFileExtension(item['name']) !== '.json')
       .map(item => this.createRepositoryItem(item, repository));
+    const monitors = blocks.filter(block => block.type === 'file' && block.file.endsWith('.mon'));
 
-    return forkJoin(
-      blocks.map(block => {
-        if (block.type === 'file' && block.file.endsWith('.mon')) {
-          return this.getRepositoryItemContent(block, true, true).pipe(
-            map(fqn => ({ ...block, id: fqn }))
-          );
-        } else {
-          return of({ ...block, id: block.file });
-        }
-      })
+    return this.getRepositoryItemsFQN(monitors, repository).pipe(
+      map(fqns => blocks.map(block => ({ ...block, id: fqns.get(block.url) ?? block.file })))
+    );
+  }
+
+  // Extract the FQN of all monitors with one backend call, instead of one call per monitor
+  private getRepositoryItemsFQN(monitors: RepositoryItem[], repository: Repository): Observable<Map<string, string>> {
+    if (!monitors.length) return of(new Map<string, string>());
+
+    return from(this.fetchClient.fetch(
+      `${BACKEND_PATH_BASE}/${REPOSITORY_CONTENT_FQN_ENDPOINT}`,
+      {
+        headers: {
+          accept: 'application/json',
+          'content-type': 'application/json'
+        },
+        body: JSON.stringify({
+          repository_id: repository.id,
+          urls: monitors.map(monitor => monitor.url)
+        }),
+        method: 'POST'
+      }
+    ).then(async resp => {
+      if (resp.status >= 400) {
+        // Error body is {message}, e.g. for a rate limited GitHub token (429)
+        const errorData = await resp.json().catch(() => ({}));
+        const errorMessage = errorData.message || errorData.error || resp.statusText;
+        throw new Error(`Could not extract the FQN of the monitors (${resp.status}): ${errorMessage}`);
+      }
+      return resp.json();
+    })).pipe(
+      map((result: { url: string; fqn?: string }[]) =>
+        new Map(result.filter(block => block.fqn).map(block => [block.url, block.fqn] as [string, string]))
+      )
     );
   }
 
@@ -496,26 +522,15 @@ export class RepositoryService {
     repository: Repository,
     upload: boolean,
     deploy: boolean,
-  ): Promise<IFetchResponse> {
+  ): Promise<ExtensionJobResponse> {
     console.log('Create extensions for:', name, monitors);
-    return this.fetchClient.fetch(
-      `${BACKEND_PATH_BASE}/${EXTENSION_ENDPOINT}/list`,
-      {
-        headers: {
-          accept: 'application/json',
-          'content-type': 'application/json'
-        },
-        body: JSON.stringify({
-          extension_name: name,
-          monitors: monitors,
-          repository: repository,
-          upload: upload,
-          deploy: deploy,
-        }),
-        method: 'POST',
-        responseType: 'blob'
-      }
-    );
+    return this.runExtensionJob('list', {
+      extension_name: name,
+      monitors: monitors,
+      repository: repository,
+      upload: upload,
+      deploy: deploy,
+    });
   }
 
   async createExtensionFromYaml(
@@ -525,27 +540,16 @@ export class RepositoryService {
     repository: Repository,
     upload: boolean,
     deploy: boolean,
-  ): Promise<IFetchResponse> {
+  ): Promise<ExtensionJobResponse> {
     console.log('Create extensions for:', name, yaml);
-    return this.fetchClient.fetch(
-      `${BACKEND_PATH_BASE}/${EXTENSION_ENDPOINT}/yaml`,
-      {
-        headers: {
-          accept: 'application/json',
-          'content-type': 'application/json'
-        },
-        body: JSON.stringify({
-          extension_name: name,
-          yaml,
-          sections,
-          repository,
-          upload,
-          deploy,
-        }),
-        method: 'POST',
-        responseType: 'blob'
-      }
-    );
+    return this.runExtensionJob('yaml', {
+      extension_name: name,
+      yaml,
+      sections,
+      repository,
+      upload,
+      deploy,
+    });
   }
 
   async createExtensionFromRepository(
@@ -553,24 +557,53 @@ export class RepositoryService {
     upload: boolean,
     deploy: boolean,
     repository: Repository
-  ): Promise<IFetchResponse> {
+  ): Promise<ExtensionJobResponse> {
     console.log('Create extensions for:', name, repository);
-    return this.fetchClient.fetch(
-      `${BACKEND_PATH_BASE}/${EXTENSION_ENDPOINT}/repository`,
+    return this.runExtensionJob('repository', {
+      extension_name: name,
+      upload: upload,
+      deploy: deploy,
+      repository: repository
+    });
+  }
+
+  /**
+   * Submit an extension build as background job and poll it until it finished,
+   * so a long build does not run into proxy timeouts.
+   */
+  private async runExtensionJob(path: string, body: object): Promise<ExtensionJobResponse> {
+    const response = await this.fetchClient.fetch(
+      `${BACKEND_PATH_BASE}/${EXTENSION_ENDPOINT}/${path}`,
       {
         headers: {
           accept: 'application/json',
           'content-type': 'application/json'
         },
-        body: JSON.stringify({
-          extension_name: name,
-          upload: upload,
-          deploy: deploy,
-          repository: repository
-        }),
-        method: 'POST',
-        responseType: 'blob'
+        body: JSON.stringify({ ...body, async: true }),
+        method: 'POST'
       }
     );
+    let job: ExtensionJob = await response.json();
+    if (response.status >= 400) {
+      return { status: response.status, job };
+    }
+    while (job.status === 'queued' || job.status === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, EXTENSION_JOB_POLL_INTERVAL));
+      const poll = await this.fetchClient.fetch(
+        `${BACKEND_PATH_BASE}/${EXTENSION_ENDPOINT}/jobs/${job.id}`,
+        {
+          headers: { accept: 'application/json' },
+          method: 'GET'
+        }
+      );
+      if (poll.status >= 400) {
+        return { status: poll.status, job };
+      }
+      job = await poll.json();
+    }
+    return {
+      status: job.statusCode ?? (job.status === 'succeeded' ? 201 : 500),
+      job
+    };
   }
 }
\ No newline at end of file